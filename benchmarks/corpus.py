@@ -0,0 +1,62 @@
+#
+# Reproducible synthetic corpora for Librex benchmarks.
+#
+# Every generator takes an explicit seed, so the same arguments always produce
+# the same patterns and strings on any machine and Python version.
+#
+import random
+import string as _string
+
+from typing import Text, List, Tuple
+
+WORD_SYMS = _string.ascii_lowercase
+
+
+def words(seed: int, count: int, min_len: int = 3, max_len: int = 10) -> List[Text]:
+    rnd = random.Random(seed)
+    return [
+        ''.join(rnd.choice(WORD_SYMS) for _ in range(rnd.randint(min_len, max_len)))
+        for _ in range(count)
+    ]
+
+
+def text(seed: int, size: int, alphabet: Text = WORD_SYMS + ' ') -> Text:
+    rnd = random.Random(seed)
+    return ''.join(rnd.choice(alphabet) for _ in range(size))
+
+
+def log_lines(seed: int, count: int) -> List[Text]:
+    rnd = random.Random(seed)
+    levels = ('INFO', 'WARN', 'ERROR', 'DEBUG')
+    lines = []
+    for _ in range(count):
+        lines.append('{}.{}.{}.{} - {} [{:02d}:{:02d}:{:02d}] request {} took {}ms'.format(
+            rnd.randint(1, 255), rnd.randint(0, 255), rnd.randint(0, 255), rnd.randint(0, 255),
+            rnd.choice(levels), rnd.randint(0, 23), rnd.randint(0, 59), rnd.randint(0, 59),
+            rnd.choice(WORD_SYMS) * rnd.randint(1, 8), rnd.randint(1, 5000),
+        ))
+
+    return lines
+
+
+def pathological(n: int) -> Tuple[Text, Text]:
+    # (a?){n}a{n} matched against a{n}; Librex has no '{n}' qualifier so it is expanded
+    return 'a?' * n + 'a' * n, 'a' * n
+
+
+def alternation(seed: int, count: int) -> Tuple[Text, List[Text]]:
+    alternatives = words(seed, count)
+    return '|'.join(alternatives), alternatives
+
+
+def many_patterns(seed: int, count: int) -> List[Text]:
+    rnd = random.Random(seed)
+    templates = (
+        r'{0}\d+',
+        r'{0}\s*=\s*\w+',
+        r'({0}|{1})+\.log',
+        r'.*{0}',
+        r'{0}(-{1})*',
+    )
+    base = words(seed + 1, count * 2)
+    return [rnd.choice(templates).format(base[2 * i], base[2 * i + 1]) for i in range(count)]
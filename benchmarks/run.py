@@ -0,0 +1,510 @@
+#!/usr/bin/env python
+"""Librex benchmark suite.
+
+Measures compile time, match throughput and peak memory of Librex engines
+on synthetic corpora (see corpus.py) and compares them with the stdlib re module.
+
+Usage:
+    python benchmarks/run.py [--quick] [--filter NAME] [--output FILE] [--compare FILE]
+
+Results are printed as a table; --output saves them as JSON, so that
+two runs can be compared later with --compare.
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import re
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from typing import Text, List, Dict, Callable, Iterable, Any, Optional
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import librex  # noqa: E402
+import corpus  # noqa: E402
+
+#
+# Engines under test: a factory returning callable that matches the whole string.
+#
+ENGINES: Dict[Text, Callable[[Text], Callable[[Text], Any]]] = {
+    'nfa': lambda pattern: librex.compile(pattern, engine='nfa').match,
+    'dfa': lambda pattern: librex.compile(pattern, engine='dfa').match,
+    'compact': lambda pattern: librex.compile(pattern, engine='compact').match,
+    'auto': lambda pattern: librex.compile(pattern, engine='auto').match,
+    're': lambda pattern: re.compile(pattern).fullmatch,
+}
+
+BENCHMARKS: List[Callable[['Suite'], None]] = []
+
+
+def benchmark(fn: Callable[['Suite'], None]) -> Callable[['Suite'], None]:
+    BENCHMARKS.append(fn)
+    return fn
+
+
+class Suite(object):
+    def __init__(self, quick: bool, repeat: int) -> None:
+        self.quick = quick
+        self.repeat = repeat
+        self.results: List[Dict[Text, Any]] = []
+
+    def size(self, quick: int, full: int) -> int:
+        return quick if self.quick else full
+
+    def record(self, name: Text, engine: Text, metric: Text, value: float, unit: Text) -> None:
+        self.results.append({'benchmark': name, 'engine': engine, 'metric': metric, 'value': value,
+                             'unit': unit})
+        print(f'{name:<32} {engine:<8} {metric:<12} {value:>14.6g} {unit}', flush=True)
+
+    def best_time(self, fn: Callable[[], Any]) -> float:
+        best = float('inf')
+        for _ in range(self.repeat):
+            start = time.perf_counter()
+            fn()
+            best = min(best, time.perf_counter() - start)
+
+        return best
+
+    def compile_time(self, name: Text, engine: Text, patterns: List[Text]) -> None:
+        factory = ENGINES[engine]
+
+        def _compile() -> None:
+            re.purge()
+            for pattern in patterns:
+                factory(pattern)
+
+        self.record(name, engine, 'compile', self.best_time(_compile) / len(patterns), 's/pattern')
+
+        re.purge()
+        tracemalloc.start()
+        matchers = [factory(pattern) for pattern in patterns]
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        self.record(name, engine, 'memory', peak, 'bytes')
+        del matchers
+
+    def throughput(self, name: Text, engine: Text, pattern: Text, strings: List[Text],
+                   expected: Optional[int] = None) -> None:
+        matcher = ENGINES[engine](pattern)
+        nsyms = sum(len(s) for s in strings) or 1
+
+        def _match() -> int:
+            return sum(1 for s in strings if matcher(s))
+
+        matched = _match()
+        if expected is not None and matched != expected:
+            raise AssertionError(f'{name}/{engine}: {matched} strings matched, expected {expected}')
+
+        self.record(name, engine, 'throughput', nsyms / self.best_time(_match), 'syms/s')
+
+    def run_engines(self, name: Text, pattern: Text, strings: List[Text],
+                    engines: Iterable[Text] = ENGINES) -> None:
+        expected = None
+        for engine in engines:
+            self.compile_time(name, engine, [pattern])
+            self.throughput(name, engine, pattern, strings, expected)
+            if expected is None:
+                matcher = ENGINES[engine](pattern)
+                expected = sum(1 for s in strings if matcher(s))
+
+
+@benchmark
+def literal(suite: Suite) -> None:
+    pattern = 'GET /index.html HTTP/1.1'
+    strings = [pattern, pattern[:-1] + '0', 'POST' + pattern[3:]] * suite.size(300, 3000)
+    suite.run_engines('literal', pattern, strings)
+
+
+@benchmark
+def symbol_sets(suite: Suite) -> None:
+    pattern = r'\d+\.\d+\.\d+\.\d+ - \w+ \S+ request \w+ took \d+ms'
+    strings = corpus.log_lines(1, suite.size(300, 3000))
+    suite.run_engines('symbol_sets', pattern, strings)
+
+
+@benchmark
+def pathological(suite: Suite) -> None:
+    for n in (8, 16, suite.size(24, 64)):
+        pattern, string = corpus.pathological(n)
+        # backtracking re is exponential here, keep it to small n
+        engines = ('nfa', 'dfa', 'auto', 're') if n <= 16 else ('nfa', 'dfa', 'auto')
+        suite.run_engines(f'pathological_{n}', pattern, [string], engines)
+
+
+@benchmark
+def alternation(suite: Suite) -> None:
+    for count in (10, suite.size(100, 1000)):
+        pattern, alternatives = corpus.alternation(2, count)
+        strings = alternatives + corpus.words(3, count)
+        suite.run_engines(f'alternation_{count}', pattern, strings)
+
+
+@benchmark
+def literal_set(suite: Suite) -> None:
+    count = suite.size(1000, 100000)
+    words = corpus.words(9, count, 5, 12)
+    strings = words[::10] + corpus.words(10, len(words) // 10, 5, 12)
+    # NFA and DFA of that many alternatives are too slow to build on the full corpus
+    engines = ('nfa', 'dfa', 'auto', 're') if suite.quick else ('auto', 're')
+    suite.run_engines(f'literal_set_{count}', '|'.join(words), strings, engines)
+
+    text = corpus.text(11, suite.size(20000, 1000000))
+    name = f'literal_set_search_{count}'
+    searchers = {
+        'auto': lambda: sum(1 for _ in librex.compile_literals(words).finditer(text)),
+        're': lambda: sum(1 for _ in re.finditer('|'.join(words), text)),
+    }
+    for engine, search in searchers.items():
+        suite.record(name, engine, 'throughput', len(text) / suite.best_time(search), 'syms/s')
+
+
+@benchmark
+def large_input(suite: Suite) -> None:
+    size = suite.size(20000, 1000000)
+    string = corpus.text(4, size)
+    suite.run_engines(f'large_input_{size}', r'(\w|\s)*z', [string, string + '!'])
+    suite.run_engines(f'large_input_any_{size}', '.*needle', [string + 'needle', string])
+
+
+@benchmark
+def suffix(suite: Suite) -> None:
+    # file paths, few of which have the suffix; 'auto' scans them from the end
+    words = corpus.words(12, suite.size(3000, 30000), 3, 8)
+    strings = ['/'.join(words[i:i + 5]) + ('.log' if i % 50 == 0 else '.txt')
+               for i in range(0, len(words), 5)]
+    suite.run_engines('suffix', r'.*\.log', strings)
+
+
+@benchmark
+def ignorecase(suite: Suite) -> None:
+    pattern = r'\d+\.\d+\.\d+\.\d+ - \w+ \S+ REQUEST \w+ TOOK \d+MS'
+    strings = corpus.log_lines(1, suite.size(300, 3000))
+    strings = strings[::2] + [s.upper() for s in strings[1::2]]
+    nsyms = sum(len(s) for s in strings)
+    lowered = librex.compile(r'\d+\.\d+\.\d+\.\d+ - \w+ \S+ request \w+ took \d+ms', engine='dfa').match
+    matchers = {
+        'nfa': librex.compile(pattern, engine='nfa', ignorecase=True).match,
+        'dfa': librex.compile(pattern, engine='dfa', ignorecase=True).match,
+        # the way it is done without ignorecase: one more string per match
+        'lower': lambda s: lowered(s.lower()),
+        're': re.compile(pattern, re.IGNORECASE).fullmatch,
+    }
+    for engine, matcher in matchers.items():
+        if sum(1 for s in strings if matcher(s)) != len(strings):
+            raise AssertionError(f'ignorecase/{engine}: not all strings matched')
+        suite.record('ignorecase', engine, 'throughput',
+                     nsyms / suite.best_time(lambda: sum(1 for s in strings if matcher(s))), 'syms/s')
+
+
+@benchmark
+def many_patterns(suite: Suite) -> None:
+    patterns = corpus.many_patterns(5, suite.size(200, 2000))
+    strings = corpus.log_lines(6, 20) + corpus.words(7, 20)
+    name = f'many_patterns_{len(patterns)}'
+    for engine in ENGINES:
+        suite.compile_time(name, engine, patterns)
+        matchers = [ENGINES[engine](p) for p in patterns]
+        nsyms = sum(len(s) for s in strings) * len(matchers)
+
+        def _match() -> None:
+            for matcher in matchers:
+                for s in strings:
+                    matcher(s)
+
+        suite.record(name, engine, 'throughput', nsyms / suite.best_time(_match), 'syms/s')
+        del matchers
+
+
+@benchmark
+def tiering(suite: Suite) -> None:
+    patterns = corpus.many_patterns(9, suite.size(50, 200))
+    strings = corpus.log_lines(10, 20) + corpus.words(11, 20)
+    name = f'tiering_{len(patterns)}'
+    # a few hot patterns among the cold ones
+    hot = patterns[:5]
+    calls = suite.size(2000, 20000)
+    nsyms = sum(len(s) for s in strings) * calls // len(strings) * len(hot)
+    for engine, threshold in (('nfa', None), ('tiered', 1000)):
+        librex.set_tiering(threshold=threshold)
+
+        def _run() -> None:
+            compiled = [librex.compile(p) for p in patterns]
+            for obj in compiled[:len(hot)]:
+                match = obj.match
+                for i in range(calls):
+                    match(strings[i % len(strings)])
+
+        suite.record(name, engine, 'throughput', nsyms / suite.best_time(_run), 'syms/s')
+    librex.set_tiering()
+
+
+@benchmark
+def compact(suite: Suite) -> None:
+    # many literal symbols make a wide, sparse DFA table
+    words = corpus.words(14, suite.size(300, 1000), 5, 12)
+    pattern = '(' + '|'.join(words) + r')\d+'
+    strings = [f'{w}{i}' for i, w in enumerate(words)] + corpus.words(15, len(words))
+    name = f'compact_{len(words)}'
+    # peak memory is taken by the construction, compare what compiled patterns keep
+    librex.compile(pattern, engine='compact')
+    for engine in ('nfa', 'dfa', 'compact'):
+        tracemalloc.start()
+        obj = librex.compile(pattern, engine=engine)
+        suite.record(name, engine, 'resident', tracemalloc.get_traced_memory()[0], 'bytes')
+        tracemalloc.stop()
+        del obj
+    suite.run_engines(name, pattern, strings, ('nfa', 'dfa', 'compact'))
+
+
+@benchmark
+def sorted_batch(suite: Suite) -> None:
+    # file paths sharing long directory prefixes
+    dirs = ['/'.join(corpus.words(16 + i, 4, 4, 8)) for i in range(20)]
+    files = corpus.words(40, suite.size(500, 5000))
+    paths = sorted(f'/srv/{dirs[i % len(dirs)]}/{name}.{("log", "txt")[i % 7 == 0]}'
+                   for i, name in enumerate(files))
+    nsyms = sum(len(p) for p in paths)
+    for engine in ('nfa', 'dfa'):
+        obj = librex.compile(r'/srv/(\w+/)+\w+\.log', engine=engine)
+        runs = {
+            'match': lambda: [obj.match(p) for p in paths],
+            'sorted': lambda: obj.match_sorted(paths),
+            'keys': lambda: obj.match_keys(paths),
+        }
+        for mode, run in runs.items():
+            suite.record(f'sorted_batch_{len(paths)}', f'{engine}_{mode}', 'throughput',
+                         nsyms / suite.best_time(run), 'syms/s')
+
+
+@benchmark
+def result_cache(suite: Suite) -> None:
+    # a few hundred distinct user agents repeated many times
+    agents = [f'Mozilla/5.0 ({w} {i % 9}) AppleWebKit/537.36 Chrome/{i % 40}.0 Safari/537.36'
+              for i, w in enumerate(corpus.words(17, 300))]
+    agents += [f'{w}bot/{i % 5}.1 (+http://example.com/{w})' for i, w in enumerate(corpus.words(18, 20))]
+    rnd = random.Random(19)
+    strings = [rnd.choice(agents) for _ in range(suite.size(20000, 200000))]
+    pattern = r'.*(bot|crawler|spider)/\d.*'
+    nsyms = sum(len(s) for s in strings)
+    for engine in ('nfa', 'dfa'):
+        for cached in (False, True):
+            obj = librex.compile(pattern, engine=engine)
+            if cached:
+                obj.enable_cache()
+            match = obj.match
+            suite.record('result_cache', f'{engine}_cached' if cached else engine, 'throughput',
+                         nsyms / suite.best_time(lambda: [match(s) for s in strings]), 'syms/s')
+
+
+@benchmark
+def compressed_file(suite: Suite) -> None:
+    import gzip
+    import io
+
+    data = '\n'.join(corpus.log_lines(20, suite.size(50000, 500000))).encode()
+    compressed = gzip.compress(data)
+    obj = librex.compile(r'.* ERROR .*', engine='dfa')
+    for threaded in (False, True):
+        seconds = suite.best_time(lambda: list(obj.scan_file(io.BytesIO(compressed), threaded=threaded)))
+        suite.record('compressed_file', 'threaded' if threaded else 'sequential', 'throughput',
+                     len(data) / seconds, 'bytes/s')
+
+
+@benchmark
+def approximate(suite: Suite) -> None:
+    pattern = r'\w+ error in module \w+ at line \d+'
+    words = corpus.words(13, suite.size(300, 3000))
+    strings = [f'{w} eror in modul {w} at line {i}' for i, w in enumerate(words)] + words
+    name = 'approximate'
+    nsyms = sum(len(s) for s in strings)
+    for engine, max_errors in (('nfa', 0), ('dfa', 0), ('approx_1', 1), ('approx_2', 2)):
+        if max_errors:
+            match = librex.compile(pattern, max_errors=max_errors).match
+        else:
+            match = librex.compile(pattern, engine=engine).match
+
+        def _run() -> int:
+            return sum(1 for s in strings if match(s))
+
+        suite.record(name, engine, 'throughput', nsyms / suite.best_time(_run), 'syms/s')
+
+
+@benchmark
+def subsumed(suite: Suite) -> None:
+    patterns = corpus.many_patterns(5, suite.size(200, 2000))
+    # every pattern with 'error' in it is subsumed by the last one
+    patterns += [p + 'error' for p in patterns[:20]] + ['.*error']
+    name = f'subsumed_{len(patterns)}'
+    kept = librex.remove_subsumed(patterns)
+    if len(kept) > len(patterns) - 20:
+        raise AssertionError(f'{name}: {len(patterns) - len(kept)} patterns removed, expected at least 20')
+    suite.record(name, 'dfa', 'time', suite.best_time(lambda: librex.remove_subsumed(patterns)), 's')
+
+
+@benchmark
+def bulk_compile(suite: Suite) -> None:
+    patterns = corpus.many_patterns(5, suite.size(500, 5000))
+    # startup rule sets repeat many patterns
+    patterns += patterns[:len(patterns) // 4]
+    name = f'bulk_compile_{len(patterns)}'
+    for engine in ('nfa', 'auto'):
+        suite.record(name, engine, 'compile',
+                     suite.best_time(lambda: [librex.compile(p, engine=engine) for p in patterns]), 's')
+        for workers in sorted({1, os.cpu_count() or 1}):
+            suite.record(name, f'{engine}_many_{workers}', 'compile',
+                         suite.best_time(lambda: librex.compile_many(patterns, workers, engine)), 's')
+
+
+@benchmark
+def shared_tables(suite: Suite) -> None:
+    patterns = corpus.many_patterns(5, suite.size(200, 2000))
+    strings = corpus.log_lines(6, 20) + corpus.words(7, 20)
+    name = f'shared_tables_{len(patterns)}'
+    nsyms = sum(len(s) for s in strings) * len(patterns)
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'tables.lrx')
+        librex.export_tables(patterns, path=path).close()
+        factories = {
+            'dfa': lambda: [librex.compile(p, engine='dfa') for p in patterns],
+            # a new worker attaches to the tables instead of compiling the patterns
+            'shared': lambda: librex.attach_tables(path=path),
+        }
+        for engine, factory in factories.items():
+            suite.record(name, engine, 'startup', suite.best_time(factory), 's')
+            compiled = factory()
+            matchers = [obj.match for obj in compiled]
+
+            def _match() -> None:
+                for matcher in matchers:
+                    for s in strings:
+                        matcher(s)
+
+            suite.record(name, engine, 'throughput', nsyms / suite.best_time(_match), 'syms/s')
+            del matchers
+            if engine == 'shared':
+                compiled.close()
+
+
+@benchmark
+def lexer(suite: Suite) -> None:
+    rules = [
+        ('ip', r'\d+\.\d+\.\d+\.\d+'), ('num', r'\d+'), ('word', r'\w+'),
+        ('time', r'[\d+:\d+:\d+]'), ('dash', '-'), (None, r'\s+'),
+    ]
+    # '[' and ']' are regular symbols in Librex
+    re_rules = [(n, re.compile(p.replace('[', r'\[').replace(']', r'\]'))) for n, p in rules]
+    text = '\n'.join(corpus.log_lines(8, suite.size(300, 3000)))
+    name = f'lexer_{len(text)}'
+    tokenizers = {
+        'dfa': librex.Lexer(rules).tokenize,
+        'nfa': librex.Lexer(rules, max_dfa_states=1).tokenize,
+        # try every pattern at every position, the way it is done without a lexer
+        're': lambda string: _re_tokenize(re_rules, string),
+    }
+    expected = None
+    for engine, tokenize in tokenizers.items():
+        count = sum(1 for _ in tokenize(text))
+        if expected is not None and count != expected:
+            raise AssertionError(f'{name}/{engine}: {count} tokens, expected {expected}')
+        expected = count
+        seconds = suite.best_time(lambda: sum(1 for _ in tokenize(text)))
+        suite.record(name, engine, 'throughput', len(text) / seconds, 'syms/s')
+
+
+def _re_tokenize(rules: List[Any], string: Text) -> Iterable[Any]:
+    pos = 0
+    while pos < len(string):
+        best = None
+        for name, pattern in rules:
+            m = pattern.match(string, pos)
+            if m and m.end() > pos and (best is None or m.end() > best[2]):
+                best = (name, pos, m.end())
+        if best is None:
+            raise ValueError(f'no rule matches at {pos}')
+        if best[0] is not None:
+            yield best
+        pos = best[2]
+
+
+@benchmark
+def startup(suite: Suite) -> None:
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    env = dict(os.environ, PYTHONPATH=root)
+    commands = {
+        'import': {
+            'auto': 'import librex',
+            're': 'import re',
+        },
+        'cli': {
+            'auto': 'import sys; sys.argv = ["re-match", "a+b", "aaab"]; '
+                    'import librex.main; librex.main.cli()',
+            're': 'import sys, re; sys.exit(0 if re.fullmatch("a+b", "aaab") else 1)',
+        },
+    }
+    for name, engines in commands.items():
+        for engine, code in engines.items():
+            def _run() -> None:
+                subprocess.run([sys.executable, '-c', code], env=env, check=True)
+
+            suite.record(f'startup_{name}', engine, 'time', suite.best_time(_run), 's')
+
+
+def compare(results: List[Dict[Text, Any]], baseline_file: Text) -> None:
+    with open(baseline_file) as f:
+        baseline = {
+            (r['benchmark'], r['engine'], r['metric']): r['value'] for r in json.load(f)['results']
+        }
+
+    print(f'\nComparison with {baseline_file} (ratio > 1 is better):')
+    for r in results:
+        old = baseline.get((r['benchmark'], r['engine'], r['metric']))
+        if not old or not r['value']:
+            continue
+        # throughput is better when higher, time and memory are better when lower
+        ratio = r['value'] / old if r['metric'] == 'throughput' else old / r['value']
+        print(f"{r['benchmark']:<32} {r['engine']:<8} {r['metric']:<12} {ratio:>8.2f}")
+
+
+def main(argv: Optional[List[Text]] = None) -> int:
+    parser = argparse.ArgumentParser(description='Run Librex benchmarks.')
+    parser.add_argument('--quick', action='store_true', help='use smaller corpora')
+    parser.add_argument('--repeat', type=int, default=3,
+                        help='number of timing repeats (best one is taken)')
+    parser.add_argument('--filter', metavar='NAME', help='run only benchmarks whose name contains NAME')
+    parser.add_argument('--output', metavar='FILE', help='save results as JSON to FILE')
+    parser.add_argument('--compare', metavar='FILE', help='compare results with JSON saved earlier')
+    args = parser.parse_args(argv)
+
+    suite = Suite(args.quick, args.repeat)
+    for fn in BENCHMARKS:
+        if args.filter is None or args.filter in fn.__name__:
+            fn(suite)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({
+                'meta': {
+                    'librex': librex.__version__,
+                    'python': platform.python_version(),
+                    'implementation': platform.python_implementation(),
+                    'platform': platform.platform(),
+                    'quick': args.quick,
+                    'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+                },
+                'results': suite.results,
+            }, f, indent=2)
+
+    if args.compare:
+        compare(suite.results, args.compare)
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
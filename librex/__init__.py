@@ -16,7 +16,8 @@ The special symbols are:
     "+"      Matches 1 or more (greedy) repetitions of the preceding RE.
     "?"      Matches 0 or 1 (greedy) of the preceding RE.
     "|"      A|B, creates an RE that will match either A or B.
-    (...)    Matches the RE inside the parentheses.
+    (...)    Matches the RE inside the parentheses; the contents of a group
+             can be retrieved with fullmatch().
     "\\"     Escapes special symbols.
 
 The special sequences consist of "\\" and a symbol from the list
@@ -33,27 +34,240 @@ then the RexError will be thrown.
 
 This module exports the following functions:
     match     Match a regular expression pattern to the whole string.
+    fullmatch Match a regular expression pattern to the whole string,
+              returning a RexMatch object with the spans of the groups.
     compile   Compile a pattern into a RexPattern object.
+    compile_literals
+              Build a LiteralSet object matching any of the given strings.
+    compile_many
+              Compile many patterns at once in worker processes.
 
-This module also defines an exception 'RexError'.
+Large batches of strings are matched by worker processes with:
+    match_many_async   Coroutine matching a pattern to every string of a batch.
+    create_executor    Create executor with patterns precompiled in its workers.
+
+The Lexer class splits strings into tokens matched by several patterns at once.
+
+Runtime statistics of compiled patterns (see RexPattern.enable_stats())
+are gathered with the following functions:
+    collect_stats      Return statistics of all instrumented patterns.
+    add_stats_hook     Register a callback receiving exported statistics.
+    remove_stats_hook  Unregister a callback.
+    export_stats       Pass statistics to the registered callbacks.
+
+This module also defines an exception 'RexError' and its subclass
+'RexBudgetError' raised when matching exceeds its work budget or deadline.
 
 """
+from __future__ import annotations
 
-from typing import Union, Text
+from ._impl import RexError, RexBudgetError, RexPattern, RexMatch, _compile, _DFA_MAX_STATES
+from ._stats import RexStats, collect_stats, add_stats_hook, remove_stats_hook, export_stats
+from ._tiers import set_tiering, tiering_info
 
-from ._impl import RexError, RexPattern, _compile
+TYPE_CHECKING = False
+if TYPE_CHECKING:
+    from typing import Union, Text, Optional, Iterable, List, Any
 
-__all__ = ['RexError', 'match', 'compile']
+    from ._lexer import Lexer
+    from ._literal import LiteralSet
+    from ._shared import SharedTables
+    from ._algebra import RexAutomaton
+    from ._cache import RexCache
+    from ._bulk import RexBatch
+
+__all__ = ['RexError', 'RexBudgetError', 'RexStats', 'RexCache', 'RexBatch', 'RexMatch', 'RexAutomaton',
+           'Lexer', 'LiteralSet', 'SharedTables', 'match', 'fullmatch', 'compile', 'compile_many',
+           'compile_literals',
+           'match_many_async', 'create_executor',
+           'export_tables', 'attach_tables', 'remove_subsumed',
+           'collect_stats', 'add_stats_hook', 'remove_stats_hook', 'export_stats',
+           'set_tiering', 'tiering_info']
 
 __version__ = "0.0.1"
 
+#
+# Classes imported on first use, to keep 'import librex' cheap.
+#
+_LAZY = {
+    'Lexer': '._lexer',
+    'LiteralSet': '._literal',
+    'SharedTables': '._shared',
+    'RexAutomaton': '._algebra',
+    'RexCache': '._cache',
+    'RexBatch': '._bulk',
+}
+
+
+def __getattr__(name: str) -> Any:
+    module = _LAZY.get(name)
+    if module is None:
+        raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
 
-def match(pattern: Union[Text, RexPattern], string: Text) -> bool:
+    from importlib import import_module
+
+    value = globals()[name] = getattr(import_module(module, __name__), name)
+    return value
+
+
+def match(pattern: Union[Text, RexPattern], string: Text,
+          budget: Optional[int] = None, deadline: Optional[float] = None) -> bool:
     """Try to apply the pattern to the whole string, returning
-    True if the string matches or False otherwise."""
-    return _compile(pattern).match(string)
+    True if the string matches or False otherwise.
+
+    See RexPattern.match() for the meaning of budget and deadline."""
+    return _compile(pattern).match(string, budget, deadline)
+
+
+def fullmatch(pattern: Union[Text, RexPattern], string: Text) -> Optional[RexMatch]:
+    """Try to apply the pattern to the whole string, returning
+    a RexMatch object, or None if the string doesn't match."""
+    return _compile(pattern).fullmatch(string)
+
+
+def compile(pattern: Union[Text, RexPattern], engine: Optional[Text] = None,
+            max_dfa_states: int = _DFA_MAX_STATES,
+            max_states: Optional[int] = None, max_depth: Optional[int] = None,
+            ignorecase: bool = False, max_errors: int = 0) -> RexPattern:
+    """Compile a regular expression pattern, returning a RexPattern object.
+
+    The engine used for matching is selected by engine argument:
+        'nfa'      Simulate NFA (Thompson's algorithm).
+        'dfa'      Convert NFA to minimal DFA, unless it would have more
+                   than max_dfa_states states.
+        'compact'  Like 'dfa', with the transitions packed by row displacement,
+                   taking less memory at the cost of slower lookups.
+        'reverse'  Scan strings from the end with minimal DFA of the reversed
+                   pattern, stopping as soon as the string can't match.
+        'literal'  Compare strings with the pattern made of literal symbols only,
+                   RexError is raised for other patterns.
+        'literal_set'
+                   Look strings up in the set of alternatives of the pattern made of
+                   literal strings only, RexError is raised for other patterns.
+        'auto'     Let the planner pick the fastest engine for the pattern.
+    RexPattern.explain() tells which engine was chosen and why.
+    By default, alternations of many literal strings are matched as 'literal_set',
+    other patterns as 'nfa' until they are called often enough to be promoted
+    to the engine 'auto' would pick (see set_tiering()).
+
+    If the pattern needs more than max_states NFA states or has groups
+    nested deeper than max_depth, RexError is raised before the NFA is built.
+
+    If ignorecase is True, literal symbols of the pattern match their other case
+    variants as well (like with re.IGNORECASE). Case is folded at compile time,
+    so matching costs the same and strings are not transformed.
+    ValueError is raised if it is given along with a compiled pattern.
+
+    If max_errors is positive, strings match if at most max_errors symbol insertions,
+    deletions and substitutions turn them into a string matched by the pattern.
+    They are matched by the 'approx' engine, a bit-parallel NFA simulation taking
+    linear time in the length of the string; engine can't be given then.
+    """
+    return _compile(pattern, engine, max_dfa_states, max_states, max_depth, ignorecase, max_errors)
+
+
+def compile_many(patterns: Iterable[Text], workers: Optional[int] = None, engine: Optional[Text] = None,
+                 max_dfa_states: int = _DFA_MAX_STATES, ignorecase: bool = False,
+                 max_errors: int = 0) -> RexBatch:
+    """Compile many patterns at once, returning a RexBatch object with the compiled patterns
+    in the order of the given ones.
+
+    Identical patterns are compiled once and get the same RexPattern object. The distinct ones
+    are compiled by worker processes (threads on Python built without the GIL), os.cpu_count()
+    of them if workers is None; with workers=1 they are compiled in this process. Workers send
+    the compiled patterns back pickled, so they are not compiled again. Other arguments
+    have the same meaning as for compile().
+
+    Patterns failing to compile don't stop the others: they are None in RexBatch.patterns
+    and their RexError objects are in RexBatch.errors, by index. RexBatch.stats holds:
+        patterns      number of given patterns
+        unique        number of distinct patterns
+        compiled      number of distinct patterns compiled
+        failed        number of distinct patterns failed to compile
+        workers       number of workers
+        elapsed       wall time of the whole call, in seconds
+        compile_time  sum of the compile times of the distinct patterns, in seconds
+        load_time     time taken to unpickle the compiled patterns, in seconds
+        program_size  total size of the pickled patterns, in bytes
+        memory        total RexPattern.memory_estimate of the compiled patterns
+        engines       dictionary mapping engine names to the number of patterns using them
+    """
+    from ._bulk import compile_many as _compile_many
+
+    return _compile_many(patterns, workers, engine, max_dfa_states, ignorecase, max_errors)
+
+
+def compile_literals(words: Iterable[Text]) -> LiteralSet:
+    """Build a LiteralSet object matching any of the literal strings words,
+    either as the whole string or as a substring.
+
+    The words are used as is, special symbols don't need to be escaped."""
+    from ._literal import LiteralSet
+
+    return LiteralSet(words)
+
+
+async def match_many_async(pattern: Union[Text, RexPattern], items: Iterable[Text], executor: Any = None,
+                           chunk_size: int = 1000) -> List[bool]:
+    """Match the pattern to every string of items in executor, returning list of the results.
+
+    Items are split into chunks of chunk_size strings, which are matched concurrently,
+    so that the event loop stays responsive. Use executor made by create_executor()
+    to match on all cores; by default the event loop executor is used.
+    """
+    from ._aio import match_many_async as _match_many_async
+
+    return await _match_many_async(pattern, items, executor, chunk_size)
+
+
+def create_executor(patterns: Iterable[Union[Text, RexPattern]] = (),
+                    max_workers: Optional[int] = None) -> Any:
+    """Create executor for match_many_async() with the patterns compiled in every worker beforehand.
+
+    It is a ProcessPoolExecutor, or a ThreadPoolExecutor on Python built without the GIL.
+    Patterns are compiled with the same options as given RexPattern objects (patterns
+    compiled with the default engine are promoted in the workers as they get hot);
+    other patterns are compiled by workers on first use.
+    """
+    from ._aio import create_executor as _create_executor
+
+    return _create_executor(patterns, max_workers)
+
+
+def remove_subsumed(patterns: Iterable[Union[Text, RexPattern]]) -> List[Union[Text, RexPattern]]:
+    """Return list of the patterns without the ones whose every match is matched
+    by another pattern of the list, keeping the order. Of equivalent patterns the first one is kept.
+
+    Patterns are compared with RexPattern.issubset(), so the check takes quadratic time
+    in the number of patterns, though most of the pairs are told apart after a few DFA states.
+    """
+    from ._algebra import remove_subsumed as _remove_subsumed
+
+    return _remove_subsumed(patterns)
+
+
+def export_tables(patterns: Iterable[Union[Text, RexPattern]], name: Optional[Text] = None,
+                  path: Optional[Text] = None, max_dfa_states: int = _DFA_MAX_STATES) -> SharedTables:
+    """Write DFA tables of the patterns into a new shared memory block, or into the file
+    at path if it is given, returning a SharedTables object attached to them.
+
+    Patterns are compiled with the DFA or the reverse DFA engine, unless they are
+    such RexPattern objects already; RexError is raised if a pattern's DFA would have
+    more than max_dfa_states states. The block is named name, or gets a random name
+    (see SharedTables.name) if None. It stays in place until SharedTables.unlink().
+    Requires Python 3.8+ unless path is given.
+    """
+    from ._shared import export_tables as _export_tables
+
+    return _export_tables(patterns, name, path, max_dfa_states)
+
+
+def attach_tables(name: Optional[Text] = None, path: Optional[Text] = None) -> SharedTables:
+    """Attach read-only to DFA tables exported by export_tables(), either to the shared memory
+    block name or to the file at path, returning a SharedTables object.
 
+    Patterns of the returned object match with the shared tables and are not compiled again.
+    """
+    from ._shared import attach_tables as _attach_tables
 
-def compile(pattern: Union[Text, RexPattern]) -> RexPattern:
-    """Compile a regular expression pattern, returning a RexPattern object."""
-    return _compile(pattern)
+    return _attach_tables(name, path)
@@ -0,0 +1,208 @@
+#
+# asyncio support.
+#
+# Data read from a stream is decoded incrementally and fed to the matching engine
+# chunk by chunk (see _NFAStream in _impl.py), so whole messages are never buffered.
+# StreamReader.read() doesn't suspend while its buffer has data, thus the event loop
+# gets control explicitly every _YIELD_INTERVAL symbols.
+#
+# Large batches are matched by executors: items are split into chunks, which are sent
+# to the workers along with the pattern and its compile options (see _key()). Every worker
+# compiles a pattern once and keeps the _MAX_WORKER_PATTERNS most recently used ones (threads
+# of the default executor share them); executors made by create_executor() compile the given
+# patterns beforehand, in their initializer.
+#
+from __future__ import annotations
+
+import asyncio
+import codecs
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from functools import lru_cache
+import sys
+
+from ._impl import RexPattern, _NFAStream, _compile, _nfa_of
+
+TYPE_CHECKING = False
+if TYPE_CHECKING:
+    from typing import Any, Text, AsyncIterator, Iterable, Union, Optional, List, Tuple
+
+    _Key = Tuple[Text, Optional[Text], int, bool, int]
+
+#
+# Number of bytes requested from the reader at once.
+#
+_READ_SIZE = 65536
+
+#
+# Number of symbols matched between returns to the event loop.
+#
+_YIELD_INTERVAL = 4096
+
+
+#
+# The reversed DFA scans strings from the end, so its stream keeps the whole input;
+# patterns it was planned for are streamed on the forward DFA if it fits within the limit
+# of states, or else by the NFA simulation, in constant memory either way.
+#
+def _stream_of(obj: RexPattern) -> Any:
+    engine = obj._engine
+    if engine is not None and engine.name == 'reverse':
+        if engine.forward is None:
+            from ._dfa import build_dfa
+            from ._program import flatten
+
+            engine.forward = build_dfa(flatten(_nfa_of(obj)), obj._max_dfa_states) or False
+        engine = engine.forward or None
+    if engine is None:
+        return _NFAStream(obj)
+    return engine.stream()
+
+
+async def match_stream(obj: RexPattern, reader: Any, encoding: Text, errors: Text) -> bool:
+    stream = _stream_of(obj)
+    decoder = codecs.getincrementaldecoder(encoding)(errors)
+    while stream.result is None:
+        data = await reader.read(_READ_SIZE)
+        chunk = decoder.decode(data, final=not data)
+        for start in range(0, len(chunk), _YIELD_INTERVAL):
+            stream.feed(chunk, start, min(start + _YIELD_INTERVAL, len(chunk)))
+            await asyncio.sleep(0)
+        if not data:
+            break
+
+    return stream.close()
+
+
+#
+# Feed text to the stream of a long line, _YIELD_INTERVAL symbols at a time,
+# returning to the event loop in between.
+#
+async def _feed(stream: Any, text: Text) -> None:
+    for start in range(0, len(text), _YIELD_INTERVAL):
+        if stream.result is not None:
+            return
+        stream.feed(text, start, min(start + _YIELD_INTERVAL, len(text)))
+        await asyncio.sleep(0)
+
+
+#
+# Only the newly read data is split into lines; the parts of a line spanning several reads
+# are kept in a list and joined once, when it is complete. Lines longer than _YIELD_INTERVAL
+# symbols are fed to the engine stream part by part as they arrive, like in match_stream(),
+# so they are neither matched again nor matched in one go. The stream doesn't get a trailing
+# '\r' until the next part shows it doesn't end the line.
+#
+async def scan_lines(obj: RexPattern, reader: Any, encoding: Text, errors: Text) -> AsyncIterator[Text]:
+    decoder = codecs.getincrementaldecoder(encoding)(errors)
+    parts: List[Text] = []
+    size = 0
+    stream: Any = None
+    cr = False
+    consumed = 0
+    while True:
+        data = await reader.read(_READ_SIZE)
+        lines = decoder.decode(data, final=not data).split('\n')
+        # the last line continues in the next chunk unless EOF is reached
+        tail = lines.pop()
+        if not data and (parts or tail):
+            lines.append(tail)
+            tail = ''
+
+        for line in lines:
+            if stream is not None:
+                text = '\r' + line if cr else line
+                await _feed(stream, text[:-1] if text.endswith('\r') else text)
+                matched = stream.close()
+            if parts:
+                parts.append(line)
+                line = ''.join(parts)
+                parts = []
+                size = 0
+            if line.endswith('\r'):
+                line = line[:-1]
+            if stream is None:
+                matched = obj.match(line)
+            stream = None
+            cr = False
+            if matched:
+                yield line
+
+            consumed += len(line)
+            if consumed >= _YIELD_INTERVAL:
+                consumed = 0
+                await asyncio.sleep(0)
+
+        if tail:
+            parts.append(tail)
+            size += len(tail)
+            if size > _YIELD_INTERVAL:
+                # the parts read before are fed when the line gets long
+                pending = parts if stream is None else [tail]
+                if stream is None:
+                    stream = _stream_of(obj)
+                for part in pending:
+                    if cr:
+                        part = '\r' + part
+                    cr = part.endswith('\r')
+                    await _feed(stream, part[:-1] if cr else part)
+
+        if not data:
+            return
+
+
+#
+# Maximum number of compiled patterns kept by a worker.
+#
+_MAX_WORKER_PATTERNS = 256
+
+
+#
+# Patterns are compiled by workers with the options they were compiled with here, so that
+# patterns compiled with the default engine are tiered there as well.
+#
+def _key(pattern: Union[Text, RexPattern]) -> _Key:
+    obj = _compile(pattern)
+    return obj.pattern, obj._requested, obj._max_dfa_states, obj.ignorecase, obj.max_errors
+
+
+@lru_cache(maxsize=_MAX_WORKER_PATTERNS)
+def _worker_pattern(key: _Key) -> RexPattern:
+    pattern, engine, max_dfa_states, ignorecase, max_errors = key
+    return _compile(pattern, engine, max_dfa_states, ignorecase=ignorecase, max_errors=max_errors)
+
+
+def _init_worker(keys: List[_Key]) -> None:
+    for key in keys:
+        _worker_pattern(key)
+
+
+def _match_chunk(key: _Key, items: List[Text]) -> List[bool]:
+    match = _worker_pattern(key).match
+    return [match(item) for item in items]
+
+
+#
+# Python 3.13+ can be built without the GIL, so that threads run in parallel.
+#
+def _gil_enabled() -> bool:
+    return getattr(sys, '_is_gil_enabled', lambda: True)()
+
+
+def create_executor(patterns: Iterable[Union[Text, RexPattern]] = (),
+                    max_workers: Optional[int] = None) -> Executor:
+    keys = [_key(pattern) for pattern in patterns]
+    cls = ProcessPoolExecutor if _gil_enabled() else ThreadPoolExecutor
+    return cls(max_workers, initializer=_init_worker, initargs=(keys,))
+
+
+async def match_many_async(pattern: Union[Text, RexPattern], items: Iterable[Text],
+                           executor: Optional[Executor], chunk_size: int) -> List[bool]:
+    key = _key(pattern)
+    items = list(items)
+    loop = asyncio.get_running_loop()
+    chunks = await asyncio.gather(*[
+        loop.run_in_executor(executor, _match_chunk, key, items[i:i + chunk_size])
+        for i in range(0, len(items), chunk_size)
+    ])
+
+    return [result for chunk in chunks for result in chunk]
@@ -0,0 +1,329 @@
+#
+# Pattern algebra.
+#
+# Languages of patterns are compared and combined by the product construction over
+# their minimal DFAs (see _dfa.py). Every operand DFA has an alphabet of its own, so the
+# product runs over the joint alphabet: each literal symbol of any operand gets a class
+# of its own, and other symbols are split by the values of all the operands' base predicates.
+# Joint classes are translated to the classes of every operand once, before the construction.
+#
+# Product states are tuples of operand row offsets; sink states (offsets past the end
+# of a table) loop to themselves. Products made by intersection() and complement()
+# are minimized and laid out as regular DFA tables.
+#
+# Checks like a.issubset(b), i.e. emptiness of a & ~b, only search the product of two DFAs.
+# Every state of a minimal DFA but the dead one leads to an accepting state, so the search
+# stops as soon as 'a' is alive while 'b' is dead (a string of 'a' that 'b' can't match
+# is found) and doesn't go on from the states where 'a' is dead. Most failing checks
+# visit a few states only.
+#
+from __future__ import annotations
+
+from functools import lru_cache
+
+from ._dfa import Alphabet, DFA, build_dfa, minimal_dfa
+from ._impl import RexError, RexPattern, _compile, _nfa_of, _DFA_MAX_STATES
+from ._program import flatten
+from ._symsets import get_signatures, _signature_samples
+
+TYPE_CHECKING = False
+if TYPE_CHECKING:
+    from typing import Text, Union, Callable, Optional, Iterable, List, Tuple, Set, FrozenSet
+
+#
+# Limit of states of product automata.
+#
+_PRODUCT_MAX_STATES = 100000
+
+
+class RexAutomaton(object):
+    """Minimal DFA of a combination of patterns, made by RexPattern.intersection()
+    or RexPattern.complement(). It supports the same algebra methods as RexPattern.
+
+    Attributes:
+        description: Combination of the patterns, e.g. '(a.*)&(.*b)'
+    """
+    __slots__ = ('description', '_dfa')
+
+    def __init__(self, description: Text, dfa: DFA) -> None:
+        self.description = description
+        self._dfa = dfa
+
+    def __repr__(self) -> str:
+        return f'<RexAutomaton {self.description!r} states={self._dfa.nstates}>'
+
+    @property
+    def state_count(self) -> int:
+        """Number of states of the DFA."""
+        return self._dfa.nstates
+
+    def match(self, string: Text) -> bool:
+        """Return True if the whole string is matched by the automaton, False otherwise."""
+        return self._dfa.match(string)
+
+    def isempty(self) -> bool:
+        """Return True if the automaton matches no string at all."""
+        return isempty(self)
+
+    def issubset(self, other: 'Operand') -> bool:
+        """Return True if every string matched by the automaton is matched by other."""
+        return issubset(self, other)
+
+    def issuperset(self, other: 'Operand') -> bool:
+        """Return True if every string matched by other is matched by the automaton."""
+        return issubset(other, self)
+
+    def isdisjoint(self, other: 'Operand') -> bool:
+        """Return True if no string is matched by both the automaton and other."""
+        return isdisjoint(self, other)
+
+    def intersection(self, other: 'Operand') -> 'RexAutomaton':
+        """Return automaton matching the strings matched by both the automaton and other."""
+        return intersection(self, other)
+
+    def complement(self) -> 'RexAutomaton':
+        """Return automaton matching the strings not matched by the automaton."""
+        return complement(self)
+
+
+if TYPE_CHECKING:
+    Operand = Union[Text, RexPattern, RexAutomaton]
+
+
+def isempty(a: Operand) -> bool:
+    # all states of a minimal DFA are reachable from the start one
+    return not _dfa_of(a).accepting
+
+
+def issubset(a: Operand, b: Operand) -> bool:
+    return _subset(_dfa_of(a), _dfa_of(b))
+
+
+def isdisjoint(a: Operand, b: Operand) -> bool:
+    da, db = _dfa_of(a), _dfa_of(b)
+
+    def _witness(p: int, q: int) -> Optional[bool]:
+        if p == da.dead or q == db.dead:
+            return None
+        return p in da.accepting and q in db.accepting
+
+    return not _search(da, db, _witness)
+
+
+def intersection(a: Operand, b: Operand) -> RexAutomaton:
+    alphabet, delta, labels = _product([_dfa_of(a), _dfa_of(b)], lambda x, y: x and y)
+    return RexAutomaton(f'({_describe(a)})&({_describe(b)})', minimal_dfa(alphabet, delta, labels))
+
+
+def complement(a: Operand) -> RexAutomaton:
+    alphabet, delta, labels = _product([_dfa_of(a)], lambda x: not x)
+    return RexAutomaton(f'~({_describe(a)})', minimal_dfa(alphabet, delta, labels))
+
+
+def remove_subsumed(patterns: Iterable[Operand]) -> List[Operand]:
+    items = list(patterns)
+    dfas = []
+    seen = set()
+    for item in items:
+        # equal patterns have equal languages, only the first of them is checked
+        obj = item if isinstance(item, RexAutomaton) else _compile(item)
+        dfas.append(None if obj in seen else _dfa_of(obj))
+        seen.add(obj)
+
+    # a pattern can't be a subset of another one not matching its example string
+    examples = [None if dfa is None else _example(dfa) for dfa in dfas]
+
+    def _subsumed(i: int, j: int) -> bool:
+        example = examples[i]
+        return (example is None or dfas[j].match(example)) and _subset(dfas[i], dfas[j])
+
+    kept: List[int] = []
+    for i, dfa in enumerate(dfas):
+        if dfa is None or any(_subsumed(i, j) for j in kept):
+            continue
+        kept = [j for j in kept if not _subsumed(j, i)]
+        kept.append(i)
+
+    return [items[i] for i in kept]
+
+
+#
+# Return the shortest string made of the literal symbols of the DFA and a sample
+# of every symbol set class that the DFA matches, or None if there is none.
+#
+def _example(dfa: DFA) -> Optional[Text]:
+    literals = dfa.alphabet.literals
+    symbols = list(literals) + [sym for sym in _signature_samples if sym not in literals]
+    table, size = dfa.table, len(dfa.table)
+    paths = {dfa.start: ''}
+    queue = [dfa.start]
+    for s in queue:
+        if s in dfa.accepting:
+            return paths[s]
+        if s >= size:
+            continue
+        for sym in symbols:
+            t = table[s + dfa.classify(sym)]
+            if t not in paths:
+                paths[t] = paths[s] + sym
+                queue.append(t)
+
+    return None
+
+
+def _subset(a: DFA, b: DFA) -> bool:
+    def _witness(p: int, q: int) -> Optional[bool]:
+        if p == a.dead:
+            return None
+        return q == b.dead or (p in a.accepting and q not in b.accepting)
+
+    return not _search(a, b, _witness)
+
+
+def _describe(a: Operand) -> Text:
+    if isinstance(a, RexAutomaton):
+        return a.description
+    if isinstance(a, RexPattern):
+        return a.pattern
+    return a
+
+
+#
+# Return minimal DFA of the operand. Patterns matched by other engines get
+# a DFA built for the check, RexError is raised if it is too large.
+#
+def _dfa_of(a: Operand) -> DFA:
+    if isinstance(a, RexAutomaton):
+        return a._dfa
+
+    obj = _compile(a)
+    if obj.max_errors:
+        raise RexError(f'pattern {obj.pattern!r} is approximate, its language is not supported')
+    if isinstance(obj._engine, DFA):
+        return obj._engine
+
+    dfa = build_dfa(flatten(_nfa_of(obj)), _DFA_MAX_STATES)
+    if dfa is None:
+        raise RexError(f'DFA of pattern {obj.pattern!r} exceeds the limit of {_DFA_MAX_STATES} states')
+    return dfa
+
+
+#
+# Return joint alphabet of the DFAs and, for every DFA, list of its classes
+# indexed by the joint classes.
+#
+def _joint_alphabet(dfas: List[DFA]) -> Tuple[Alphabet, List[List[int]]]:
+    literals = sorted(set().union(*(dfa.alphabet.literals for dfa in dfas)))
+    bases = tuple(sorted(set().union(*(dfa.alphabet.bases for dfa in dfas)), key=lambda fn: fn.__name__))
+    literal_map = {sym: k for k, sym in enumerate(literals)}
+    signatures = {sig: len(literal_map) + k for k, sig in enumerate(get_signatures(bases))}
+    alphabet = Alphabet(literal_map, bases, signatures, len(literal_map) + len(signatures))
+
+    class_maps = []
+    for dfa in dfas:
+        own = dfa.alphabet
+        # symbols of the signature classes are not literals of any DFA
+        positions = [bases.index(base) for base in own.bases]
+        classes = [own.classify(sym) for sym in literals]
+        classes.extend(own.signatures[tuple(sig[i] for i in positions)] for sig in signatures)
+        class_maps.append(classes)
+
+    return alphabet, class_maps
+
+
+#
+# Build product of the DFAs, labeling its states by label() of the operand states acceptance.
+# Return (alphabet, delta, labels) of the product, whose state 0 is the start one.
+#
+def _product(dfas: List[DFA], label: Callable[..., bool]) -> Tuple[Alphabet, List[List[int]], List[bool]]:
+    alphabet, class_maps = _joint_alphabet(dfas)
+    operands = [(dfa.table, len(dfa.table), dfa.accepting, classes)
+                for dfa, classes in zip(dfas, class_maps)]
+    start = tuple(dfa.start for dfa in dfas)
+    ids = {start: 0}
+    states = [start]
+    delta: List[List[int]] = []
+    labels = []
+    for state in states:
+        labels.append(label(*[s in accepting for s, (_, _, accepting, _) in zip(state, operands)]))
+        row = []
+        for k in range(alphabet.size):
+            nxt = tuple(
+                s if s >= size else table[s + classes[k]]
+                for s, (table, size, _, classes) in zip(state, operands)
+            )
+            j = ids.get(nxt)
+            if j is None:
+                if len(states) >= _PRODUCT_MAX_STATES:
+                    raise RexError(f'product automaton exceeds the limit of {_PRODUCT_MAX_STATES} states')
+                j = ids[nxt] = len(states)
+                states.append(nxt)
+            row.append(j)
+        delta.append(row)
+
+    return alphabet, delta, labels
+
+
+#
+# Search the product of two DFAs for a state (p, q) for which witness() returns True.
+# States for which it returns None are not followed.
+#
+def _search(a: DFA, b: DFA, witness: Callable[[int, int], Optional[bool]]) -> bool:
+    table_a, size_a = a.table, len(a.table)
+    table_b, size_b = b.table, len(b.table)
+    moves = _class_pairs(a.alphabet, b.alphabet)
+    start = (a.start, b.start)
+    seen = {start}
+    stack = [start]
+    while stack:
+        p, q = stack.pop()
+        found = witness(p, q)
+        if found:
+            return True
+        if found is None:
+            continue
+
+        for ka, kb in moves:
+            nxt = (p if p >= size_a else table_a[p + ka], q if q >= size_b else table_b[q + kb])
+            if nxt not in seen:
+                if len(seen) >= _PRODUCT_MAX_STATES:
+                    raise RexError(f'product automaton exceeds the limit of {_PRODUCT_MAX_STATES} states')
+                seen.add(nxt)
+                stack.append(nxt)
+
+    return False
+
+
+#
+# Return distinct pairs of classes of the two alphabets taken by the same symbol,
+# i.e. the moves of the product of their DFAs.
+#
+def _class_pairs(a: Alphabet, b: Alphabet) -> Set[Tuple[int, int]]:
+    pairs = set(_signature_pairs(a.bases, tuple(a.signatures.items()),
+                                 b.bases, tuple(b.signatures.items())))
+    for sym, k in a.literals.items():
+        pairs.add((k, b.classify(sym)))
+    for sym, k in b.literals.items():
+        if sym not in a.literals:
+            pairs.add((a.classify(sym), k))
+
+    return pairs
+
+
+#
+# Pairs of classes of the symbols that are literals of neither alphabet.
+# Patterns share a few base predicate combinations only, so the pairs are cached.
+#
+@lru_cache(maxsize=256)
+def _signature_pairs(bases_a: Tuple[Callable[[Text], bool], ...],
+                     signatures_a: Tuple[Tuple[Tuple[bool, ...], int], ...],
+                     bases_b: Tuple[Callable[[Text], bool], ...],
+                     signatures_b: Tuple[Tuple[Tuple[bool, ...], int], ...]) -> FrozenSet[Tuple[int, int]]:
+    bases = tuple(set(bases_a) | set(bases_b))
+    classes_a, classes_b = dict(signatures_a), dict(signatures_b)
+    positions_a = [bases.index(base) for base in bases_a]
+    positions_b = [bases.index(base) for base in bases_b]
+    return frozenset(
+        (classes_a[tuple(sig[i] for i in positions_a)], classes_b[tuple(sig[i] for i in positions_b)])
+        for sig in get_signatures(bases)
+    )
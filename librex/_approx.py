@@ -0,0 +1,266 @@
+#
+# Approximate matching.
+#
+# A string matches a pattern with up to k errors if at most k symbol insertions,
+# deletions and substitutions turn it into a string matched by the pattern
+# (Levenshtein distance). The NFA program (see _program.py) is simulated bit-parallel,
+# after Wu and Manber: every symbol-consuming state is a bit of a Python int, and k + 1
+# such sets R[0..k] hold the states reachable with exactly 0..k errors.
+#
+# Consuming a symbol c maps R[j] to
+#   F((R[j] & B[c]) | R[j - 1] | R'[j - 1]) | R[j - 1] | R'[j - 1]
+# where B[c] is the set of states accepting c, F() follows the arrows of a set of states
+# to the consuming states (or to the MATCH bit) next to them, and R' are the new sets:
+# matched symbols, substitutions and deletions move through F(), insertions keep
+# the old set of a lower level. Every R[j] includes R[j - 1], so the string
+# matches if the MATCH bit is set in R[k] at its end.
+#
+# Most states lead to a single consuming state; those are numbered so that it gets
+# the next bit, and F() shifts them by one bit at once. Only the states with other
+# arrows (alternations, loops) are followed one by one.
+#
+# EARLY_MATCH state, which accepts the rest of the string, is a consuming state
+# accepting any symbol and leading to itself; so is the start state of an empty pattern.
+#
+from __future__ import annotations
+
+import sys
+from time import monotonic
+
+from ._impl import RexBudgetError, _DEADLINE_INTERVAL
+from ._program import Program, SYM, SYM_SET, EARLY_MATCH, MATCH, SPLIT
+
+TYPE_CHECKING = False
+if TYPE_CHECKING:
+    from typing import Text, Optional, List, Dict, Tuple
+
+#
+# Limit of symbols whose sets of accepting states are memorized.
+#
+_SYM_MAP_MAX = 4096
+
+
+class ApproxNFA(object):
+    __slots__ = ('max_errors', 'nbits', '_preds', '_start', '_accept', '_any', '_shift', '_follow',
+                 '_sym_map')
+
+    name = 'approx'
+
+    def __init__(self, prog: Program, max_errors: int) -> None:
+        self.max_errors = max_errors
+
+        # number the consuming states, each one right after the state leading to it if possible
+        bit_of: Dict[int, int] = {}
+        order: List[int] = []
+        for i in _consuming_order(prog):
+            bit_of[i] = len(order)
+            order.append(i)
+        self.nbits = len(order) + 2
+        accept = 1 << len(order)
+        any_bit = 1 << (len(order) + 1)
+
+        def _mask(indices: List[int]) -> int:
+            mask = 0
+            for i in _closure(prog, indices):
+                kind = prog.kinds[i]
+                if kind == MATCH:
+                    mask |= accept
+                elif kind == EARLY_MATCH:
+                    mask |= any_bit
+                else:
+                    mask |= 1 << bit_of[i]
+            return mask
+
+        shift = 0
+        follow: Dict[int, int] = {any_bit: any_bit}
+        for b, i in enumerate(order):
+            mask = _mask([prog.out[i]])
+            if mask == 1 << (b + 1):
+                shift |= 1 << b
+            else:
+                follow[1 << b] = mask
+
+        self._preds = [(1 << bit_of[i], prog.kinds[i], prog.syms[i]) for i in order]
+        # a pattern starting with MATCH state matches any string (see _match() in _impl.py)
+        self._start = any_bit if prog.kinds[prog.start] == MATCH else _mask([prog.start])
+        self._accept = accept | any_bit
+        self._any = any_bit
+        self._shift = shift
+        self._follow = follow
+        self._sym_map: Dict[Text, int] = {}
+
+    def __repr__(self) -> str:
+        return f'<ApproxNFA states={self.nbits - 2} max_errors={self.max_errors}>'
+
+    def memory_estimate(self) -> int:
+        return sys.getsizeof(self._follow) + sys.getsizeof(self._sym_map) + sys.getsizeof(self._preds)
+
+    #
+    # Return set of the states accepting the symbol.
+    #
+    def accepting(self, sym: Text) -> int:
+        mask = self._any
+        for bit, kind, pred in self._preds:
+            if kind == SYM:
+                if pred == sym:
+                    mask |= bit
+            elif pred(sym):
+                mask |= bit
+        if len(self._sym_map) < _SYM_MAP_MAX:
+            self._sym_map[sym] = mask
+
+        return mask
+
+    #
+    # Return sets of the states reachable with 0..max_errors errors before any symbol is read.
+    #
+    def initial(self) -> List[int]:
+        levels = [self._start]
+        for _ in range(self.max_errors):
+            levels.append(levels[-1] | self._next(levels[-1]))
+        return levels
+
+    def _next(self, states: int) -> int:
+        follow = self._follow
+        mask = (states & self._shift) << 1
+        rest = states & ~self._shift
+        while rest:
+            bit = rest & -rest
+            mask |= follow.get(bit, 0)
+            rest ^= bit
+        return mask
+
+    def step(self, levels: List[int], sym: Text) -> List[int]:
+        b = self._sym_map.get(sym)
+        if b is None:
+            b = self.accepting(sym)
+
+        next_states = self._next
+        prev = levels[0]
+        cur = next_states(prev & b)
+        result = [cur]
+        for old in levels[1:]:
+            lower = prev | cur
+            prev = old
+            cur = next_states((old & b) | lower) | lower
+            result.append(cur)
+        return result
+
+    def match(self, string: Text) -> bool:
+        levels = self.initial()
+        any_bit = self._any
+        for sym in string:
+            last = levels[-1]
+            if not last:
+                return False
+            if last & any_bit:
+                return True
+            levels = self.step(levels, sym)
+
+        return bool(levels[-1] & self._accept)
+
+    def match_counted(self, string: Text, budget: Optional[int],
+                      deadline: Optional[float]) -> Tuple[bool, int, int, int]:
+        levels = self.initial()
+        any_bit = self._any
+        misses = 0
+        visits = 0
+        consumed = 0
+        for sym in string:
+            last = levels[-1]
+            if not last or last & any_bit:
+                break
+            visits += sum(bin(states).count('1') for states in levels)
+            if budget is not None and visits > budget:
+                raise RexBudgetError(f'budget of {budget} state visits exceeded at position {consumed}')
+            if deadline is not None and consumed % _DEADLINE_INTERVAL == 0 and monotonic() > deadline:
+                raise RexBudgetError(f'deadline exceeded at position {consumed}')
+
+            if sym not in self._sym_map:
+                misses += 1
+            levels = self.step(levels, sym)
+            consumed += 1
+
+        return bool(levels[-1] & self._accept), consumed, visits, misses
+
+    def stream(self) -> 'ApproxStream':
+        return ApproxStream(self)
+
+
+class ApproxStream(object):
+    __slots__ = ('_engine', '_levels', 'result')
+
+    def __init__(self, engine: ApproxNFA) -> None:
+        self._engine = engine
+        self._levels = engine.initial()
+        self.result: Optional[bool] = None
+        self._check()
+
+    def _check(self) -> None:
+        last = self._levels[-1]
+        if not last:
+            self.result = False
+        elif last & self._engine._any:
+            self.result = True
+
+    def feed(self, chunk: Text, start: int = 0, end: Optional[int] = None) -> None:
+        if self.result is not None:
+            return
+
+        step = self._engine.step
+        levels = self._levels
+        for i in range(start, len(chunk) if end is None else end):
+            levels = step(levels, chunk[i])
+            if not levels[-1] or levels[-1] & self._engine._any:
+                break
+        self._levels = levels
+        self._check()
+
+    def close(self) -> bool:
+        if self.result is None:
+            self.result = bool(self._levels[-1] & self._engine._accept)
+        return self.result
+
+
+#
+# Return indices of the states reached from the given ones by unlabeled arrows,
+# including consuming, MATCH and EARLY_MATCH states.
+#
+def _closure(prog: Program, indices: List[int]) -> List[int]:
+    result = []
+    seen = set()
+    stack = list(reversed(indices))
+    while stack:
+        i = stack.pop()
+        if i < 0 or i in seen:
+            continue
+
+        seen.add(i)
+        if prog.kinds[i] == SPLIT:
+            stack.append(prog.out1[i])
+            stack.append(prog.out[i])
+        else:
+            result.append(i)
+
+    return result
+
+
+#
+# Return indices of the consuming states, in such an order that a state leading to
+# a single consuming state is followed by it whenever possible (e.g. along concatenations).
+#
+def _consuming_order(prog: Program) -> List[int]:
+    kinds = prog.kinds
+    order = []
+    seen = set()
+    for first in _closure(prog, [prog.start]) + list(range(len(prog))):
+        i = first
+        while kinds[i] in (SYM, SYM_SET) and i not in seen:
+            seen.add(i)
+            order.append(i)
+            nxt = [j for j in _closure(prog, [prog.out[i]]) if kinds[j] in (SYM, SYM_SET)]
+            if len(nxt) != 1:
+                break
+            i = nxt[0]
+
+    return order
@@ -0,0 +1,264 @@
+#
+# Prefix-sharing batch matching.
+#
+# Strings of sorted batches (URLs, file paths, keys) share long prefixes with their
+# neighbours. match_sorted() keeps the automaton states reached after every prefix of
+# the previous string and resumes each string from the state of the longest prefix
+# it shares with the previous one. Unsorted batches are matched correctly as well,
+# their neighbours just share less.
+#
+# match_keys() puts the keys into a trie and walks it depth first, so that every
+# shared prefix is matched once. Once the result below a prefix is known (no NFA state
+# is left, a trailing '.*' is reached), the whole subtree of the prefix is decided
+# without walking it.
+#
+# Engines are driven by steppers, which expose the state of the automaton between
+# symbols. Only the NFA simulations have them: a step of a table engine (the DFAs) costs
+# no more than keeping the state it reaches, or than a symbol of a trie, so sharing prefixes
+# doesn't pay off for them. Table engines, literal ones and the reversed DFA (which reads
+# strings from the end) match every string on their own, as do patterns collecting statistics.
+#
+from __future__ import annotations
+
+from abc import ABC, abstractmethod
+
+from ._approx import ApproxNFA
+from ._impl import RexPattern, _StateType, _nfa_of, _start_list, _step
+from ._tiers import _tiering, promote as _promote
+
+TYPE_CHECKING = False
+if TYPE_CHECKING:
+    from typing import Any, Text, Optional, Iterable, List, Dict, Set, Tuple
+
+
+class _Stepper(ABC):
+    __slots__ = ('start',)
+
+    def __init__(self, start: Any) -> None:
+        self.start = start
+
+    @abstractmethod
+    def step(self, state: Any, sym: Text) -> Any:
+        pass
+
+    #
+    # Return the result if it doesn't depend on the rest of the string, None otherwise.
+    #
+    @abstractmethod
+    def decided(self, state: Any) -> Optional[bool]:
+        pass
+
+    @abstractmethod
+    def final(self, state: Any) -> bool:
+        pass
+
+    #
+    # Step from states[-1] past string[pos:], appending the states reached after every
+    # symbol to states, until the result is known. Return the result.
+    #
+    def walk(self, states: List[Any], string: Text, pos: int) -> bool:
+        state = states[-1]
+        result = self.decided(state)
+        if result is not None:
+            return result
+
+        step = self.step
+        decided = self.decided
+        for i in range(pos, len(string)):
+            state = step(state, string[i])
+            states.append(state)
+            result = decided(state)
+            if result is not None:
+                return result
+
+        return self.final(state)
+
+
+class _NFAStepper(_Stepper):
+    __slots__ = ('_session',)
+
+    def __init__(self, obj: RexPattern) -> None:
+        nfa = _nfa_of(obj)
+        self._session = obj._m_session
+        start: Optional[List[Any]] = None
+        if nfa.s_type != _StateType.MATCH:
+            try:
+                start = _start_list(self._session, nfa)
+            except StopIteration:
+                pass
+        super().__init__(start)
+
+    def step(self, state: Any, sym: Text) -> Any:
+        try:
+            return _step(state, self._session, sym)
+        except StopIteration:
+            return None
+
+    def decided(self, state: Any) -> Optional[bool]:
+        if state is None:
+            return True
+        return None if state else False
+
+    def final(self, state: Any) -> bool:
+        return any(s.s_type == _StateType.MATCH for s in state)
+
+
+class _ApproxStepper(_Stepper):
+    __slots__ = ('_nfa',)
+
+    def __init__(self, nfa: ApproxNFA) -> None:
+        super().__init__(nfa.initial())
+        self._nfa = nfa
+
+    def step(self, state: Any, sym: Text) -> Any:
+        return self._nfa.step(state, sym)
+
+    def decided(self, state: Any) -> Optional[bool]:
+        last = state[-1]
+        if not last:
+            return False
+        return True if last & self._nfa._any else None
+
+    def final(self, state: Any) -> bool:
+        return bool(state[-1] & self._nfa._accept)
+
+
+#
+# Return stepper for the current engine of the pattern or None if the engine has no stepper.
+#
+def _stepper_of(obj: RexPattern) -> Optional[_Stepper]:
+    engine = obj._engine
+    if engine is None:
+        return _NFAStepper(obj)
+    if isinstance(engine, ApproxNFA):
+        return _ApproxStepper(engine)
+    return None
+
+
+#
+# Count match() calls of the pattern matched by the default engine (see _tiers.py).
+#
+def _count_calls(obj: RexPattern, n: int) -> None:
+    if obj._engine is None and obj._calls is not None:
+        obj._calls += n
+        if obj._calls >= _tiering.threshold:
+            _promote(obj)
+
+
+#
+# Return the largest n <= limit such that a and b share the first n symbols.
+# Slices are compared by halves, so that symbols are not compared one by one in Python.
+#
+def _common_prefix(a: Text, b: Text, limit: int) -> int:
+    lo, hi = 0, min(len(a), len(b), limit)
+    if b.startswith(a[:hi]):
+        return hi
+
+    while lo < hi:
+        mid = (lo + hi + 1) // 2
+        if b.startswith(a[lo:mid], lo):
+            lo = mid
+        else:
+            hi = mid - 1
+
+    return lo
+
+
+#
+# Stands for the engine of the pattern before the first string.
+#
+_UNSET = object()
+
+
+def match_sorted(obj: RexPattern, strings: Iterable[Text]) -> List[bool]:
+    results: List[bool] = []
+    append = results.append
+    engine: Any = _UNSET
+    stepper: Optional[_Stepper] = None
+    # states[i] is the state reached after i symbols of prev
+    states: List[Any] = []
+    prev = ''
+    for string in strings:
+        if obj._stats is not None:
+            append(obj.match(string))
+            continue
+
+        if obj._calls is not None and obj._engine is None:
+            _count_calls(obj, 1)
+        if obj._engine is not engine:
+            # the first string, or the pattern was promoted or demoted meanwhile
+            engine = obj._engine
+            stepper = _stepper_of(obj)
+            if stepper is not None:
+                walk = stepper.walk
+                states = [stepper.start]
+                prev = ''
+        if stepper is None:
+            append(engine.match(string))
+            continue
+
+        kept = _common_prefix(prev, string, len(states) - 1)
+        del states[kept + 1:]
+        append(walk(states, string, kept))
+        prev = string
+
+    return results
+
+
+def match_keys(obj: RexPattern, keys: Iterable[Text]) -> Set[Text]:
+    if obj._stats is not None or (obj._engine is not None and _stepper_of(obj) is None):
+        return {key for key in keys if obj.match(key)}
+
+    # nested dictionaries keyed by symbols, a key ending at a node is kept under None
+    root: Dict[Any, Any] = {}
+    count = 0
+    for key in keys:
+        node = root
+        for sym in key:
+            nxt = node.get(sym)
+            if nxt is None:
+                nxt = node[sym] = {}
+            node = nxt
+        node[None] = key
+        count += 1
+
+    # the keys are matched at once, every one of them counts as a call for tiering
+    _count_calls(obj, count)
+    matched: Set[Text] = set()
+    stepper = _stepper_of(obj)
+    if stepper is None:
+        # promoted to an engine without stepper
+        _collect(root, matched)
+        return {key for key in matched if obj._engine.match(key)}
+
+    stack: List[Tuple[Dict[Any, Any], Any]] = [(root, stepper.start)]
+    while stack:
+        node, state = stack.pop()
+        result = stepper.decided(state)
+        if result is not None:
+            if result:
+                _collect(node, matched)
+            continue
+
+        for sym, child in node.items():
+            if sym is None:
+                if stepper.final(state):
+                    matched.add(child)
+            else:
+                stack.append((child, stepper.step(state, sym)))
+
+    return matched
+
+
+#
+# Add all the keys of the subtree to matched.
+#
+def _collect(node: Dict[Any, Any], matched: Set[Text]) -> None:
+    stack = [node]
+    while stack:
+        node = stack.pop()
+        for sym, child in node.items():
+            if sym is None:
+                matched.add(child)
+            else:
+                stack.append(child)
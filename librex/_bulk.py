@@ -0,0 +1,227 @@
+#
+# Bulk compilation.
+#
+# compile_many() compiles large sets of patterns at once. Identical pattern strings are
+# compiled once; the distinct ones are split into chunks compiled by worker processes
+# (or threads on Python built without the GIL, see _aio.py).
+#
+# Workers send compiled patterns back pickled. A pattern is pickled as its program
+# (see dump_program()): a tuple of plain values holding the postfix form, the plan,
+# the engine and, for patterns matched by the NFA, the flattened NFA (see _program.py),
+# so load_program() rebuilds it without parsing, planning or building any automaton again.
+#
+# Hash-consing (see _hashcons() in _impl.py) is most of the work of building an NFA, so it
+# isn't repeated for rebuilt NFAs: their states are shared within the pattern only,
+# not with the states of the other patterns of the process.
+#
+# A pattern that fails to compile doesn't abort the batch: its RexError is returned
+# instead, along with the patterns that compiled.
+#
+from __future__ import annotations
+
+import itertools
+import os
+import pickle
+from time import perf_counter
+
+from ._impl import RexError, RexPattern, _compile, _nfa_of, _DFA_MAX_STATES
+from ._program import Program, flatten, expand
+
+TYPE_CHECKING = False
+if TYPE_CHECKING:
+    from typing import Any, Text, Iterable, Iterator, Optional, List, Dict, Tuple
+
+    _Options = Tuple[Optional[Text], int, bool, int]
+    _Result = Tuple[Optional[bytes], Optional[Tuple[Text, Optional[int]]], float]
+
+#
+# Version of the program tuples, their first item.
+#
+_VERSION = 1
+
+#
+# Maximum number of patterns sent to a worker at once.
+#
+_MAX_CHUNK = 256
+
+
+class RexBatch(object):
+    """Patterns compiled by compile_many().
+
+    Attributes:
+        patterns: Compiled patterns in the order of the given ones, None for the ones that failed to compile
+        errors: Dictionary mapping indices of the patterns that failed to compile to their RexError
+        stats: Dictionary of statistics of the whole batch (see compile_many())
+    """
+    __slots__ = ('patterns', 'errors', 'stats')
+
+    def __init__(self, patterns: List[Optional[RexPattern]], errors: Dict[int, RexError],
+                 stats: Dict[Text, Any]) -> None:
+        self.patterns = patterns
+        self.errors = errors
+        self.stats = stats
+
+    def __repr__(self) -> str:
+        return f'<RexBatch patterns={len(self.patterns)} errors={len(self.errors)}>'
+
+    def __len__(self) -> int:
+        return len(self.patterns)
+
+    def __getitem__(self, index: int) -> Optional[RexPattern]:
+        return self.patterns[index]
+
+    def __iter__(self) -> Iterator[Optional[RexPattern]]:
+        return iter(self.patterns)
+
+
+#
+# Return the program of the compiled pattern, the tuple load_program() rebuilds it from.
+#
+def dump_program(obj: RexPattern) -> tuple:
+    engine = _detached(obj._engine)
+    nfa = None
+    if engine is None:
+        prog = flatten(_nfa_of(obj))
+        nfa = (prog.kinds, prog.syms, prog.out, prog.out1, prog.start)
+
+    plan = None if obj._plan is None else list(obj._plan)
+    return (_VERSION, obj.pattern, obj._ignorecase, obj._max_errors, obj._postfix, plan, engine, nfa,
+            obj._calls is not None, obj._max_dfa_states, obj._requested)
+
+
+def load_program(program: tuple) -> RexPattern:
+    if not program or program[0] != _VERSION:
+        version = program[0] if program else None
+        raise RexError(f'unsupported version of the compiled pattern program: {version}')
+
+    _, pattern, ignorecase, max_errors, postfix, plan, engine, nfa, tiered, max_dfa_states, requested = \
+        program
+    obj = RexPattern(pattern, _postfix=postfix, ignorecase=ignorecase)
+    obj._max_errors = max_errors
+    obj._plan = plan
+    obj._engine = engine
+    obj._max_dfa_states = max_dfa_states
+    obj._requested = requested
+    if nfa is not None:
+        obj._nfa = expand(Program(*nfa))
+    # the call counter starts over, like statistics and caches, which aren't pickled
+    if tiered:
+        obj._calls = 0
+    return obj
+
+
+#
+# DFAs attached to shared tables (see _shared.py) index memoryviews, which can't be pickled;
+# return a copy of such engine with the table of its own.
+#
+def _detached(engine: Any) -> Any:
+    if engine is None or engine.name not in ('dfa', 'reverse'):
+        return engine
+
+    from copy import copy
+    from ._dfa import ReverseDFA
+
+    dfa = engine.dfa if isinstance(engine, ReverseDFA) else engine
+    if not isinstance(dfa.table, memoryview):
+        return engine
+
+    dfa = copy(dfa)
+    dfa.table = dfa.table.tolist()
+    return ReverseDFA(dfa) if isinstance(engine, ReverseDFA) else dfa
+
+
+def _compile_one(pattern: Text,
+                 options: _Options) -> Tuple[Optional[RexPattern], Optional[RexError], float]:
+    engine, max_dfa_states, ignorecase, max_errors = options
+    started = perf_counter()
+    try:
+        obj = _compile(pattern, engine, max_dfa_states, ignorecase=ignorecase, max_errors=max_errors)
+    except RexError as e:
+        return None, e, perf_counter() - started
+    return obj, None, perf_counter() - started
+
+
+#
+# Compile the patterns in a worker, returning pickled patterns, or messages
+# and positions of their errors, along with compile times.
+#
+def _compile_chunk(patterns: List[Text], options: _Options) -> List[_Result]:
+    results: List[_Result] = []
+    for pattern in patterns:
+        obj, error, seconds = _compile_one(pattern, options)
+        if error is not None:
+            results.append((None, (error.message, error.pos), seconds))
+        else:
+            results.append((pickle.dumps(obj, pickle.HIGHEST_PROTOCOL), None, seconds))
+    return results
+
+
+def _executor(workers: int) -> Any:
+    from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+    from ._aio import _gil_enabled
+
+    cls = ProcessPoolExecutor if _gil_enabled() else ThreadPoolExecutor
+    return cls(workers)
+
+
+def compile_many(patterns: Iterable[Text], workers: Optional[int] = None, engine: Optional[Text] = None,
+                 max_dfa_states: int = _DFA_MAX_STATES, ignorecase: bool = False,
+                 max_errors: int = 0) -> RexBatch:
+    started = perf_counter()
+    patterns = list(patterns)
+    unique = list(dict.fromkeys(patterns))
+    if workers is None:
+        workers = os.cpu_count() or 1
+    if workers < 1:
+        raise ValueError('workers must be positive')
+    workers = max(1, min(workers, len(unique)))
+    options: _Options = (engine, max_dfa_states, ignorecase, max_errors)
+
+    compiled: Dict[Text, RexPattern] = {}
+    failed: Dict[Text, RexError] = {}
+    compile_time = 0.0
+    load_time = 0.0
+    program_size = 0
+    if workers == 1:
+        for pattern in unique:
+            obj, error, seconds = _compile_one(pattern, options)
+            compile_time += seconds
+            if error is not None:
+                failed[pattern] = error
+            else:
+                compiled[pattern] = obj
+    else:
+        size = max(1, min(_MAX_CHUNK, len(unique) // (workers * 4)))
+        chunks = [unique[i:i + size] for i in range(0, len(unique), size)]
+        with _executor(workers) as executor:
+            results = executor.map(_compile_chunk, chunks, itertools.repeat(options))
+            for chunk, chunk_results in zip(chunks, results):
+                for pattern, (data, error, seconds) in zip(chunk, chunk_results):
+                    compile_time += seconds
+                    if error is not None:
+                        failed[pattern] = RexError(*error)
+                        continue
+                    loaded = perf_counter()
+                    compiled[pattern] = pickle.loads(data)
+                    load_time += perf_counter() - loaded
+                    program_size += len(data)
+
+    engines: Dict[Text, int] = {}
+    for obj in compiled.values():
+        engines[obj.engine] = engines.get(obj.engine, 0) + 1
+
+    stats = {
+        'patterns': len(patterns),
+        'unique': len(unique),
+        'compiled': len(compiled),
+        'failed': len(failed),
+        'workers': workers,
+        'elapsed': perf_counter() - started,
+        'compile_time': compile_time,
+        'load_time': load_time,
+        'program_size': program_size,
+        'memory': sum(obj.memory_estimate for obj in compiled.values()),
+        'engines': engines,
+    }
+    errors = {i: failed[pattern] for i, pattern in enumerate(patterns) if pattern in failed}
+    return RexBatch([compiled.get(pattern) for pattern in patterns], errors, stats)
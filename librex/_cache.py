@@ -0,0 +1,135 @@
+#
+# Per-pattern cache of match() results.
+#
+# Caches are opt-in, like statistics: patterns without one don't pay for it. A cache maps
+# recently matched strings to their results in least recently used order; it is bounded
+# both by the number of entries and by the total number of symbols of the cached strings,
+# so that a few long strings can't pin large amounts of memory. Strings longer than
+# the whole size limit are not cached at all.
+#
+# The entries and counters are updated under a lock, so a pattern can be matched
+# by several threads at once.
+#
+from __future__ import annotations
+
+from _thread import allocate_lock
+from collections import OrderedDict
+
+TYPE_CHECKING = False
+if TYPE_CHECKING:
+    from typing import Text, Any, Optional, Dict
+
+#
+# Default limits of the number of entries and of their total number of symbols.
+#
+DEFAULT_MAX_ENTRIES = 4096
+DEFAULT_MAX_SIZE = 1024 * 1024
+
+
+class RexCache(object):
+    """Bounded cache of match() results of a compiled regular expression.
+
+    Attributes:
+        max_entries: Maximum number of cached strings
+        max_size: Maximum total number of symbols of the cached strings
+        hits: Number of match() calls answered by the cache
+        misses: Number of match() calls that ran the automaton
+        evictions: Number of entries dropped to keep the cache within its limits
+    """
+    __slots__ = ('max_entries', 'max_size', 'hits', 'misses', 'evictions', '_entries', '_size', '_lock')
+
+    def __init__(self, max_entries: int = DEFAULT_MAX_ENTRIES, max_size: int = DEFAULT_MAX_SIZE) -> None:
+        if max_entries < 1 or max_size < 1:
+            raise ValueError('cache limits must be positive')
+
+        self.max_entries = max_entries
+        self.max_size = max_size
+        self._entries: OrderedDict[Text, bool] = OrderedDict()
+        self._size = 0
+        self._lock = allocate_lock()
+        self.reset()
+
+    def __repr__(self) -> str:
+        return 'RexCache({})'.format(', '.join(f'{k}={v!r}' for k, v in self.as_dict().items()))
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @property
+    def size(self) -> int:
+        """Total number of symbols of the cached strings."""
+        return self._size
+
+    @property
+    def hit_rate(self) -> float:
+        """Ratio of hits to all lookups, 0.0 if there were none."""
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def reset(self) -> None:
+        """Set all counters to zero, keeping the entries."""
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def clear(self) -> None:
+        """Drop all entries, keeping the counters."""
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+
+    def resize(self, max_entries: int, max_size: int) -> None:
+        """Change the limits, dropping the least recently used entries beyond them."""
+        if max_entries < 1 or max_size < 1:
+            raise ValueError('cache limits must be positive')
+
+        with self._lock:
+            self.max_entries = max_entries
+            self.max_size = max_size
+            self._evict()
+
+    def as_dict(self) -> Dict[Text, Any]:
+        """Return limits, counters, number of entries and their size as a dictionary."""
+        return {
+            'max_entries': self.max_entries,
+            'max_size': self.max_size,
+            'entries': len(self._entries),
+            'size': self._size,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'hit_rate': self.hit_rate,
+        }
+
+    #
+    # Return cached result for the string or None, counting the lookup.
+    #
+    def get(self, string: Text) -> Optional[bool]:
+        with self._lock:
+            result = self._entries.get(string)
+            if result is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+                self._entries.move_to_end(string)
+
+        return result
+
+    def put(self, string: Text, result: bool) -> None:
+        if len(string) > self.max_size:
+            return
+
+        with self._lock:
+            if string in self._entries:
+                # put by another thread meanwhile
+                return
+            self._entries[string] = result
+            self._size += len(string)
+            self._evict()
+
+    def _evict(self) -> None:
+        entries = self._entries
+        while len(entries) > self.max_entries or self._size > self.max_size:
+            string, _ = entries.popitem(last=False)
+            self._size -= len(string)
+            self.evictions += 1
@@ -0,0 +1,83 @@
+#
+# Case folding for patterns compiled with ignorecase=True.
+#
+# Symbols match each other ignoring case if their lowercase forms are equal, or if they are
+# listed as equivalent in _EXTRA_CASES, the way the stdlib re module does it. Literal symbols
+# of the pattern are replaced by sets of all their case variants at compile time (see
+# _re2post() and _post2nfa()), so that the input is never transformed.
+#
+# _EXTRA_CASES maps a lowercase symbol to the symbols equivalent to it besides its uppercase
+# and titlecase forms: the ones re treats as equivalent (like 's' and LATIN SMALL LETTER
+# LONG S) and uppercase symbols that are not the uppercase form of their own lowercase one
+# (like KELVIN SIGN). It was generated by scanning the Unicode 14.0.0 database; LATIN CAPITAL
+# LETTER I WITH DOT ABOVE was added by hand, since its lowercase form is two symbols long.
+#
+from __future__ import annotations
+
+TYPE_CHECKING = False
+if TYPE_CHECKING:
+    from typing import Text, Dict, FrozenSet
+
+_EXTRA_CASES = {
+    '\u0069': '\u0130\u0131', '\u006b': '\u212a', '\u0073': '\u017f', '\u00b5': '\u03bc',
+    '\u00df': '\u1e9e', '\u00e5': '\u212b', '\u0130': '\u0069', '\u0131': '\u0069', '\u017f': '\u0073',
+    '\u0345': '\u03b9\u1fbe', '\u0390': '\u1fd3', '\u03b0': '\u1fe3', '\u03b2': '\u03d0',
+    '\u03b5': '\u03f5', '\u03b8': '\u03d1\u03f4', '\u03b9': '\u0345\u1fbe', '\u03ba': '\u03f0',
+    '\u03bc': '\u00b5', '\u03c0': '\u03d6', '\u03c1': '\u03f1', '\u03c2': '\u03c3',
+    '\u03c3': '\u03c2', '\u03c6': '\u03d5', '\u03c9': '\u2126', '\u03d0': '\u03b2',
+    '\u03d1': '\u03b8', '\u03d5': '\u03c6', '\u03d6': '\u03c0', '\u03f0': '\u03ba',
+    '\u03f1': '\u03c1', '\u03f5': '\u03b5', '\u0432': '\u1c80', '\u0434': '\u1c81',
+    '\u043e': '\u1c82', '\u0441': '\u1c83', '\u0442': '\u1c84\u1c85', '\u044a': '\u1c86',
+    '\u0463': '\u1c87', '\u1c80': '\u0432', '\u1c81': '\u0434', '\u1c82': '\u043e',
+    '\u1c83': '\u0441', '\u1c84': '\u0442\u1c85', '\u1c85': '\u0442\u1c84', '\u1c86': '\u044a',
+    '\u1c87': '\u0463', '\u1c88': '\ua64b', '\u1e61': '\u1e9b', '\u1e9b': '\u1e61',
+    '\u1fbe': '\u0345\u03b9', '\u1fd3': '\u0390', '\u1fe3': '\u03b0', '\ua64b': '\u1c88',
+    '\ufb05': '\ufb06', '\ufb06': '\ufb05',
+}
+
+
+class FoldedSet(frozenset):
+    """Symbol set predicate accepting the case variants of a symbol."""
+    __slots__ = ()
+
+    __call__ = frozenset.__contains__
+
+    def __repr__(self) -> str:
+        return f'FoldedSet({"".join(sorted(self))!r})'
+
+
+_folded_sets: Dict[Text, FoldedSet] = {}
+
+
+def _key(sym: Text) -> Text:
+    lower = sym.lower()
+    return lower if len(lower) == 1 else sym
+
+
+#
+# Return all symbols equal to sym ignoring case, sym included.
+#
+def case_variants(sym: Text) -> FrozenSet[Text]:
+    variants = {sym}
+    todo = [sym]
+    while todo:
+        key = _key(todo.pop())
+        for variant in (key, key.upper(), key.title()) + tuple(_EXTRA_CASES.get(key, '')):
+            if len(variant) == 1 and variant not in variants:
+                variants.add(variant)
+                todo.append(variant)
+
+    return frozenset(variants)
+
+
+#
+# Return symbol set predicate for sym ignoring case; equal sets are shared.
+#
+def folded_set(sym: Text) -> FoldedSet:
+    folded = _folded_sets.get(sym)
+    if folded is None:
+        folded = FoldedSet(case_variants(sym))
+        for variant in folded:
+            _folded_sets[variant] = folded
+
+    return folded
@@ -0,0 +1,216 @@
+#
+# Compact DFA transition storage.
+#
+# The dense table of a DFA (see _dfa.py) takes a row of nclasses entries per state. DFAs
+# of patterns with many literal symbols (alternations of words, long literal parts) have
+# many classes, while most of their states move to the dead state on nearly all of them,
+# so the dense table is mostly filled with the same few targets.
+#
+# Here every state gets a default target, the most common one in its row, and only the
+# other transitions are stored. The sparse rows are packed into a single comb vector by row
+# displacement (as in Tarjan and Yao's "Storing a sparse table"): row of state s is placed
+# at offset base[s], so that its transitions on classes k land in the free slots base[s] + k;
+# the check vector records the state owning every slot. The next state is
+#
+#   nxt[base[s] + k] if check[base[s] + k] == s else default[s]
+#
+# Rows are placed first-fit, the longest ones first. All vectors are 32-bit array buffers
+# rather than lists of int objects.
+#
+# States are numbered from 0; like in the dense table, sink states get numbers past the end
+# of the base vector, so that the next lookup raises IndexError and stops matching.
+#
+from __future__ import annotations
+
+import sys
+from array import array
+from time import monotonic
+
+from ._dfa import DFA, Alphabet, _CHAR_MAP_MAX
+from ._impl import RexBudgetError, _DEADLINE_INTERVAL
+
+TYPE_CHECKING = False
+if TYPE_CHECKING:
+    from typing import Text, Optional, List, Dict, Tuple
+
+
+class CompactDFA(object):
+    __slots__ = ('nclasses', 'nstates', 'start', 'accepting', 'alphabet', 'dead', 'accept_all',
+                 '_base', '_default', '_check', '_next', '_char_map')
+
+    name = 'compact'
+
+    def __init__(self, dfa: DFA) -> None:
+        nclasses = dfa.nclasses
+        nrows = len(dfa.table) // nclasses
+        self.nclasses = nclasses
+        self.nstates = dfa.nstates
+        self.start = dfa.start // nclasses
+        self.accepting = frozenset(s // nclasses for s in dfa.accepting)
+        self.alphabet: Alphabet = dfa.alphabet
+        self.dead = dfa.dead // nclasses if dfa.dead >= 0 else -1
+        self.accept_all = dfa.accept_all // nclasses if dfa.accept_all >= 0 else -1
+
+        rows = [[t // nclasses for t in dfa.table[s * nclasses:(s + 1) * nclasses]] for s in range(nrows)]
+        self._default = array('i', [_most_common(row) for row in rows])
+        self._base, self._check, self._next = _pack(rows, self._default, nclasses)
+        self._char_map = dict(dfa.alphabet.literals)
+
+    def __repr__(self) -> str:
+        return f'<CompactDFA states={self.nstates} classes={self.nclasses} slots={len(self._next)}>'
+
+    def memory_estimate(self) -> int:
+        return (sys.getsizeof(self._base) + sys.getsizeof(self._default) + sys.getsizeof(self._check)
+                + sys.getsizeof(self._next) + sys.getsizeof(self._char_map))
+
+    def classify(self, sym: Text) -> int:
+        k = self.alphabet.classify(sym)
+        if len(self._char_map) < _CHAR_MAP_MAX:
+            self._char_map[sym] = k
+
+        return k
+
+    def match(self, string: Text) -> bool:
+        base = self._base
+        default = self._default
+        check = self._check
+        nxt = self._next
+        char_map = self._char_map
+        s = self.start
+        try:
+            for sym in string:
+                k = char_map.get(sym)
+                if k is None:
+                    k = self.classify(sym)
+                i = base[s] + k
+                s = nxt[i] if check[i] == s else default[s]
+        except IndexError:
+            # s is a sink state
+            pass
+
+        return s in self.accepting
+
+    def match_counted(self, string: Text, budget: Optional[int],
+                      deadline: Optional[float]) -> Tuple[bool, int, int, int]:
+        base = self._base
+        default = self._default
+        check = self._check
+        nxt = self._next
+        char_map = self._char_map
+        nrows = len(base)
+        s = self.start
+        misses = 0
+        consumed = 0
+        for sym in string:
+            if s >= nrows:
+                break
+            if budget is not None and consumed >= budget:
+                raise RexBudgetError(f'budget of {budget} state visits exceeded at position {consumed}')
+            if deadline is not None and consumed % _DEADLINE_INTERVAL == 0 and monotonic() > deadline:
+                raise RexBudgetError(f'deadline exceeded at position {consumed}')
+
+            k = char_map.get(sym)
+            if k is None:
+                k = self.classify(sym)
+                misses += 1
+            i = base[s] + k
+            s = nxt[i] if check[i] == s else default[s]
+            consumed += 1
+
+        return s in self.accepting, consumed, consumed, misses
+
+    def stream(self) -> 'CompactStream':
+        return CompactStream(self)
+
+
+#
+# Incremental matching, see _NFAStream in _impl.py.
+#
+class CompactStream(object):
+    __slots__ = ('_dfa', '_state', 'result')
+
+    def __init__(self, dfa: CompactDFA) -> None:
+        self._dfa = dfa
+        self._state = dfa.start
+        self.result: Optional[bool] = None
+        if dfa.start >= len(dfa._base):
+            self.result = dfa.start in dfa.accepting
+
+    def feed(self, chunk: Text, start: int = 0, end: Optional[int] = None) -> None:
+        if self.result is not None:
+            return
+
+        dfa = self._dfa
+        base = dfa._base
+        default = dfa._default
+        check = dfa._check
+        nxt = dfa._next
+        char_map = dfa._char_map
+        s = self._state
+        try:
+            for j in range(start, len(chunk) if end is None else end):
+                sym = chunk[j]
+                k = char_map.get(sym)
+                if k is None:
+                    k = dfa.classify(sym)
+                i = base[s] + k
+                s = nxt[i] if check[i] == s else default[s]
+        except IndexError:
+            pass
+        self._state = s
+        if s >= len(base):
+            self.result = s in dfa.accepting
+
+    def close(self) -> bool:
+        if self.result is None:
+            self.result = self._state in self._dfa.accepting
+        return self.result
+
+
+def _most_common(row: List[int]) -> int:
+    counts: Dict[int, int] = {}
+    for t in row:
+        counts[t] = counts.get(t, 0) + 1
+    return max(counts, key=lambda t: (counts[t], -t))
+
+
+#
+# Place the transitions of the rows differing from their defaults into the comb vector.
+# Return (base, check, next) vectors; free slots are owned by state -1. The vectors are
+# padded to hold base[s] + k for every class k, so that only the base vector raises IndexError.
+#
+def _pack(rows: List[List[int]], default: 'array[int]',
+          nclasses: int) -> Tuple['array[int]', 'array[int]', 'array[int]']:
+    entries = [[k for k, t in enumerate(row) if t != default[s]] for s, row in enumerate(rows)]
+    base = array('i', bytes(4 * len(rows)))
+    check: List[int] = []
+    nxt: List[int] = []
+    # slots below first_free are all taken
+    first_free = 0
+    for s in sorted(range(len(rows)), key=lambda s: -len(entries[s])):
+        ks = entries[s]
+        if not ks:
+            continue
+
+        b = max(0, first_free - ks[0])
+        while any(b + k < len(check) and check[b + k] >= 0 for k in ks):
+            b += 1
+        if b + ks[-1] >= len(check):
+            grow = b + ks[-1] + 1 - len(check)
+            check.extend([-1] * grow)
+            nxt.extend([0] * grow)
+
+        base[s] = b
+        row = rows[s]
+        for k in ks:
+            check[b + k] = s
+            nxt[b + k] = row[k]
+        while first_free < len(check) and check[first_free] >= 0:
+            first_free += 1
+
+    size = max(base, default=0) + nclasses
+    if size > len(check):
+        check.extend([-1] * (size - len(check)))
+        nxt.extend([0] * (size - len(nxt)))
+
+    return base, array('i', check), array('i', nxt)
@@ -0,0 +1,529 @@
+#
+# Deterministic automata built from the NFA.
+#
+# The flat NFA program (see _program.py) is turned into a DFA by the classic subset
+# construction and then minimized with Hopcroft's partition refinement algorithm.
+#
+# Transitions are kept in a dense table over symbol equivalence classes: every literal
+# symbol used by the pattern gets a class of its own, all other symbols are grouped by
+# the values of the base predicates (\d, \s, \w) the pattern refers to. Case variants
+# of the symbols of an ignorecase pattern are literal symbols as well. Classes that
+# behave identically in the minimized DFA are merged afterwards.
+#
+# The table is flat and DFA states are stored as row offsets, so a single
+# table[state + class] lookup yields the row offset of the next state.
+#
+# Sink states, looping to themselves on every class, decide the result regardless of the rest
+# of the string: the dead state rejects it and an accepting sink (e.g. after 'ab' of 'ab.*')
+# accepts it. Their rows are left out of the table and get offsets past its end, so that
+# entering a sink costs nothing, while the next lookup raises IndexError and stops matching.
+#
+# A DFA can also be built for a tagged program, whose MATCH states hold rule numbers
+# in their syms (see _lexer.py). Accepting DFA states then keep the lowest rule number
+# of the NFA MATCH states they contain, and only states with equal tags are merged.
+#
+from __future__ import annotations
+
+import sys
+from time import monotonic
+
+from ._casefold import FoldedSet
+from ._impl import RexBudgetError, _DFA_MAX_STATES, _DEADLINE_INTERVAL
+from ._program import Program, SYM, SYM_SET, EARLY_MATCH, MATCH, SPLIT
+from ._symsets import get_set_base, get_signatures
+
+TYPE_CHECKING = False
+if TYPE_CHECKING:
+    from typing import Any, Union, Text, Callable, Optional, List, Dict, Tuple, FrozenSet
+
+#
+# Limit of symbols (besides the literal ones) whose classes are memorized by a DFA.
+#
+_CHAR_MAP_MAX = 4096
+
+
+class Alphabet(object):
+    __slots__ = ('literals', 'bases', 'signatures', 'size')
+
+    def __init__(self, literals: Dict[Text, int], bases: Tuple[Callable[[Text], bool], ...],
+                 signatures: Dict[Tuple[bool, ...], int], size: int) -> None:
+        self.literals = literals
+        self.bases = bases
+        self.signatures = signatures
+        self.size = size
+
+    def classify(self, sym: Text) -> int:
+        k = self.literals.get(sym)
+        if k is None:
+            k = self.signatures[tuple(base(sym) for base in self.bases)]
+
+        return k
+
+
+class DFA(object):
+    __slots__ = ('table', 'nclasses', 'start', 'accepting', 'alphabet', 'tags', 'sinks',
+                 'dead', 'accept_all', '_char_map')
+
+    name = 'dfa'
+
+    def __init__(self, table: List[int], nclasses: int, start: int, accepting: FrozenSet[int],
+                 alphabet: Alphabet, tags: Optional[Dict[int, int]] = None,
+                 sinks: Tuple[int, ...] = ()) -> None:
+        self.table = table
+        self.nclasses = nclasses
+        self.start = start
+        self.accepting = accepting
+        self.alphabet = alphabet
+        self.tags = tags
+        # row offsets of the sink states, all of them are >= len(table)
+        self.sinks = sinks
+        self.dead = next((s for s in sinks if s not in accepting), -1)
+        self.accept_all = next((s for s in sinks if s in accepting), -1)
+        self._char_map = dict(alphabet.literals)
+
+    def __repr__(self) -> str:
+        return f'<DFA states={self.nstates} classes={self.nclasses}>'
+
+    @property
+    def nstates(self) -> int:
+        return len(self.table) // self.nclasses + len(self.sinks)
+
+    def memory_estimate(self) -> int:
+        return sys.getsizeof(self.table) + sys.getsizeof(self._char_map)
+
+    def classify(self, sym: Text) -> int:
+        k = self.alphabet.classify(sym)
+        if len(self._char_map) < _CHAR_MAP_MAX:
+            self._char_map[sym] = k
+
+        return k
+
+    def match(self, string: Text) -> bool:
+        table = self.table
+        char_map = self._char_map
+        s = self.start
+        try:
+            for sym in string:
+                k = char_map.get(sym)
+                if k is None:
+                    k = self.classify(sym)
+                s = table[s + k]
+        except IndexError:
+            # s is a sink state
+            pass
+
+        return s in self.accepting
+
+    def match_counted(self, string: Text, budget: Optional[int],
+                      deadline: Optional[float]) -> Tuple[bool, int, int, int]:
+        table = self.table
+        char_map = self._char_map
+        size = len(table)
+        s = self.start
+        misses = 0
+        consumed = 0
+        for sym in string:
+            if s >= size:
+                break
+            if budget is not None and consumed >= budget:
+                raise RexBudgetError(f'budget of {budget} state visits exceeded at position {consumed}')
+            if deadline is not None and consumed % _DEADLINE_INTERVAL == 0 and monotonic() > deadline:
+                raise RexBudgetError(f'deadline exceeded at position {consumed}')
+
+            k = char_map.get(sym)
+            if k is None:
+                k = self.classify(sym)
+                misses += 1
+            s = table[s + k]
+            consumed += 1
+
+        return s in self.accepting, consumed, consumed, misses
+
+    def stream(self) -> 'DFAStream':
+        return DFAStream(self)
+
+
+#
+# Incremental matching, see _NFAStream in _impl.py.
+#
+class DFAStream(object):
+    __slots__ = ('_dfa', '_state', 'result')
+
+    def __init__(self, dfa: DFA) -> None:
+        self._dfa = dfa
+        self._state = dfa.start
+        self.result: Optional[bool] = None
+        if dfa.start >= len(dfa.table):
+            self.result = dfa.start in dfa.accepting
+
+    def feed(self, chunk: Text, start: int = 0, end: Optional[int] = None) -> None:
+        if self.result is not None:
+            return
+
+        dfa = self._dfa
+        table = dfa.table
+        char_map = dfa._char_map
+        s = self._state
+        try:
+            for i in range(start, len(chunk) if end is None else end):
+                sym = chunk[i]
+                k = char_map.get(sym)
+                if k is None:
+                    k = dfa.classify(sym)
+                s = table[s + k]
+        except IndexError:
+            pass
+        self._state = s
+        if s >= len(table):
+            self.result = s in dfa.accepting
+
+    def close(self) -> bool:
+        if self.result is None:
+            self.result = self._state in self._dfa.accepting
+        return self.result
+
+
+#
+# DFA of the reversed pattern, scanning strings from the end.
+#
+# Patterns like '.*\.log' accept any prefix, so the forward DFA has no dead state
+# and has to read every string to its end. Their reversed DFA reads the selective
+# suffix first and stops in the dead state as soon as the string can't match.
+#
+class ReverseDFA(object):
+    __slots__ = ('dfa', 'forward')
+
+    name = 'reverse'
+
+    def __init__(self, dfa: DFA) -> None:
+        self.dfa = dfa
+        # DFA of the pattern itself, built for streams (see _aio.py): None until it is built,
+        # False if it exceeds the limit of states
+        self.forward: Union[DFA, None, bool] = None
+
+    def __repr__(self) -> str:
+        return f'<ReverseDFA states={self.dfa.nstates} classes={self.dfa.nclasses}>'
+
+    def memory_estimate(self) -> int:
+        size = self.dfa.memory_estimate()
+        if self.forward:
+            size += self.forward.memory_estimate()
+        return size
+
+    def match(self, string: Text) -> bool:
+        dfa = self.dfa
+        table = dfa.table
+        char_map = dfa._char_map
+        s = dfa.start
+        try:
+            for sym in reversed(string):
+                k = char_map.get(sym)
+                if k is None:
+                    k = dfa.classify(sym)
+                s = table[s + k]
+        except IndexError:
+            # s is a sink state
+            pass
+
+        return s in dfa.accepting
+
+    def match_counted(self, string: Text, budget: Optional[int],
+                      deadline: Optional[float]) -> Tuple[bool, int, int, int]:
+        dfa = self.dfa
+        table = dfa.table
+        char_map = dfa._char_map
+        size = len(table)
+        s = dfa.start
+        misses = 0
+        consumed = 0
+        for i in range(len(string) - 1, -1, -1):
+            if s >= size:
+                break
+            if budget is not None and consumed >= budget:
+                raise RexBudgetError(f'budget of {budget} state visits exceeded at position {i}')
+            if deadline is not None and consumed % _DEADLINE_INTERVAL == 0 and monotonic() > deadline:
+                raise RexBudgetError(f'deadline exceeded at position {i}')
+
+            sym = string[i]
+            k = char_map.get(sym)
+            if k is None:
+                k = dfa.classify(sym)
+                misses += 1
+            s = table[s + k]
+            consumed += 1
+
+        return s in dfa.accepting, consumed, consumed, misses
+
+    def stream(self) -> 'ReverseStream':
+        return ReverseStream(self)
+
+
+#
+# Scanning from the end needs the whole input, so the stream collects the chunks
+# and matches them on close(); streams of RexPattern use the forward DFA instead (see _aio.py).
+#
+class ReverseStream(object):
+    __slots__ = ('_engine', '_chunks', 'result')
+
+    def __init__(self, engine: ReverseDFA) -> None:
+        self._engine = engine
+        self._chunks: List[Text] = []
+        self.result: Optional[bool] = None
+
+    def feed(self, chunk: Text, start: int = 0, end: Optional[int] = None) -> None:
+        self._chunks.append(chunk[start:end])
+
+    def close(self) -> bool:
+        self.result = self._engine.match(''.join(self._chunks))
+        self._chunks = []
+        return self.result
+
+
+def _build_alphabet(prog: Program) -> Alphabet:
+    literals = set()
+    bases = set()
+    for kind, sym in zip(prog.kinds, prog.syms):
+        if kind == SYM:
+            literals.add(sym)
+        elif isinstance(sym, FoldedSet):
+            literals.update(sym)
+        elif kind == SYM_SET:
+            base, _ = get_set_base(sym)
+            if base is not None:
+                bases.add(base)
+
+    literal_map = {sym: k for k, sym in enumerate(sorted(literals))}
+    base_list = tuple(sorted(bases, key=lambda fn: fn.__name__))
+    signatures = {sig: len(literal_map) + k for k, sig in enumerate(get_signatures(base_list))}
+
+    return Alphabet(literal_map, base_list, signatures, len(literal_map) + len(signatures))
+
+
+#
+# Return classes of symbols accepted by a SYM or SYM_SET NFA state.
+#
+def _accepted_classes(alphabet: Alphabet, kind: int, sym: Union[Text, Callable[[Text], bool]]) -> List[int]:
+    if kind == SYM:
+        return [alphabet.literals[sym]]
+    if isinstance(sym, FoldedSet):
+        return [alphabet.literals[variant] for variant in sym]
+
+    base, negated = get_set_base(sym)
+    classes = [k for lit, k in alphabet.literals.items() if sym(lit)]
+    if base is None:
+        classes.extend(alphabet.signatures.values())
+    else:
+        pos = alphabet.bases.index(base)
+        classes.extend(k for sig, k in alphabet.signatures.items() if sig[pos] != negated)
+
+    return classes
+
+
+#
+# Follow unlabeled arrows from the given NFA states the same way _addstate() does.
+# Return set of reached states or None if an EARLY_MATCH state was reached,
+# i.e. the rest of the string is accepted whatever it is.
+#
+def _closure(prog: Program, indices: List[int]) -> Optional[FrozenSet[int]]:
+    kinds = prog.kinds
+    out = prog.out
+    out1 = prog.out1
+    result = set()
+    seen = set()
+    stack = list(reversed(indices))
+    while stack:
+        i = stack.pop()
+        if i < 0 or i in seen:
+            continue
+
+        seen.add(i)
+        kind = kinds[i]
+        if kind == SPLIT:
+            o, o1 = out[i], out1[i]
+            if (o >= 0 and kinds[o] == EARLY_MATCH) or (o1 >= 0 and kinds[o1] == EARLY_MATCH):
+                return None
+            stack.append(o1)
+            stack.append(o)
+        elif kind != EARLY_MATCH:
+            result.add(i)
+
+    return frozenset(result)
+
+
+#
+# Subset construction.
+# Return transitions table (one row per state) and label of each state
+# or None if the DFA has more than max_states states.
+# Labels are accepting flags, or the lowest rule numbers (None if not accepting) for tagged program.
+#
+def _determinize(prog: Program, alphabet: Alphabet, max_states: int,
+                 tagged: bool = False) -> Optional[Tuple[List[List[int]], List[Any]]]:
+    nclasses = alphabet.size
+    accepts = {
+        i: _accepted_classes(alphabet, kind, prog.syms[i])
+        for i, kind in enumerate(prog.kinds) if kind in (SYM, SYM_SET)
+    }
+
+    # compiled empty regular expression matches any string
+    if prog.kinds[prog.start] == MATCH:
+        start = None
+    else:
+        start = _closure(prog, [prog.start])
+
+    ids = {start: 0}
+    sets = [start]
+    delta: List[List[int]] = []
+    while len(delta) < len(sets):
+        cur = sets[len(delta)]
+        if cur is None:
+            delta.append([len(delta)] * nclasses)
+            continue
+
+        moves: List[List[int]] = [[] for _ in range(nclasses)]
+        for i in sorted(cur):
+            for k in accepts.get(i, ()):
+                moves[k].append(prog.out[i])
+
+        row = []
+        closures = {}
+        for targets in moves:
+            key = tuple(targets)
+            nxt = closures.get(key, False)
+            if nxt is False:
+                nxt = closures[key] = _closure(prog, targets)
+
+            j = ids.get(nxt)
+            if j is None:
+                if len(sets) >= max_states:
+                    return None
+                j = ids[nxt] = len(sets)
+                sets.append(nxt)
+            row.append(j)
+        delta.append(row)
+
+    if tagged:
+        labels = [min((prog.syms[i] for i in s if prog.kinds[i] == MATCH), default=None) for s in sets]
+    else:
+        labels = [s is None or any(prog.kinds[i] == MATCH for i in s) for s in sets]
+    return delta, labels
+
+
+#
+# Hopcroft's DFA minimization.
+# Initial partition groups states by their labels.
+# Return block number of each state; equivalent states share the same block.
+#
+def _minimize(delta: List[List[int]], labels: List[Any], nclasses: int) -> List[int]:
+    inverse: List[Dict[int, List[int]]] = [{} for _ in range(nclasses)]
+    for s, row in enumerate(delta):
+        for k, t in enumerate(row):
+            inverse[k].setdefault(t, []).append(s)
+
+    groups: Dict[Any, set] = {}
+    for s, label in enumerate(labels):
+        groups.setdefault(label, set()).add(s)
+    blocks = list(groups.values())
+    block_of = [0] * len(delta)
+    for b, states in enumerate(blocks):
+        for s in states:
+            block_of[s] = b
+
+    work = set(range(len(blocks)))
+    while work:
+        splitter = list(blocks[work.pop()])
+        for k in range(nclasses):
+            inv = inverse[k]
+            touched: Dict[int, set] = {}
+            for t in splitter:
+                for s in inv.get(t, ()):
+                    touched.setdefault(block_of[s], set()).add(s)
+
+            for b, inside in touched.items():
+                if len(inside) == len(blocks[b]):
+                    continue
+
+                outside = blocks[b] - inside
+                blocks[b] = inside
+                new = len(blocks)
+                blocks.append(outside)
+                for s in outside:
+                    block_of[s] = new
+
+                if b in work or len(inside) > len(outside):
+                    work.add(new)
+                else:
+                    work.add(b)
+
+    return block_of
+
+
+#
+# Build minimal DFA for the flat NFA program.
+# Return None if the subset construction exceeds max_states states.
+#
+def build_dfa(prog: Program, max_states: int = _DFA_MAX_STATES, tagged: bool = False) -> Optional[DFA]:
+    alphabet = _build_alphabet(prog)
+    det = _determinize(prog, alphabet, max_states, tagged)
+    if det is None:
+        return None
+
+    delta, labels = det
+    return minimal_dfa(alphabet, delta, labels, tagged)
+
+
+#
+# Minimize the DFA given by delta rows over the alphabet classes and state labels
+# (truth values, or rule numbers if tagged), laying it out as a flat table.
+# State 0 is the start state.
+#
+def minimal_dfa(alphabet: Alphabet, delta: List[List[int]], labels: List[Any], tagged: bool = False) -> DFA:
+    block_of = _minimize(delta, labels, alphabet.size)
+
+    # renumber blocks in order of discovery from the start state
+    order = {block_of[0]: 0}
+    reps = [0]
+    for rep in reps:
+        for t in delta[rep]:
+            if block_of[t] not in order:
+                order[block_of[t]] = len(reps)
+                reps.append(t)
+    rows = [[order[block_of[t]] for t in delta[rep]] for rep in reps]
+
+    # move sink states past the end of the table
+    sinks = [j for j, row in enumerate(rows) if all(t == j for t in row)]
+    start = 0
+    if sinks:
+        moved = [j for j in range(len(rows)) if j not in sinks] + sinks
+        number = {j: n for n, j in enumerate(moved)}
+        reps = [reps[j] for j in moved]
+        rows = [[number[t] for t in rows[j]] for j in moved]
+        start = number[0]
+    ntable = len(rows) - len(sinks)
+
+    # merge classes with identical columns
+    columns: Dict[Tuple[int, ...], int] = {}
+    class_map = []
+    for k in range(alphabet.size):
+        column = tuple(row[k] for row in rows)
+        class_map.append(columns.setdefault(column, len(columns)))
+    nclasses = len(columns)
+    alphabet = Alphabet(
+        {sym: class_map[k] for sym, k in alphabet.literals.items()},
+        alphabet.bases,
+        {sig: class_map[k] for sig, k in alphabet.signatures.items()},
+        nclasses,
+    )
+
+    table = [0] * (ntable * nclasses)
+    for s, row in enumerate(rows[:ntable]):
+        for k, t in enumerate(row):
+            table[s * nclasses + class_map[k]] = t * nclasses
+
+    start *= nclasses
+    sink_offsets = tuple(s * nclasses for s in range(ntable, len(rows)))
+    if tagged:
+        tags = {s * nclasses: labels[rep] for s, rep in enumerate(reps) if labels[rep] is not None}
+        return DFA(table, nclasses, start, frozenset(tags), alphabet, tags, sink_offsets)
+
+    final = frozenset(s * nclasses for s, rep in enumerate(reps) if labels[rep])
+    return DFA(table, nclasses, start, final, alphabet, sinks=sink_offsets)
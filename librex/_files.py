@@ -0,0 +1,183 @@
+#
+# Scanning files, compressed or not.
+#
+# Files are read in large blocks; gzip, bz2 and xz compressed ones are recognized by their
+# magic bytes (not by the file name, so compressed data piped to the standard input works
+# as well) and decompressed on the fly, a block at a time, so that neither the compressed
+# nor the decompressed data is ever held whole, in memory or on disk.
+#
+# Every block is decoded incrementally and split into lines once. The parts of a line
+# spanning several blocks are kept in a list and joined once the line is complete,
+# so blocks are never concatenated. Lines are matched by the pattern as they are split.
+#
+# zlib, bz2 and lzma release the GIL while they decompress, so with threaded set blocks
+# are read and decompressed by a separate thread, ahead of the matching, into a queue
+# of at most _QUEUE_BLOCKS blocks.
+#
+from __future__ import annotations
+
+import codecs
+
+from ._impl import RexPattern
+
+TYPE_CHECKING = False
+if TYPE_CHECKING:
+    from typing import Any, Text, Callable, Generator, Iterator, List, Union
+
+#
+# Number of decompressed bytes read at once.
+#
+_BLOCK_SIZE = 1024 * 1024
+
+#
+# Number of blocks the decompressing thread may read ahead.
+#
+_QUEUE_BLOCKS = 4
+
+_MAGIC = (
+    (b'\x1f\x8b', 'gzip'),
+    (b'BZh', 'bz2'),
+    (b'\xfd7zXZ\x00', 'xz'),
+)
+
+
+#
+# Return the compression of the binary file object ('gzip', 'bz2', 'xz') or None,
+# looking at its first bytes without consuming them.
+#
+def compression_of(fileobj: Any) -> Any:
+    if hasattr(fileobj, 'peek'):
+        head = fileobj.peek(6)[:6]
+    elif fileobj.seekable():
+        pos = fileobj.tell()
+        head = fileobj.read(6)
+        fileobj.seek(pos)
+    else:
+        return None
+
+    for magic, name in _MAGIC:
+        if head.startswith(magic):
+            return name
+    return None
+
+
+#
+# Return binary file object reading the decompressed data of fileobj.
+#
+def decompressed(fileobj: Any) -> Any:
+    compression = compression_of(fileobj)
+    if compression == 'gzip':
+        import gzip
+
+        return gzip.GzipFile(fileobj=fileobj, mode='rb')
+    if compression == 'bz2':
+        import bz2
+
+        return bz2.BZ2File(fileobj, mode='rb')
+    if compression == 'xz':
+        import lzma
+
+        return lzma.LZMAFile(fileobj, mode='rb')
+    return fileobj
+
+
+def _blocks(read: Callable[[int], bytes]) -> Generator[bytes, None, None]:
+    while True:
+        block = read(_BLOCK_SIZE)
+        if not block:
+            return
+        yield block
+
+
+#
+# Read blocks in a separate thread. The thread stops at the end of the data, on an error,
+# which is raised by the iterator in its turn, or once the iterator is closed.
+#
+def _threaded_blocks(read: Callable[[int], bytes]) -> Generator[bytes, None, None]:
+    import queue
+    import threading
+
+    blocks: Any = queue.Queue(_QUEUE_BLOCKS)
+    stop = threading.Event()
+
+    # return False if the iterator was closed meanwhile
+    def _put(item: Any) -> bool:
+        while not stop.is_set():
+            try:
+                blocks.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def _reader() -> None:
+        try:
+            for block in _blocks(read):
+                if not _put(block):
+                    return
+            _put(b'')
+        except BaseException as e:
+            _put(e)
+
+    thread = threading.Thread(target=_reader, name='librex-decompress', daemon=True)
+    thread.start()
+    try:
+        while True:
+            block = blocks.get()
+            if isinstance(block, BaseException):
+                raise block
+            if not block:
+                return
+            yield block
+    finally:
+        stop.set()
+        thread.join()
+
+
+def scan_file(obj: RexPattern, file: Union[Text, Any], encoding: Text = 'utf-8', errors: Text = 'strict',
+              threaded: bool = False) -> Iterator[Text]:
+    close = isinstance(file, (str, bytes)) or hasattr(file, '__fspath__')
+    raw = open(file, 'rb') if close else file
+    data = raw
+    blocks = None
+    try:
+        data = decompressed(raw)
+        blocks = (_threaded_blocks if threaded else _blocks)(data.read)
+        decoder = codecs.getincrementaldecoder(encoding)(errors)
+        match = obj.match
+        parts: List[Text] = []
+        for block in blocks:
+            lines = decoder.decode(block).split('\n')
+            if len(lines) == 1:
+                # the block is in the middle of a line
+                parts.append(lines[0])
+                continue
+            if parts:
+                parts.append(lines[0])
+                lines[0] = ''.join(parts)
+                parts = []
+            # the last line continues in the next block
+            tail = lines.pop()
+            if tail:
+                parts.append(tail)
+            for line in lines:
+                if line.endswith('\r'):
+                    line = line[:-1]
+                if match(line):
+                    yield line
+
+        parts.append(decoder.decode(b'', final=True))
+        line = ''.join(parts)
+        # the input ends with a line lacking the newline, which may be a sole '\r'
+        if line:
+            if line.endswith('\r'):
+                line = line[:-1]
+            if match(line):
+                yield line
+    finally:
+        if blocks is not None:
+            blocks.close()
+        if data is not raw:
+            data.close()
+        if close:
+            raw.close()
@@ -7,14 +7,31 @@
 # Communications of the ACM 11(6) (June 1968), pp. 419-422.
 # (https://www.fing.edu.uy/inco/cursos/intropln/material/p419-thompson.pdf)
 #
-from dataclasses import dataclass
-from enum import Enum
-from reprlib import recursive_repr, Repr
-from typing import Union, Text, NamedTuple, List, Callable
+# The module is imported by 'import librex', so it keeps startup cheap: classes are plain
+# ones with __slots__ (no dataclasses or enum), annotations are not evaluated and
+# typing is only imported by type checkers.
+#
+from __future__ import annotations
+
+import itertools
+import sys
+from time import monotonic, perf_counter
+from weakref import WeakValueDictionary
 
+from ._casefold import case_variants, folded_set
 from ._stack import Stack
+from ._stats import RexStats, register as _stats_register, unregister as _stats_unregister
+from ._tiers import _tiering, promote as _promote
 from ._symsets import get_symbol_set
 
+TYPE_CHECKING = False
+if TYPE_CHECKING:
+    from typing import Any, Union, Text, List, Callable, Dict, Set, Tuple, Iterable, Iterator, \
+        AsyncIterator, Optional
+
+    from ._algebra import RexAutomaton
+    from ._cache import RexCache
+
 
 #
 # Public API
@@ -25,32 +42,390 @@ class RexError(Exception):
 
     Attributes:
         message: The unformatted error message
+        pos: The index in the pattern where compilation failed (may be None)
     """
-    def __init__(self) -> None:
-        self.message = 'Bad regular expression'
-        super(RexError, self).__init__(self.message)
+    def __init__(self, message: Text = 'Bad regular expression', pos: Optional[int] = None) -> None:
+        self.message = message
+        self.pos = pos
+        if pos is not None:
+            message = f'{message} at position {pos}'
+        super(RexError, self).__init__(message)
+
+
+class RexBudgetError(RexError):
+    """Exception raised when matching exceeds its work budget or deadline.
+
+    Attributes:
+        message: The unformatted error message
+    """
+
+
+class RexMatch(object):
+    """Result of a successful RexPattern.fullmatch() call.
+
+    Group 0 is the whole string, groups 1 and above are numbered
+    by their opening parentheses from left to right.
+
+    Attributes:
+        string: The string passed to fullmatch()
+        re: The RexPattern object that produced the match
+    """
+    __slots__ = ('string', 're', '_slots')
+
+    def __init__(self, string: Text, re: 'RexPattern', slots: Tuple[Optional[int], ...]) -> None:
+        self.string = string
+        self.re = re
+        self._slots = slots
+
+    def __repr__(self) -> str:
+        return f'<librex.RexMatch object; span={self.span()!r}, match={self.string!r}>'
+
+    def __getitem__(self, group: int) -> Optional[Text]:
+        return self.group(group)
+
+    def span(self, group: int = 0) -> Tuple[int, int]:
+        """Return (start, end) of the group, or (-1, -1) if it didn't participate in the match."""
+        if not 0 <= group < len(self._slots) // 2:
+            raise IndexError('no such group')
+
+        start, end = self._slots[2 * group], self._slots[2 * group + 1]
+        if start is None or end is None:
+            return -1, -1
+        return start, end
+
+    def start(self, group: int = 0) -> int:
+        """Return start index of the group, or -1 if it didn't participate in the match."""
+        return self.span(group)[0]
+
+    def end(self, group: int = 0) -> int:
+        """Return end index of the group, or -1 if it didn't participate in the match."""
+        return self.span(group)[1]
+
+    def group(self, *groups: int) -> Union[Optional[Text], Tuple[Optional[Text], ...]]:
+        """Return one or more groups of the match; a group that didn't participate is None.
+
+        Without arguments the whole string is returned.
+        """
+        if len(groups) > 1:
+            return tuple(self._group(g) for g in groups)
+        return self._group(groups[0] if groups else 0)
+
+    def groups(self, default: Optional[Text] = None) -> Tuple[Optional[Text], ...]:
+        """Return tuple of all groups of the match, from 1 up to the last one."""
+        return tuple(
+            default if s == (-1, -1) else self.string[s[0]:s[1]]
+            for s in (self.span(g) for g in range(1, len(self._slots) // 2))
+        )
+
+    def _group(self, group: int) -> Optional[Text]:
+        start, end = self.span(group)
+        if start < 0:
+            return None
+        return self.string[start:end]
 
 
-@dataclass
 class RexPattern(object):
     """Compiled regular expression object.
 
+    Compiled objects compare equal (and have equal hashes) if their
+    patterns are the same after normalization, e.g. 'a(b)' and '(a)b'.
+    Grouping is not taken into account.
+
     Attributes:
         pattern: Original regular expression used to build the object
     """
-    pattern: Text
-    _nfa: '_State' = None
-    _m_session: '_MatchSession' = None
-
-    def __post_init__(self):
-        self._m_session = _MatchSession(0)
-
-    def match(self, string: Text) -> bool:
+    __slots__ = ('pattern', '_nfa', '_m_session', '_engine', '_postfix', '_stats', '_plan',
+                 '_captures', '_ngroups', '_ignorecase', '_calls', '_max_dfa_states', '_max_errors',
+                 '_cache', '_requested', '__weakref__')
+
+    def __init__(self, pattern: Text, _nfa: Optional[_State] = None, _postfix: Optional[Text] = None,
+                 ignorecase: bool = False) -> None:
+        self.pattern = pattern
+        self._nfa = _nfa
+        # NFA states may be shared between patterns, so all of them label states from the same session
+        self._m_session = _shared_session
+        self._engine: Any = None
+        self._postfix = _re2post(pattern, ignorecase=ignorecase) if _postfix is None else _postfix
+        self._ignorecase = ignorecase
+        self._stats: Optional[RexStats] = None
+        self._plan: Optional[List[Text]] = None
+        self._captures: Optional[_State] = None
+        self._ngroups: Optional[int] = None
+        # match() calls counted until the pattern is promoted (see _tiers.py), None if it is not tiered
+        self._calls: Optional[int] = None
+        self._max_dfa_states = _DFA_MAX_STATES
+        self._max_errors = 0
+        self._cache: Optional[RexCache] = None
+        # engine requested by compile(), None for the default one; along with _max_dfa_states,
+        # it lets other processes compile the pattern the same way (see _aio.py)
+        self._requested: Optional[Text] = None
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, RexPattern):
+            return NotImplemented
+        return self._postfix == other._postfix and self._max_errors == other._max_errors
+
+    def __hash__(self) -> int:
+        return hash((self._postfix, self._max_errors))
+
+    def __repr__(self) -> str:
+        flags = ' ignorecase' if self._ignorecase else ''
+        if self._max_errors:
+            flags += f' max_errors={self._max_errors}'
+        return f'<RexPattern {self.pattern!r} engine={self.engine}{flags}>'
+
+    def __reduce__(self) -> Tuple[Any, ...]:
+        # pickled as the program (see _bulk.py), without statistics and cache
+        from ._bulk import dump_program, load_program
+
+        return load_program, (dump_program(self),)
+
+    @property
+    def ignorecase(self) -> bool:
+        """True if the pattern was compiled to match ignoring case."""
+        return self._ignorecase
+
+    @property
+    def max_errors(self) -> int:
+        """Number of errors (edits) allowed in the matched strings, 0 for exact matching."""
+        return self._max_errors
+
+    @property
+    def engine(self) -> Text:
+        """Name of the engine used for matching."""
+        return 'nfa' if self._engine is None else self._engine.name
+
+    def explain(self) -> Text:
+        """Return description of the engine used for matching and the reasons it was chosen."""
+        lines = [f'{self.pattern!r}: engine {self.engine}']
+        return '\n'.join(lines + [f'  - {r}' for r in self._plan or ()])
+
+    @property
+    def stats(self) -> Optional[RexStats]:
+        """Runtime statistics, or None unless enabled by enable_stats()."""
+        return self._stats
+
+    def enable_stats(self) -> RexStats:
+        """Start collecting runtime statistics, returning the RexStats object.
+
+        Patterns with enabled statistics are visible to librex.collect_stats()
+        and librex.export_stats().
+        """
+        if self._stats is None:
+            self._stats = RexStats()
+            _stats_register(self)
+        return self._stats
+
+    def disable_stats(self) -> None:
+        """Stop collecting runtime statistics."""
+        self._stats = None
+        _stats_unregister(self)
+
+    @property
+    def cache(self) -> Optional[RexCache]:
+        """Cache of match() results, or None unless enabled by enable_cache()."""
+        return self._cache
+
+    def enable_cache(self, max_entries: Optional[int] = None, max_size: Optional[int] = None) -> RexCache:
+        """Start caching match() results, returning the RexCache object.
+
+        Results of the recently matched strings are returned without running the automaton.
+        The cache keeps at most max_entries strings of at most max_size symbols in total,
+        dropping the least recently used ones. If the cache is already enabled,
+        the given limits are applied to it.
+        """
+        from ._cache import RexCache, DEFAULT_MAX_ENTRIES, DEFAULT_MAX_SIZE
+
+        if self._cache is None:
+            self._cache = RexCache(max_entries or DEFAULT_MAX_ENTRIES, max_size or DEFAULT_MAX_SIZE)
+        elif max_entries is not None or max_size is not None:
+            self._cache.resize(max_entries or self._cache.max_entries, max_size or self._cache.max_size)
+        return self._cache
+
+    def disable_cache(self) -> None:
+        """Stop caching match() results, dropping the cache."""
+        self._cache = None
+
+    @property
+    def state_count(self) -> int:
+        """Number of states of the compiled NFA."""
+        return len([s for s in _all_states(_nfa_of(self)) if s.s_type != _StateType.NONE])
+
+    @property
+    def memory_estimate(self) -> int:
+        """Approximate number of bytes taken by the compiled automata."""
+        size = 0
+        if self._nfa is not None:
+            size += len(_all_states(self._nfa)) * _state_size()
+        if self._engine is not None:
+            size += self._engine.memory_estimate()
+        return size
+
+    def match(self, string: Text, budget: Optional[int] = None, deadline: Optional[float] = None) -> bool:
         """Match compiled regular expression against string string, returning
         True if the string matches or False otherwise.
+
+        If budget is given, RexBudgetError is raised as soon as matching visits
+        more than budget automaton states. If deadline (a time.monotonic() value)
+        is given, RexBudgetError is raised once it has passed.
+        Strings found in the cache (see enable_cache()) are not matched again.
+        """
+        cache = self._cache
+        if cache is not None:
+            result = cache.get(string)
+            if result is not None:
+                return result
+
+        engine = self._engine
+        if engine is None and self._calls is not None:
+            self._calls += 1
+            if self._calls >= _tiering.threshold:
+                _promote(self, budget is not None or deadline is not None)
+                engine = self._engine
+
+        if self._stats is not None or budget is not None or deadline is not None:
+            result = _match_slow(self, string, budget, deadline)
+        elif engine is not None:
+            result = engine.match(string)
+        else:
+            result = _match(self, string)
+
+        if cache is not None:
+            cache.put(string, result)
+        return result
+
+    def match_sorted(self, strings: Iterable[Text]) -> List[bool]:
+        """Match compiled regular expression against every string of strings,
+        returning list of the results.
+
+        Automaton states reached after every prefix of a string are kept, and the next string
+        resumes from the state of the longest prefix they share, so that sorted batches
+        (URLs, file paths, keys) are matched without repeating their common prefixes.
+        """
+        from ._batch import match_sorted
+
+        return match_sorted(self, strings)
+
+    def match_keys(self, keys: Iterable[Text]) -> Set[Text]:
+        """Return set of the keys matched by the compiled regular expression.
+
+        The keys are put into a trie, which is walked once, so that every shared prefix
+        is matched once, and prefixes deciding the result skip the keys starting with them.
+        """
+        from ._batch import match_keys
+
+        return match_keys(self, keys)
+
+    async def match_stream(self, reader: Any, encoding: Text = 'utf-8', errors: Text = 'strict') -> bool:
+        """Match compiled regular expression against all the data read from reader
+        (an asyncio.StreamReader or any object with a coroutine read(n) method) until EOF,
+        returning True if the data matches or False otherwise.
+
+        Data is decoded with encoding and matched incrementally chunk by chunk, without
+        buffering it whole; control is returned to the event loop regularly, so long inputs
+        don't block other coroutines. Reading stops as soon as the result is known.
+        Patterns matched by the reversed DFA, which reads strings from the end, are matched
+        by the forward DFA (or the NFA simulation, if the DFA exceeds max_dfa_states) instead.
+        """
+        from ._aio import match_stream
+
+        return await match_stream(self, reader, encoding, errors)
+
+    def scan_lines(self, reader: Any, encoding: Text = 'utf-8',
+                   errors: Text = 'strict') -> AsyncIterator[Text]:
+        """Return an asynchronous iterator over the lines read from reader (see match_stream())
+        that match the compiled regular expression. Line terminators are stripped.
+        """
+        from ._aio import scan_lines
+
+        return scan_lines(self, reader, encoding, errors)
+
+    def scan_file(self, file: Any, encoding: Text = 'utf-8', errors: Text = 'strict',
+                  threaded: bool = False) -> Iterator[Text]:
+        """Return an iterator over the lines of file (a path or a binary file object)
+        that match the compiled regular expression. Line terminators are stripped.
+
+        The file is read in large blocks, gzip, bz2 and xz compressed data is recognized
+        by its magic bytes and decompressed on the fly. If threaded is True, the data is
+        read and decompressed by a separate thread, overlapping with the matching.
+        A file given by its path is closed once the iterator is exhausted or closed.
+        """
+        from ._files import scan_file
+
+        return scan_file(self, file, encoding, errors, threaded)
+
+    @property
+    def groups(self) -> int:
+        """Number of capturing groups in the pattern."""
+        if self._ngroups is None:
+            self._ngroups = _count_groups(self.pattern)
+        return self._ngroups
+
+    def fullmatch(self, string: Text) -> Optional[RexMatch]:
+        """Match compiled regular expression against the whole string string,
+        returning RexMatch object with spans of the groups, or None if the string doesn't match.
+
+        Group spans are found by the NFA extended with capture slots (Pike VM), built on the first call.
+        Like match(), it takes linear time in the length of the string.
+        Approximate patterns (see max_errors) with groups generate RexError.
+        """
+        if self._max_errors and self.groups:
+            raise RexError('groups of approximate patterns are not supported')
+
+        if self._engine is not None and not self._engine.match(string):
+            return None
+
+        if self.groups == 0:
+            if self._engine is None and not self.match(string):
+                return None
+            return RexMatch(string, self, (0, len(string)))
+
+        slots = _match_captures(self, string)
+        if slots is None:
+            return None
+        return RexMatch(string, self, slots)
+
+    def isempty(self) -> bool:
+        """Return True if the pattern matches no string at all."""
+        from ._algebra import isempty
+
+        return isempty(self)
+
+    def issubset(self, other: Union[Text, RexPattern, RexAutomaton]) -> bool:
+        """Return True if every string matched by the pattern is matched by other
+        (a pattern string, RexPattern or RexAutomaton object) as well.
+
+        Languages are compared by the product of the minimal DFAs of the patterns,
+        RexError is raised if a DFA or the product exceeds its limit of states.
         """
-        self._m_session.next()
-        return _match(self, string)
+        from ._algebra import issubset
+
+        return issubset(self, other)
+
+    def issuperset(self, other: Union[Text, RexPattern, RexAutomaton]) -> bool:
+        """Return True if every string matched by other is matched by the pattern. See issubset()."""
+        from ._algebra import issubset
+
+        return issubset(other, self)
+
+    def isdisjoint(self, other: Union[Text, RexPattern, RexAutomaton]) -> bool:
+        """Return True if no string is matched by both the pattern and other. See issubset()."""
+        from ._algebra import isdisjoint
+
+        return isdisjoint(self, other)
+
+    def intersection(self, other: Union[Text, RexPattern, RexAutomaton]) -> RexAutomaton:
+        """Return RexAutomaton object matching the strings matched by both the pattern and other.
+        See issubset()."""
+        from ._algebra import intersection
+
+        return intersection(self, other)
+
+    def complement(self) -> RexAutomaton:
+        """Return RexAutomaton object matching the strings not matched by the pattern."""
+        from ._algebra import complement
+
+        return complement(self)
 
 
 #
@@ -60,30 +435,58 @@ class RexPattern(object):
 #
 # Precompiled NFA can be run multiple times against various strings.
 # Every run must be able to distinguish labeled and unlabeled states.
-# This object holds current list_id value used for labeling per RexPattern object instance.
+# This object holds current list_id value used for labeling.
+# Since hash-consed states are shared between patterns, a single session is shared as well.
+# Every step takes a list_id of its own from an itertools.count(), whose next() is atomic,
+# so NFA can be simulated by several threads at once: a label overwritten by another thread
+# can only make a state added to the list twice, never skipped.
 #
-@dataclass
 class _MatchSession(object):
-    list_id: int
+    __slots__ = ('list_id',)
+
+    def __init__(self, list_id: int) -> None:
+        self.list_id = list_id
+
+    def next(self) -> int:
+        self.list_id = list_id = next(_list_ids)
+        return list_id
+
 
-    def next(self):
-        self.list_id += 1
+_list_ids = itertools.count(1)
+_shared_session = _MatchSession(0)
 
 
+#
+# Default limit of DFA states built by the 'dfa' and 'auto' engines (see _dfa.py).
+#
+_DFA_MAX_STATES = 10000
+
+#
+# Number of symbols consumed between deadline checks while matching.
+#
+_DEADLINE_INTERVAL = 256
+
 _EARLY_MATCH_OP: Text = '\x00'
 _MATCH_OP: Text = '\x01'
 _CONCAT_OP: Text = '\x02'
+_SAVE_OP: Text = '\x03'
+_FOLD_OP: Text = '\x04'
 
 _ESCAPE_SYM = '\\'
 _REPEATER_SYMS = '*+?'
 _SYMSETS_SYMS = 'dDsSwW'
 _ESCAPABLE_SYMS = ''.join(('.(|)', _SYMSETS_SYMS, _REPEATER_SYMS, _ESCAPE_SYM))
-_ESCAPABLE_SYMS_EX = ''.join((_ESCAPABLE_SYMS, _EARLY_MATCH_OP, _MATCH_OP, _CONCAT_OP))
+_ESCAPABLE_SYMS_EX = ''.join((_ESCAPABLE_SYMS, _EARLY_MATCH_OP, _MATCH_OP, _CONCAT_OP, _SAVE_OP, _FOLD_OP))
 
 
-class _Paren(NamedTuple):
-    nalt: int = 0
-    natom: int = 0
+class _Paren(object):
+    __slots__ = ('nalt', 'natom', 'pos', 'group')
+
+    def __init__(self, nalt: int = 0, natom: int = 0, pos: int = 0, group: int = 0) -> None:
+        self.nalt = nalt
+        self.natom = natom
+        self.pos = pos
+        self.group = group
 
 
 #
@@ -97,22 +500,38 @@ class _Paren(NamedTuple):
 #  - empty regexp re generates string with _MATCH_OP symbol
 #  - any empty alternative for '|' is replaced with _EARLY_MATCH_OP symbol:
 #      'a||b', '|', 'a|', 'a(b|)', etc. - are valid expressions now
+#  - if positions list is given, it receives the index in re of the symbol
+#    that produced each symbol of the result
+#  - groups nested deeper than max_depth generate RexError
+#  - if captures is True, group number n is wrapped into _SAVE_OP chr(2n) and _SAVE_OP chr(2n + 1)
+#    operands recording group start and end positions (see _post2nfa() and _match_captures())
+#  - if ignorecase is True, literal symbols having other case variants are replaced by _FOLD_OP
+#    followed by the smallest variant, matching any of them (see _casefold.py)
 #
-def _re2post(re: Text) -> Text:
+def _re2post(re: Text, positions: Optional[List[int]] = None, max_depth: Optional[int] = None,
+             captures: bool = False, ignorecase: bool = False) -> Text:
     escape: bool = False
     paren: Stack[_Paren] = Stack()
     dst: List[Text] = []
     nalt: int = 0
     natom: int = 0
+    ngroups: int = 0
+
+    def _fill_positions(pos: int) -> None:
+        if positions is not None:
+            positions.extend([pos] * (len(dst) - len(positions)))
 
     if not re:
+        if positions is not None:
+            positions.append(0)
         return _MATCH_OP
 
     prev_sym: Text = ''
-    for sym in re:
+    for pos, sym in enumerate(re):
+        _fill_positions(pos - 1)
         if escape:
             if sym not in _ESCAPABLE_SYMS:
-                raise RexError()
+                raise RexError('bad escape', pos - 1)
 
             if natom > 1:
                 dst.append(_CONCAT_OP)
@@ -133,7 +552,14 @@ def _re2post(re: Text) -> Text:
                 dst.append(_CONCAT_OP)
                 natom -= 1
 
-            paren.push(_Paren(nalt, natom))
+            ngroups += 1
+            paren.push(_Paren(nalt, natom, pos, ngroups))
+            if max_depth is not None and paren.size() > max_depth:
+                raise RexError(f'groups nested deeper than {max_depth}', pos)
+
+            if captures:
+                dst.append(_SAVE_OP)
+                dst.append(chr(2 * ngroups))
 
             nalt = 0
             natom = 0
@@ -150,7 +576,7 @@ def _re2post(re: Text) -> Text:
             nalt += 1
         elif sym == ')':
             if paren.is_empty():
-                raise RexError()
+                raise RexError('unbalanced parenthesis', pos)
 
             if natom == 0:
                 dst.append(_EARLY_MATCH_OP)
@@ -166,16 +592,19 @@ def _re2post(re: Text) -> Text:
                 nalt -= 1
 
             p = paren.pop()
+            if captures:
+                dst.extend((_CONCAT_OP, _SAVE_OP, chr(2 * p.group + 1), _CONCAT_OP))
+
             nalt = p.nalt
             natom = p.natom
 
             natom += 1
         elif sym in _REPEATER_SYMS:
             if natom == 0:
-                raise RexError()
+                raise RexError('nothing to repeat', pos)
 
             if prev_sym in _REPEATER_SYMS:
-                raise RexError()
+                raise RexError('multiple repeat', pos)
 
             dst.append(sym)
         else:
@@ -183,17 +612,27 @@ def _re2post(re: Text) -> Text:
                 dst.append(_CONCAT_OP)
                 natom -= 1
 
-            if sym in (_EARLY_MATCH_OP, _MATCH_OP, _CONCAT_OP):
+            if sym in (_EARLY_MATCH_OP, _MATCH_OP, _CONCAT_OP, _SAVE_OP, _FOLD_OP):
                 dst.append(_ESCAPE_SYM)
+            elif ignorecase and sym != '.':
+                variants = case_variants(sym)
+                if len(variants) > 1:
+                    # the smallest variant stands for all of them, so that 'abc' and 'ABC' compile the same
+                    dst.append(_FOLD_OP)
+                    sym = min(variants)
 
             dst.append(sym)
             natom += 1
 
         prev_sym = sym
 
-    if not paren.is_empty() or escape:
-        raise RexError()
+    if escape:
+        raise RexError('bad escape (end of pattern)', len(re) - 1)
+
+    if not paren.is_empty():
+        raise RexError('missing ), unterminated subpattern', paren.peek().pos)
 
+    _fill_positions(len(re) - 1)
     if natom == 0 and nalt > 0:
         dst.append(_EARLY_MATCH_OP)
         natom = 1
@@ -207,6 +646,50 @@ def _re2post(re: Text) -> Text:
         dst.append('|')
         nalt -= 1
 
+    _fill_positions(len(re))
+    return ''.join(dst)
+
+
+#
+# Return postfix of the reversed regexp, matching the reversed strings matched by postfix,
+# or None if postfix contains _EARLY_MATCH_OP (it accepts the rest of the string, so it
+# has no mirror image) or capture slots.
+# Operands of every concatenation are swapped, other operators are kept as they are.
+#
+def _reverse_postfix(postfix: Text) -> Optional[Text]:
+    # operands are kept as trees of tuples, so that long concatenations aren't copied over and over
+    stack: Stack[Any] = Stack()
+    prefix: Text = ''
+    for sym in postfix:
+        if prefix:
+            stack.push(prefix + sym)
+            prefix = ''
+        elif sym in (_ESCAPE_SYM, _FOLD_OP):
+            prefix = sym
+        elif sym in (_EARLY_MATCH_OP, _SAVE_OP):
+            return None
+        elif sym == _CONCAT_OP:
+            elem2 = stack.pop()
+            elem1 = stack.pop()
+            stack.push((elem2, elem1, _CONCAT_OP))
+        elif sym == '|':
+            elem2 = stack.pop()
+            elem1 = stack.pop()
+            stack.push((elem1, elem2, '|'))
+        elif sym in _REPEATER_SYMS:
+            stack.push((stack.pop(), sym))
+        else:
+            stack.push(sym)
+
+    dst: List[Text] = []
+    todo = [stack.pop()]
+    while todo:
+        elem = todo.pop()
+        if isinstance(elem, tuple):
+            todo.extend(reversed(elem))
+        else:
+            dst.append(elem)
+
     return ''.join(dst)
 
 
@@ -217,43 +700,66 @@ def _re2post(re: Text) -> Text:
 # If s_type == SPLIT, unlabeled arrows to out and out1 (if != None or points to NONE state).
 # If s_type == SYM, labeled arrow with symbol sym to out.
 # If s_type == SYM_SET, labeled arrow with callable sym to out.
+# If s_type == SAVE, unlabeled arrow to out recording current position into capture slot sym.
 #
-class _StateType(Enum):
+class _StateType(object):
     NONE = 0
     SYM = 1
     SYM_SET = 2
     EARLY_MATCH = 3
     MATCH = 4
     SPLIT = 5
+    SAVE = 6
 
 
-@dataclass
+#
+# States compare equal if their fields are equal, recursively.
+#
 class _State(object):
-    sym: Union[Text, Callable[[Text], bool]] = ''
-    s_type: _StateType = _StateType.NONE
-    out: '_State' = None
-    out1: '_State' = None
-    last_list: int = 0
-
-    @recursive_repr()
-    def __repr__(self):
-        r = Repr()
-        r.maxother = 10000
-        return '(_State: ' + ', '.join(
-            map(r.repr, (self.sym, self.s_type, self.out, self.out1, self.last_list))
-        ) + ')'
+    __slots__ = ('sym', 's_type', 'out', 'out1', 'last_list', '__weakref__')
+
+    __hash__ = None  # type: ignore
 
-    def __post_init__(self):
-        # to make __repr__ happy with our dataclass
-        setattr(self, '__name__', self.__class__.__name__)
-        setattr(self, '__qualname__', self.__class__.__qualname__)
+    def __init__(self, sym: Union[Text, Callable[[Text], bool], int] = '', s_type: int = _StateType.NONE,
+                 out: Optional[_State] = None, out1: Optional[_State] = None, last_list: int = 0) -> None:
+        self.sym = sym
+        self.s_type = s_type
+        self.out = out
+        self.out1 = out1
+        self.last_list = last_list
 
-        if self.s_type not in (_StateType.NONE, _StateType.EARLY_MATCH, _StateType.MATCH):
-            if self.out is None:
+        if s_type not in (_StateType.NONE, _StateType.EARLY_MATCH, _StateType.MATCH):
+            if out is None:
                 self.out = _State()
-            if self.out1 is None:
+            if out1 is None:
                 self.out1 = _State()
 
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, _State):
+            return NotImplemented
+        return (self.sym, self.s_type, self.out, self.out1, self.last_list) == \
+            (other.sym, other.s_type, other.out, other.out1, other.last_list)
+
+    def __repr__(self) -> str:
+        key = id(self)
+        if key in _repr_running:
+            return '...'
+
+        from reprlib import Repr
+
+        r = Repr()
+        r.maxother = 10000
+        _repr_running.add(key)
+        try:
+            return '(_State: ' + ', '.join(
+                map(r.repr, (self.sym, self.s_type, self.out, self.out1, self.last_list))
+            ) + ')'
+        finally:
+            _repr_running.discard(key)
+
+
+_repr_running: Set[int] = set()
+
 
 _early_match_state = _State(s_type=_StateType.EARLY_MATCH)
 _match_state = _State(s_type=_StateType.MATCH)
@@ -264,10 +770,12 @@ _match_state = _State(s_type=_StateType.MATCH)
 # Frag.start points at the start state.
 # Frag.out is a list of places that need to be set to the next state for this fragment.
 #
-@dataclass
 class _Fragment(object):
-    start: _State = None
-    out: List[_State] = None
+    __slots__ = ('start', 'out')
+
+    def __init__(self, start: _State, out: List[_State]) -> None:
+        self.start = start
+        self.out = out
 
 
 #
@@ -286,9 +794,23 @@ def _post2nfa(postfix: Text) -> _State:
         raise ValueError("postfix can't be empty")
 
     escape: bool = False
+    save: bool = False
+    fold: bool = False
     stack: Stack[_Fragment] = Stack()
 
     for sym in postfix:
+        if save:
+            s = _State(sym=ord(sym), s_type=_StateType.SAVE)
+            stack.push(_Fragment(s, [s.out]))
+            save = False
+            continue
+
+        if fold:
+            s = _State(sym=folded_set(sym), s_type=_StateType.SYM_SET)
+            stack.push(_Fragment(s, [s.out]))
+            fold = False
+            continue
+
         if escape:
             if sym not in _ESCAPABLE_SYMS_EX:
                 raise ValueError('invalid escape sequence in postfix')
@@ -304,6 +826,10 @@ def _post2nfa(postfix: Text) -> _State:
 
         if sym == _ESCAPE_SYM:
             escape = True
+        elif sym == _SAVE_OP:
+            save = True
+        elif sym == _FOLD_OP:
+            fold = True
         elif sym == _CONCAT_OP:
             elem2 = stack.pop()
             elem1 = stack.pop()
@@ -343,7 +869,7 @@ def _post2nfa(postfix: Text) -> _State:
             s = _State(sym=sym, s_type=_StateType.SYM)
             stack.push(_Fragment(s, [s.out]))
 
-    if escape:
+    if escape or save or fold:
         raise ValueError('invalid escape sequence in postfix')
 
     elem = stack.pop()
@@ -354,15 +880,303 @@ def _post2nfa(postfix: Text) -> _State:
     return elem.start
 
 
+#
+# Early exit at compile time: a '.*' or '.+' loop leading straight to the MATCH state
+# accepts whatever the rest of the string is, so its exit is turned into EARLY_MATCH
+# state, which stops the matching as soon as the loop is reached (see _addstate()).
+# The loop goes back to a copy of its SPLIT state (see _set_state() in _post2nfa()),
+# and both of them share the exit placeholder, which is changed in place.
+# The NFA must not be hash-consed yet.
+#
+def _accept_all_tails(start: _State) -> _State:
+    any_sym = get_symbol_set('.')
+    for s in _all_states(start):
+        if s.s_type != _StateType.SPLIT:
+            continue
+
+        for loop, exit in ((s.out, s.out1), (s.out1, s.out)):
+            if loop is None or loop.s_type != _StateType.SYM_SET or loop.sym is not any_sym:
+                continue
+            if exit is None or exit.s_type != _StateType.MATCH or exit is _match_state:
+                continue
+
+            back = loop.out
+            if back.s_type == _StateType.SPLIT and {id(back.out), id(back.out1)} == {id(loop), id(exit)}:
+                exit.s_type = _StateType.EARLY_MATCH
+
+    return start
+
+
+#
+# Hash-consing of NFA states.
+#
+# Structurally identical states (same type and symbol, same successors) are shared
+# within a pattern and between all compiled patterns. States are processed by strongly
+# connected components in reverse topological order, so that successors outside of
+# the current component are already canonical. A cyclic component (like the one built
+# for 'a*') is looked up by its serialization, starting from each of its states.
+#
+# Interned states are weakly referenced; a state keeps its successors alive,
+# so successor ids in the keys of alive states can't be reused.
+#
+_interned: 'WeakValueDictionary[tuple, _State]' = WeakValueDictionary()
+for _s in (_early_match_state, _match_state):
+    _interned[(_s.s_type, _s.sym, None, None)] = _s
+
+#
+# Cyclic components larger than this are never shared between patterns.
+#
+_HASHCONS_MAX_CYCLE = 64
+
+
+def _successors(s: _State) -> List[_State]:
+    return [x for x in (s.out, s.out1) if x is not None and x.s_type != _StateType.NONE]
+
+
+#
+# Tarjan's algorithm.
+# Return list of strongly connected components reachable from start state,
+# each component goes after all components reachable from it.
+#
+def _components(start: _State) -> List[List[_State]]:
+    index: Dict[int, int] = {}
+    low: Dict[int, int] = {}
+    on_stack: Set[int] = set()
+    path: Stack[_State] = Stack()
+    work: Stack[Tuple[_State, Iterator[_State]]] = Stack()
+    result: List[List[_State]] = []
+
+    def _visit(s: _State) -> None:
+        index[id(s)] = low[id(s)] = len(index)
+        path.push(s)
+        on_stack.add(id(s))
+        work.push((s, iter(_successors(s))))
+
+    _visit(start)
+    while not work.is_empty():
+        s, successors = work.peek()
+        for x in successors:
+            if id(x) not in index:
+                _visit(x)
+                break
+            if id(x) in on_stack:
+                low[id(s)] = min(low[id(s)], index[id(x)])
+        else:
+            work.pop()
+            if not work.is_empty():
+                parent = work.peek()[0]
+                low[id(parent)] = min(low[id(parent)], low[id(s)])
+
+            if low[id(s)] == index[id(s)]:
+                component = []
+                while True:
+                    x = path.pop()
+                    on_stack.discard(id(x))
+                    component.append(x)
+                    if x is s:
+                        break
+                result.append(component)
+
+    return result
+
+
+def _hashcons(start: _State) -> _State:
+    canon: Dict[int, _State] = {}
+
+    def _canon(x: Union[_State, None]) -> Union[_State, None]:
+        if x is None or x.s_type == _StateType.NONE:
+            return x
+        return canon.get(id(x), x)
+
+    def _key(x: _State) -> tuple:
+        return x.s_type, x.sym, _ref(x.out), _ref(x.out1)
+
+    def _ref(x: Union[_State, None]) -> Union[int, None]:
+        if x is None or x.s_type == _StateType.NONE:
+            return None
+        return id(x)
+
+    def _serialize(first: _State, members: Set[int]) -> tuple:
+        local = {id(first): 0}
+        order = [first]
+        for x in order:
+            for y in (x.out, x.out1):
+                if y is not None and id(y) in members and id(y) not in local:
+                    local[id(y)] = len(order)
+                    order.append(y)
+
+        def _lref(y: Union[_State, None]) -> tuple:
+            if y is not None and id(y) in members:
+                return 'local', local[id(y)]
+            return 'ref', _ref(y)
+
+        return ('cycle',) + tuple((x.s_type, x.sym, _lref(x.out), _lref(x.out1)) for x in order)
+
+    for component in _components(start):
+        for x in component:
+            if x.s_type in (_StateType.MATCH, _StateType.EARLY_MATCH):
+                continue
+            x.out = _canon(x.out)
+            x.out1 = _canon(x.out1)
+
+        x = component[0]
+        if len(component) == 1 and x.out is not x and x.out1 is not x:
+            canon[id(x)] = _interned.setdefault(_key(x), x)
+            continue
+
+        if len(component) <= _HASHCONS_MAX_CYCLE:
+            members = {id(x) for x in component}
+            keys = [_serialize(x, members) for x in component]
+            for x, key in zip(component, keys):
+                found = _interned.get(key)
+                if found is None:
+                    continue
+
+                # map the whole component onto the already interned one
+                pairs = [(x, found)]
+                for ours, theirs in pairs:
+                    if id(ours) in canon:
+                        continue
+                    canon[id(ours)] = theirs
+                    for y, z in ((ours.out, theirs.out), (ours.out1, theirs.out1)):
+                        if y is not None and id(y) in members:
+                            pairs.append((y, z))
+                break
+            else:
+                for x, key in zip(component, keys):
+                    _interned[key] = x
+
+        for x in component:
+            if id(x) not in canon:
+                canon[id(x)] = _interned.setdefault(_key(x), x)
+
+    return canon[id(start)]
+
+
+#
+# Return all states reachable from start state, including NONE placeholders.
+#
+def _all_states(start: _State) -> List[_State]:
+    seen = {id(start)}
+    states = [start]
+    for s in states:
+        for x in (s.out, s.out1):
+            if x is not None and id(x) not in seen:
+                seen.add(id(x))
+                states.append(x)
+
+    return states
+
+
+#
+# Approximate number of bytes taken by a single _State object.
+#
+def _state_size() -> int:
+    return sys.getsizeof(_State())
+
+
+#
+# Estimate number of _State objects _post2nfa() allocates for postfix, without building anything.
+# Every operand allocates a state and two placeholders for its arrows, SPLIT states built
+# for '|' come with both arrows set and the ones for repeaters allocate a single placeholder.
+# RexError is raised with position of the responsible pattern symbol as soon as
+# the estimate exceeds max_states.
+#
+def _estimate_states(postfix: Text, positions: List[int], max_states: Optional[int] = None) -> int:
+    count: int = 0
+    escape: bool = False
+    for i, sym in enumerate(postfix):
+        if escape:
+            count += 3
+            escape = False
+        elif sym in (_ESCAPE_SYM, _FOLD_OP):
+            escape = True
+        elif sym == '|':
+            count += 1
+        elif sym in _REPEATER_SYMS:
+            count += 2
+        elif sym not in (_CONCAT_OP, _EARLY_MATCH_OP, _MATCH_OP):
+            count += 3
+
+        if max_states is not None and count > max_states:
+            raise RexError(f'pattern needs more than {max_states} states', positions[i])
+
+    return count
+
+
 #
 # Compile regular expression.
 # Return RexPattern() object with attached NFA for later use.
+# Unless engine is 'nfa', the planner may attach a faster engine (see _planner.py);
+# by default it is only done for large alternations of literal strings, which are matched
+# by LiteralSet without building the NFA at all (see _nfa_of()).
+# An already compiled pattern is returned as is if engine is None,
+# otherwise a copy sharing its NFA is planned for the requested engine;
+# its ignorecase flag can't be changed (like flags of compiled stdlib re patterns).
+# If max_errors is given, the approximate engine is used (see _approx.py) and no other
+# engine can be requested, neither now nor for copies.
+# Patterns that need more than max_states NFA states (see _estimate_states())
+# or have groups nested deeper than max_depth generate RexError.
 #
-def _compile(pattern: Union[Text, RexPattern]) -> RexPattern:
+def _compile(pattern: Union[Text, RexPattern], engine: Optional[Text] = None,
+             max_dfa_states: int = _DFA_MAX_STATES,
+             max_states: Optional[int] = None, max_depth: Optional[int] = None,
+             ignorecase: bool = False, max_errors: int = 0) -> RexPattern:
+    if max_errors < 0:
+        raise ValueError('max_errors must not be negative')
+    if max_errors and engine is not None:
+        raise ValueError('engine cannot be given along with max_errors')
+
     if isinstance(pattern, RexPattern):
-        return pattern
+        if ignorecase:
+            raise ValueError('cannot process ignorecase argument with a compiled pattern')
+        if max_errors:
+            raise ValueError('cannot process max_errors argument with a compiled pattern')
+        if engine is None:
+            return pattern
+        if pattern._max_errors:
+            raise ValueError('cannot change engine of a pattern compiled with max_errors')
+        obj = RexPattern(pattern.pattern, pattern._nfa, _postfix=pattern._postfix,
+                         ignorecase=pattern._ignorecase)
+    else:
+        positions: List[int] = []
+        postfix = _re2post(pattern, positions, max_depth, ignorecase=ignorecase)
+        if max_states is not None:
+            _estimate_states(postfix, positions, max_states)
+        obj = RexPattern(pattern, _postfix=postfix, ignorecase=ignorecase)
+
+    obj._requested = engine
+    obj._max_dfa_states = max_dfa_states
+    if max_errors:
+        from ._planner import plan_approx
+
+        obj._max_errors = max_errors
+        obj._engine, obj._plan = plan_approx(obj, max_errors)
+    # only alternations can be planned for the default engine
+    elif engine is None and not obj._postfix.endswith('|'):
+        obj._plan = ['default engine']
+    else:
+        from ._planner import plan
+
+        obj._engine, obj._plan = plan(obj, engine, max_dfa_states)
+
+    if obj._engine is None:
+        _nfa_of(obj)
+        # patterns left on the NFA by default can be promoted once they get hot
+        if engine is None:
+            obj._calls = 0
+
+    return obj
+
+
+#
+# Return NFA of the pattern, building it on first use.
+#
+def _nfa_of(obj: RexPattern) -> _State:
+    if obj._nfa is None:
+        obj._nfa = _hashcons(_accept_all_tails(_post2nfa(obj._postfix)))
 
-    return RexPattern(pattern, _post2nfa(_re2post(pattern)))
+    return obj._nfa
 
 
 #
@@ -381,22 +1195,35 @@ def _is_early_match(s: _State) -> bool:
 #
 # Advance to next state (MATCH, EARLY_MATCH, SYM, SYM_SET) for each arrow of all current states.
 # Label each passed state.
+# Arrows are followed depth first with an explicit stack (out before out1),
+# so long chains of SPLIT states can't exhaust the interpreter stack.
 #
-def _addstate(l: List[_State], m_session: _MatchSession, s: Union[_State, None]) -> None:
-    if s is None or s.s_type == _StateType.NONE or s.last_list == m_session.list_id:
+def _addstate(l: List[_State], list_id: int, s: Union[_State, None]) -> None:
+    if s is None or s.s_type == _StateType.NONE or s.last_list == list_id:
         return
 
-    s.last_list = m_session.list_id
-    if s.s_type == _StateType.SPLIT:
-        if _is_early_match(s):
-            # no need to waste time analyzing other possible NFA paths
-            raise StopIteration
-
-        _addstate(l, m_session, s.out)
-        _addstate(l, m_session, s.out1)
+    if s.s_type != _StateType.SPLIT:
+        s.last_list = list_id
+        l.append(s)
         return
 
-    l.append(s)
+    stack = [s]
+    while stack:
+        s = stack.pop()
+        if s is None or s.s_type == _StateType.NONE or s.last_list == list_id:
+            continue
+
+        s.last_list = list_id
+        if s.s_type == _StateType.SPLIT:
+            if _is_early_match(s):
+                # no need to waste time analyzing other possible NFA paths
+                raise StopIteration
+
+            stack.append(s.out1)
+            stack.append(s.out)
+            continue
+
+        l.append(s)
 
 
 #
@@ -404,8 +1231,7 @@ def _addstate(l: List[_State], m_session: _MatchSession, s: Union[_State, None])
 #
 def _start_list(m_session: _MatchSession, start: _State) -> List[_State]:
     l: List[_State] = []
-    m_session.list_id += 1
-    _addstate(l, m_session, start)
+    _addstate(l, m_session.next(), start)
 
     return l
 
@@ -415,16 +1241,18 @@ def _start_list(m_session: _MatchSession, start: _State) -> List[_State]:
 #
 def _step(c_list: List[_State], m_session: _MatchSession, sym: Text) -> List[_State]:
     n_list: List[_State] = []
-    m_session.list_id += 1
+    list_id = m_session.next()
     for s in c_list:
         if (s.s_type == _StateType.SYM and s.sym == sym) or (s.s_type == _StateType.SYM_SET and s.sym(sym)):
-            _addstate(n_list, m_session, s.out)
+            _addstate(n_list, list_id, s.out)
 
     return n_list
 
 
 #
 # Run NFA to determine whether it matches string.
+# Matching stops as soon as the state list gets empty or an EARLY_MATCH state is reached
+# (see _addstate() and _accept_all_tails()).
 #
 def _match(obj: RexPattern, string: Text) -> bool:
     if obj._nfa.s_type == _StateType.MATCH:
@@ -433,10 +1261,260 @@ def _match(obj: RexPattern, string: Text) -> bool:
     try:
         c_list = _start_list(obj._m_session, obj._nfa)
         for sym in string:
-            n_list = _step(c_list, obj._m_session, sym)
-            c_list = n_list
+            c_list = _step(c_list, obj._m_session, sym)
+            # no states left, the rest of the string can't be matched
+            if not c_list:
+                return False
     except StopIteration:
         return True
 
     # Check whether state list contains a match.
     return bool([x for x in c_list if x.s_type == _StateType.MATCH])
+
+
+#
+# Incremental form of _match(): string is fed by chunks and nothing is buffered.
+# Since every step uses a fresh list_id, streams of a shared NFA can be interleaved.
+#
+class _NFAStream(object):
+    __slots__ = ('_session', '_list', 'result')
+
+    def __init__(self, obj: RexPattern) -> None:
+        nfa = _nfa_of(obj)
+        self._session = obj._m_session
+        self._list: List[_State] = []
+        # True or False as soon as the result doesn't depend on the rest of the string
+        self.result: Optional[bool] = None
+        if nfa.s_type == _StateType.MATCH:
+            self.result = True
+            return
+
+        try:
+            self._list = _start_list(self._session, nfa)
+        except StopIteration:
+            self.result = True
+
+    def feed(self, chunk: Text, start: int = 0, end: Optional[int] = None) -> None:
+        if self.result is not None:
+            return
+
+        c_list = self._list
+        try:
+            for i in range(start, len(chunk) if end is None else end):
+                c_list = _step(c_list, self._session, chunk[i])
+        except StopIteration:
+            self.result = True
+            return
+
+        self._list = c_list
+        if not c_list:
+            self.result = False
+
+    def close(self) -> bool:
+        if self.result is None:
+            self.result = bool([x for x in self._list if x.s_type == _StateType.MATCH])
+        return self.result
+
+
+#
+# Same as _match() but raise RexBudgetError when more than budget automaton states are visited
+# or deadline is passed. Deadline is checked once per _DEADLINE_INTERVAL symbols.
+# Return (result, consumed symbols, visited states, DFA cache misses) tuple.
+#
+def _match_counted(obj: RexPattern, string: Text, budget: Optional[int],
+                   deadline: Optional[float]) -> Tuple[bool, int, int, int]:
+    if obj._engine is not None:
+        return obj._engine.match_counted(string, budget, deadline)
+
+    if obj._nfa.s_type == _StateType.MATCH:
+        return True, 0, 0, 0
+
+    m_session = obj._m_session
+    visits: int = 0
+    consumed: int = 0
+    try:
+        c_list: List[_State] = []
+        visits = _addstate_counted(c_list, m_session.next(), obj._nfa)
+        for sym in string:
+            # the states of c_list are visited by _step(), along with the ones _addstate() reaches from them
+            if budget is not None and visits + len(c_list) > budget:
+                raise RexBudgetError(f'budget of {budget} state visits exceeded at position {consumed}')
+            if deadline is not None and consumed % _DEADLINE_INTERVAL == 0 and monotonic() > deadline:
+                raise RexBudgetError(f'deadline exceeded at position {consumed}')
+
+            consumed += 1
+            visits += len(c_list)
+            n_list: List[_State] = []
+            list_id = m_session.next()
+            for s in c_list:
+                if (s.s_type == _StateType.SYM and s.sym == sym) or \
+                        (s.s_type == _StateType.SYM_SET and s.sym(sym)):
+                    visits += _addstate_counted(n_list, list_id, s.out)
+            c_list = n_list
+            if not c_list:
+                return False, consumed, visits, 0
+    except StopIteration:
+        return True, consumed, visits, 0
+
+    return bool([x for x in c_list if x.s_type == _StateType.MATCH]), consumed, visits + len(c_list), 0
+
+
+#
+# _addstate() returning the number of states it reached, including SPLIT states and the ones
+# already in the list, for statistics and budgets. The early match raises StopIteration as well.
+#
+def _addstate_counted(l: List[_State], list_id: int, s: Union[_State, None]) -> int:
+    visits = 0
+    stack = [s]
+    while stack:
+        s = stack.pop()
+        if s is None or s.s_type == _StateType.NONE:
+            continue
+
+        visits += 1
+        if s.last_list == list_id:
+            continue
+
+        s.last_list = list_id
+        if s.s_type == _StateType.SPLIT:
+            if _is_early_match(s):
+                raise StopIteration
+
+            stack.append(s.out1)
+            stack.append(s.out)
+            continue
+
+        l.append(s)
+
+    return visits
+
+
+#
+# Matching with limits and/or runtime statistics.
+#
+def _match_slow(obj: RexPattern, string: Text, budget: Optional[int], deadline: Optional[float]) -> bool:
+    stats = obj._stats
+    if stats is None:
+        return _match_counted(obj, string, budget, deadline)[0]
+
+    start = perf_counter()
+    try:
+        result, consumed, visits, misses = _match_counted(obj, string, budget, deadline)
+    finally:
+        stats.calls += 1
+        stats.time += perf_counter() - start
+
+    if result:
+        stats.matched += 1
+    else:
+        stats.unmatched += 1
+    stats.symbols += consumed
+    stats.states += visits
+    if obj._engine is not None and obj._engine.name in ('dfa', 'compact', 'reverse'):
+        stats.dfa_cache_hits += consumed - misses
+        stats.dfa_cache_misses += misses
+
+    return result
+
+
+#
+# Build NFA with SAVE states for capture groups, once per pattern (see _re2post()).
+# It is not hash-consed: SAVE states are specific to the pattern grouping.
+#
+def _capture_nfa(obj: RexPattern) -> _State:
+    if obj._captures is None:
+        obj._captures = _post2nfa(_re2post(obj.pattern, captures=True, ignorecase=obj._ignorecase))
+
+    return obj._captures
+
+
+#
+# Count groups of a valid pattern, i.e. its unescaped opening parentheses.
+#
+def _count_groups(pattern: Text) -> int:
+    count = 0
+    escape = False
+    for sym in pattern:
+        if escape:
+            escape = False
+        elif sym == _ESCAPE_SYM:
+            escape = True
+        elif sym == '(':
+            count += 1
+
+    return count
+
+
+class _EarlyMatch(Exception):
+    def __init__(self, slots: Tuple[Optional[int], ...]) -> None:
+        super(_EarlyMatch, self).__init__()
+        self.slots = slots
+
+
+#
+# Same as _addstate() for the NFA with SAVE states: every state in the list
+# carries capture slots of the thread that reached it. Arrows are followed in
+# priority order (out before out1), so the first thread reaching a state wins;
+# that makes '*', '+', '?' greedy and '|' prefer its left alternative.
+# Reaching EARLY_MATCH state through SPLIT raises _EarlyMatch with the slots of the thread.
+#
+def _addthread(l: List[Tuple[_State, tuple]], list_id: int, s: Union[_State, None],
+               slots: tuple, pos: int) -> None:
+    stack = [(s, slots, False)]
+    while stack:
+        s, slots, via_split = stack.pop()
+        if s is None or s.s_type == _StateType.NONE:
+            continue
+
+        if s.s_type == _StateType.EARLY_MATCH and via_split:
+            raise _EarlyMatch(slots)
+
+        if s.last_list == list_id:
+            continue
+
+        s.last_list = list_id
+        if s.s_type == _StateType.SPLIT:
+            stack.append((s.out1, slots, True))
+            stack.append((s.out, slots, True))
+        elif s.s_type == _StateType.SAVE:
+            stack.append((s.out, slots[:s.sym] + (pos,) + slots[s.sym + 1:], via_split))
+        else:
+            l.append((s, slots))
+
+
+#
+# Pike VM: run NFA with SAVE states against string.
+# Return capture slots of the highest priority matching thread or None if string doesn't match.
+# Slots 0 and 1 hold the span of the whole string; a group still open when EARLY_MATCH
+# is reached spans to the end of the string.
+#
+def _match_captures(obj: RexPattern, string: Text) -> Optional[Tuple[Optional[int], ...]]:
+    start = _capture_nfa(obj)
+    slots = (0,) + (None,) * (2 * obj.groups + 1)
+    if start.s_type == _StateType.MATCH:
+        return (0, len(string)) + slots[2:]
+
+    m_session = obj._m_session
+    try:
+        c_list: List[Tuple[_State, tuple]] = []
+        _addthread(c_list, m_session.next(), start, slots, 0)
+        for pos, sym in enumerate(string):
+            list_id = m_session.next()
+            n_list: List[Tuple[_State, tuple]] = []
+            for s, slots in c_list:
+                if (s.s_type == _StateType.SYM and s.sym == sym) or \
+                        (s.s_type == _StateType.SYM_SET and s.sym(sym)):
+                    _addthread(n_list, list_id, s.out, slots, pos + 1)
+            c_list = n_list
+    except _EarlyMatch as e:
+        result = [0, len(string)] + list(e.slots[2:])
+        for i in range(3, len(result), 2):
+            if result[i - 1] is not None and (result[i] is None or result[i] < result[i - 1]):
+                result[i] = len(string)
+        return tuple(result)
+
+    for s, slots in c_list:
+        if s.s_type == _StateType.MATCH:
+            return (0, len(string)) + slots[2:]
+
+    return None
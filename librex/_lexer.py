@@ -0,0 +1,252 @@
+#
+# Multi-pattern longest-match tokenizer.
+#
+# NFAs of all token rules are joined by a chain of SPLIT states into a single automaton,
+# whose MATCH states hold the numbers of their rules. The automaton is converted to a tagged
+# DFA (see _dfa.py), so that the input is scanned once: at every position the DFA runs as
+# far as it can, remembering the last accepting state, and the token ends there
+# (longest match). Rules matching the same longest token are resolved by their order.
+#
+# Rules are compiled without hash-consing, so that MATCH states of different rules
+# stay distinct. If the DFA is too large, the joined NFA is simulated instead.
+#
+from __future__ import annotations
+
+from ._impl import RexError, RexPattern, _State, _StateType, _DFA_MAX_STATES, _re2post, _post2nfa, \
+    _all_states, _start_list, _step, _shared_session
+
+TYPE_CHECKING = False
+if TYPE_CHECKING:
+    from typing import Any, Callable, Text, Union, Optional, Iterable, Iterator, List, Tuple
+
+
+class Lexer(object):
+    """Tokenizer combining several token patterns into one automaton.
+
+    Attributes:
+        rules: List of (name, pattern) pairs the lexer was built from, with compiled patterns
+            replaced by their pattern strings (their flags are not kept)
+    """
+
+    def __init__(self, rules: Iterable[Tuple[Optional[Text], Union[Text, RexPattern]]],
+                 max_dfa_states: int = _DFA_MAX_STATES) -> None:
+        """Build lexer from (name, pattern) pairs.
+
+        Rules with None name match tokens that are skipped (e.g. whitespace).
+        Rules given as compiled patterns keep their ignorecase flag; ValueError is raised
+        for the ones compiled with max_errors.
+        RexError is raised for rules that match the empty string or contain empty alternatives.
+        If the combined DFA would have more than max_dfa_states states, the NFA is simulated instead.
+        """
+        self.rules: List[Tuple[Optional[Text], Text]] = []
+        starts: List[_State] = []
+        for n, (name, pattern) in enumerate(rules):
+            ignorecase = False
+            if isinstance(pattern, RexPattern):
+                if pattern._max_errors:
+                    raise ValueError(f'rule {name!r}: approximate patterns are not supported by Lexer')
+                ignorecase = pattern._ignorecase
+                pattern = pattern.pattern
+            self.rules.append((name, pattern))
+            starts.append(_rule_nfa(n, name, pattern, ignorecase))
+
+        if not starts:
+            raise ValueError('no rules given')
+
+        self._nfa = starts.pop()
+        while starts:
+            self._nfa = _State(s_type=_StateType.SPLIT, out=starts.pop(), out1=self._nfa)
+
+        from ._dfa import build_dfa
+        from ._program import flatten
+
+        self._dfa = build_dfa(flatten(self._nfa), max_dfa_states, tagged=True)
+
+    def __repr__(self) -> str:
+        return f'<Lexer rules={len(self.rules)} engine={self.engine}>'
+
+    @property
+    def engine(self) -> Text:
+        """Name of the engine used for scanning: 'dfa' or 'nfa'."""
+        return 'nfa' if self._dfa is None else 'dfa'
+
+    def tokenize(self, string: Text, pos: int = 0,
+                 endpos: Optional[int] = None) -> Iterator[Tuple[Text, int, int]]:
+        """Scan string[pos:endpos] once, yielding (name, start, end) tuples of the tokens.
+
+        Every token is the longest prefix of the remaining input matched by any rule,
+        the first such rule names it. Tokens are produced lazily and the string is never sliced.
+        RexError is raised with the position of the input no rule matches at.
+        """
+        if endpos is None or endpos > len(string):
+            endpos = len(string)
+
+        scan = self._scan_nfa if self._dfa is None else self._scan_dfa
+        while pos < endpos:
+            rule, end = scan(string, pos, endpos)
+            if rule < 0:
+                raise RexError('no rule matches', pos)
+
+            name = self.rules[rule][0]
+            if name is not None:
+                yield name, pos, end
+            pos = end
+
+    def tokenize_chunks(self, chunks: Iterable[Text]) -> Iterator[Tuple[Text, int, int]]:
+        """Scan the concatenation of the chunks once, yielding (name, start, end) tuples of the tokens.
+
+        chunks is any iterable of strings (e.g. a text file), which is read lazily; tokens may span
+        chunk boundaries and their positions count from the start of the first chunk.
+        Tokens are the same as of tokenize(''.join(chunks)).
+        """
+        start, step, tag = self._stepper()
+        text = ''
+        base = 0
+        tok = 0
+        rule, end = -1, 0
+        state = start()
+        for chunk in chunks:
+            if not chunk:
+                continue
+            pos = base + len(text)
+            # keep the input after the last accepting position of the token, it is scanned again
+            # once the token ends
+            if rule >= 0:
+                text = text[end - base:] + chunk
+                base = end
+            else:
+                text = chunk
+                base = pos
+
+            i = pos - base
+            n = len(text)
+            while i < n:
+                state = step(state, text[i])
+                if state is None:
+                    if rule < 0:
+                        raise RexError('no rule matches', tok)
+
+                    name = self.rules[rule][0]
+                    if name is not None:
+                        yield name, tok, end
+                    tok = end
+                    i = end - base
+                    rule = -1
+                    state = start()
+                    continue
+
+                t = tag(state)
+                if t is not None:
+                    rule, end = t, base + i + 1
+                i += 1
+
+        # the input ended: the pending token is complete and the rest of it is scanned as a whole
+        if tok == base + len(text):
+            return
+        if rule < 0:
+            raise RexError('no rule matches', tok)
+
+        name = self.rules[rule][0]
+        if name is not None:
+            yield name, tok, end
+        for name, s, e in self.tokenize(text, end - base):
+            yield name, base + s, base + e
+
+    #
+    # Return (start, step, tag) functions of the automaton, scanning one symbol at a time:
+    # start() returns the initial state, step(state, sym) the next one or None if no token
+    # can continue, tag(state) the rule accepted in the state or None.
+    #
+    def _stepper(self) -> Tuple[Callable[[], Any], Callable[[Any, Text], Any],
+                                Callable[[Any], Optional[int]]]:
+        dfa = self._dfa
+        if dfa is None:
+            m_session = _shared_session
+            nfa = self._nfa
+
+            def nfa_step(c_list: List[_State], sym: Text) -> Optional[List[_State]]:
+                return _step(c_list, m_session, sym) or None
+
+            def nfa_tag(c_list: List[_State]) -> Optional[int]:
+                return min((s.sym for s in c_list if s.s_type == _StateType.MATCH), default=None)
+
+            return lambda: _start_list(m_session, nfa), nfa_step, nfa_tag
+
+        table = dfa.table
+        size = len(table)
+        char_map = dfa._char_map
+        tags = dfa.tags
+
+        def dfa_step(s: int, sym: Text) -> Optional[int]:
+            # s is a sink state (see _dfa.py), an accepting one takes the rest of the input
+            if s >= size:
+                return s if s in tags else None
+            k = char_map.get(sym)
+            if k is None:
+                k = dfa.classify(sym)
+            s = table[s + k]
+            return None if s >= size and s not in tags else s
+
+        return lambda: dfa.start, dfa_step, tags.get
+
+    #
+    # Return (rule, end) of the longest token starting at pos or (-1, pos) if there is none.
+    #
+    def _scan_dfa(self, string: Text, pos: int, endpos: int) -> Tuple[int, int]:
+        dfa = self._dfa
+        table = dfa.table
+        char_map = dfa._char_map
+        tags = dfa.tags
+        s = dfa.start
+        rule, end = -1, pos
+        try:
+            for i in range(pos, endpos):
+                sym = string[i]
+                k = char_map.get(sym)
+                if k is None:
+                    k = dfa.classify(sym)
+                s = table[s + k]
+                t = tags.get(s)
+                if t is not None:
+                    rule, end = t, i + 1
+        except IndexError:
+            # s is a sink state (see _dfa.py), an accepting one takes the rest of the input
+            if s in tags:
+                end = endpos
+
+        return rule, end
+
+    def _scan_nfa(self, string: Text, pos: int, endpos: int) -> Tuple[int, int]:
+        m_session = _shared_session
+        c_list = _start_list(m_session, self._nfa)
+        rule, end = -1, pos
+        for i in range(pos, endpos):
+            c_list = _step(c_list, m_session, string[i])
+            if not c_list:
+                break
+
+            t = min((s.sym for s in c_list if s.s_type == _StateType.MATCH), default=None)
+            if t is not None:
+                rule, end = t, i + 1
+
+        return rule, end
+
+
+#
+# Build NFA of rule number n, tagging its MATCH states with n.
+#
+def _rule_nfa(n: int, name: Optional[Text], pattern: Text, ignorecase: bool = False) -> _State:
+    start = _post2nfa(_re2post(pattern, ignorecase=ignorecase))
+    for s in _all_states(start):
+        if s.s_type == _StateType.EARLY_MATCH:
+            raise RexError(f'rule {name!r}: empty alternatives are not supported by Lexer')
+        if s.s_type == _StateType.MATCH:
+            if s is start:
+                raise RexError(f'rule {name!r} matches the empty string')
+            s.sym = n
+
+    if any(s.s_type == _StateType.MATCH for s in _start_list(_shared_session, start)):
+        raise RexError(f'rule {name!r} matches the empty string')
+
+    return start
+
@@ -0,0 +1,332 @@
+#
+# Engines for patterns made of literal symbols only.
+#
+from __future__ import annotations
+
+from array import array
+import sys
+
+from ._impl import RexBudgetError, _ESCAPE_SYM, _CONCAT_OP, _SYMSETS_SYMS, _REPEATER_SYMS, \
+    _EARLY_MATCH_OP, _MATCH_OP, _FOLD_OP
+
+TYPE_CHECKING = False
+if TYPE_CHECKING:
+    from typing import Union, Text, Optional, Tuple, Iterable, Iterator, List, Dict, Set
+
+
+#
+# Return the string matched by postfix regular expression
+# or None if postfix contains anything but literal symbols and concatenations.
+#
+def literal_of(postfix: Text) -> Optional[Text]:
+    syms = []
+    escape = False
+    for sym in postfix:
+        if escape:
+            if sym in _SYMSETS_SYMS:
+                return None
+            syms.append(sym)
+            escape = False
+        elif sym == _ESCAPE_SYM:
+            escape = True
+        elif sym == _CONCAT_OP:
+            continue
+        elif sym in _REPEATER_SYMS or sym in ('|', '.', _EARLY_MATCH_OP, _MATCH_OP, _FOLD_OP):
+            return None
+        else:
+            syms.append(sym)
+
+    return ''.join(syms)
+
+
+class LiteralEngine(object):
+    __slots__ = ('literal',)
+
+    name = 'literal'
+
+    def __init__(self, literal: Text) -> None:
+        self.literal = literal
+
+    def __repr__(self) -> str:
+        return f'<LiteralEngine {self.literal!r}>'
+
+    def match(self, string: Text) -> bool:
+        return string == self.literal
+
+    def match_counted(self, string: Text, budget: Optional[int],
+                      deadline: Optional[float]) -> Tuple[bool, int, int, int]:
+        # strings of different length are rejected without looking at the symbols
+        literal = self.literal
+        if len(string) != len(literal):
+            return False, len(string), 0, 0
+        if budget is None or len(string) <= budget:
+            return string == literal, len(string), len(string), 0
+
+        # the symbols are visited up to the first mismatch, which may come before the budget runs out
+        consumed = 0
+        while consumed < budget:
+            if string[consumed] != literal[consumed]:
+                return False, consumed + 1, consumed + 1, 0
+            consumed += 1
+        raise RexBudgetError(f'budget of {budget} state visits exceeded at position {consumed}')
+
+    def memory_estimate(self) -> int:
+        return len(self.literal)
+
+    def stream(self) -> '_LiteralStream':
+        return _LiteralStream(self.literal)
+
+
+#
+# Incremental matching, see _NFAStream in _impl.py.
+#
+class _LiteralStream(object):
+    __slots__ = ('_literal', '_pos', 'result')
+
+    def __init__(self, literal: Text) -> None:
+        self._literal = literal
+        self._pos = 0
+        self.result: Optional[bool] = None
+
+    def feed(self, chunk: Text, start: int = 0, end: Optional[int] = None) -> None:
+        if self.result is not None:
+            return
+
+        if end is None:
+            end = len(chunk)
+        pos = self._pos
+        if pos + end - start > len(self._literal) or not self._literal.startswith(chunk[start:end], pos):
+            self.result = False
+        self._pos = pos + end - start
+
+    def close(self) -> bool:
+        if self.result is None:
+            self.result = self._pos == len(self._literal)
+        return self.result
+
+
+#
+# Return set of strings matched by postfix regular expression or None if postfix contains anything
+# but alternatives of literal strings. Only whole strings can be concatenated, e.g. '(a|b)c' is rejected.
+#
+def literal_set_of(postfix: Text) -> Optional[Set[Text]]:
+    stack: List[Union[Text, Set[Text]]] = []
+    escape = False
+    for sym in postfix:
+        if escape:
+            if sym in _SYMSETS_SYMS:
+                return None
+            stack.append(sym)
+            escape = False
+        elif sym == _ESCAPE_SYM:
+            escape = True
+        elif sym == _CONCAT_OP:
+            second = stack.pop()
+            first = stack.pop()
+            if not isinstance(first, str) or not isinstance(second, str):
+                return None
+            stack.append(first + second)
+        elif sym == '|':
+            second = _as_set(stack.pop())
+            first = _as_set(stack.pop())
+            if len(first) > len(second):
+                first, second = second, first
+            second.update(first)
+            stack.append(second)
+        elif sym in _REPEATER_SYMS or sym in ('.', _EARLY_MATCH_OP, _MATCH_OP, _FOLD_OP):
+            return None
+        else:
+            stack.append(sym)
+
+    return _as_set(stack.pop())
+
+
+def _as_set(item: Union[Text, Set[Text]]) -> Set[Text]:
+    return {item} if isinstance(item, str) else item
+
+
+class LiteralSet(object):
+    """Set of literal strings matched at once.
+
+    Whole strings are checked by a hash lookup, substrings are searched for
+    by Aho-Corasick automaton built on the first search. The trie nodes are
+    numbered in breadth-first order and stored in flat arrays: children of node n
+    are labeled by syms[first[n]:first[n + 1]] and lead to the nodes in the same
+    slice of targets.
+
+    Attributes:
+        words: Frozen set of the strings
+    """
+    __slots__ = ('words', '_first', '_syms', '_targets', '_fail', '_length', '_link')
+
+    name = 'literal_set'
+
+    def __init__(self, words: Iterable[Text]) -> None:
+        self.words = frozenset(words)
+        self._first: Optional[array] = None
+
+    def __repr__(self) -> str:
+        return f'<LiteralSet words={len(self.words)}>'
+
+    def __len__(self) -> int:
+        return len(self.words)
+
+    def __contains__(self, string: object) -> bool:
+        return string in self.words
+
+    def match(self, string: Text) -> bool:
+        """Return True if the whole string is one of the words."""
+        return string in self.words
+
+    def match_counted(self, string: Text, budget: Optional[int],
+                      deadline: Optional[float]) -> Tuple[bool, int, int, int]:
+        if budget is None or len(string) <= budget:
+            return string in self.words, len(string), len(string), 0
+
+        # walk down the trie, which rejects strings that are no prefixes of the words
+        # before the budget runs out
+        if self._first is None:
+            self._build()
+        first, syms, targets = self._first, self._syms, self._targets
+        node = 0
+        consumed = 0
+        while consumed < budget:
+            i = syms.find(string[consumed], first[node], first[node + 1])
+            if i < 0:
+                return False, consumed + 1, consumed + 1, 0
+            node = targets[i]
+            consumed += 1
+        raise RexBudgetError(f'budget of {budget} state visits exceeded at position {consumed}')
+
+    def search(self, string: Text) -> Optional[Tuple[int, int]]:
+        """Return (start, end) of the first occurrence of any word in string or None.
+
+        Occurrences are ordered by their end positions; of the words ending at
+        the same position the longest one is reported.
+        """
+        for span in self.finditer(string):
+            return span
+        return None
+
+    def finditer(self, string: Text) -> Iterator[Tuple[int, int]]:
+        """Return an iterator over (start, end) of all occurrences of the words in string,
+        including overlapping ones, ordered by their end positions."""
+        if self._first is None:
+            self._build()
+
+        first, syms, targets = self._first, self._syms, self._targets
+        fail, length, link = self._fail, self._length, self._link
+        if length[0] >= 0:
+            yield 0, 0
+
+        node = 0
+        for end, sym in enumerate(string, 1):
+            while True:
+                i = syms.find(sym, first[node], first[node + 1])
+                if i >= 0:
+                    node = targets[i]
+                    break
+                if node == 0:
+                    break
+                node = fail[node]
+
+            out = node if length[node] >= 0 else link[node]
+            while out >= 0:
+                yield end - length[out], end
+                out = link[out]
+
+    def stream(self) -> '_TrieStream':
+        if self._first is None:
+            self._build()
+        return _TrieStream(self)
+
+    def memory_estimate(self) -> int:
+        size = sys.getsizeof(self.words) + sum(sys.getsizeof(w) for w in self.words)
+        if self._first is not None:
+            size += sum(sys.getsizeof(a) for a in (self._first, self._syms, self._targets,
+                                                   self._fail, self._length, self._link))
+        return size
+
+    #
+    # Build the trie, pack it into arrays and compute failure and output links.
+    # Node 0 is the root; link[n] is the nearest node on the failure chain of n that ends a word, or -1.
+    #
+    def _build(self) -> None:
+        trie: List[Dict[Text, int]] = [{}]
+        ends: Dict[int, int] = {}
+        for word in self.words:
+            node = 0
+            for sym in word:
+                nxt = trie[node].get(sym)
+                if nxt is None:
+                    nxt = trie[node][sym] = len(trie)
+                    trie.append({})
+                node = nxt
+            ends[node] = len(word)
+
+        # renumber nodes in breadth-first order, so that children of a node are adjacent
+        order = [0]
+        for node in order:
+            order.extend(trie[node][sym] for sym in sorted(trie[node]))
+        number = {node: n for n, node in enumerate(order)}
+
+        first = array('l', [0])
+        syms: List[Text] = []
+        targets = array('l')
+        for node in order:
+            for sym in sorted(trie[node]):
+                syms.append(sym)
+                targets.append(number[trie[node][sym]])
+            first.append(len(syms))
+        self._first, self._syms, self._targets = first, ''.join(syms), targets
+        self._length = array('l', (ends.get(node, -1) for node in order))
+
+        fail = self._fail = array('l', [0]) * len(order)
+        link = self._link = array('l', [-1]) * len(order)
+        for node in range(len(order)):
+            for i in range(first[node], first[node + 1]):
+                child = targets[i]
+                if node != 0:
+                    fail[child] = self._goto(fail[node], self._syms[i])
+                f = fail[child]
+                link[child] = f if self._length[f] >= 0 else link[f]
+
+    def _goto(self, node: int, sym: Text) -> int:
+        while True:
+            i = self._syms.find(sym, self._first[node], self._first[node + 1])
+            if i >= 0:
+                return self._targets[i]
+            if node == 0:
+                return 0
+            node = self._fail[node]
+
+
+#
+# Incremental whole string matching: walk down the trie of LiteralSet.
+#
+class _TrieStream(object):
+    __slots__ = ('_set', '_node', 'result')
+
+    def __init__(self, literal_set: LiteralSet) -> None:
+        self._set = literal_set
+        self._node = 0
+        self.result: Optional[bool] = None
+
+    def feed(self, chunk: Text, start: int = 0, end: Optional[int] = None) -> None:
+        if self.result is not None:
+            return
+
+        first, syms, targets = self._set._first, self._set._syms, self._set._targets
+        node = self._node
+        for i in range(start, len(chunk) if end is None else end):
+            k = syms.find(chunk[i], first[node], first[node + 1])
+            if k < 0:
+                self.result = False
+                return
+            node = targets[k]
+        self._node = node
+
+    def close(self) -> bool:
+        if self.result is None:
+            self.result = self._set._length[self._node] >= 0
+        return self.result
@@ -0,0 +1,148 @@
+#
+# Engine planner.
+#
+# Every compiled pattern keeps its NFA, which is simulated by _match() unless
+# a faster engine is attached to the pattern. The planner inspects the compiled
+# program and picks the engine, recording the reasons of its choice
+# (see RexPattern.explain()):
+#   - 'literal': pattern made of literal symbols only is compared as a string;
+#   - 'literal_set': alternation of literal strings is looked up in a set;
+#   - 'dfa': minimal DFA, if it fits into max_dfa_states states;
+#   - 'reverse': DFA of the reversed pattern scanning strings from the end, if the forward
+#     DFA can't reject anything before the end of the string (it has no dead state, like
+#     the one of '.*\.log') or doesn't fit, while the reversed one can;
+#   - 'compact': the same minimal DFA with its transitions packed by row displacement
+#     (see _compact.py), if its dense table has at least _COMPACT_MIN_ENTRIES entries
+#     and the packed one takes at most 1/_COMPACT_MIN_RATIO of its memory;
+#   - 'nfa': Thompson's NFA simulation, used for everything else.
+#
+# Patterns compiled with max_errors always get the 'approx' engine, the bit-parallel
+# NFA simulation tolerating errors (see _approx.py).
+#
+# Without engine given, only alternations of at least _LITERAL_SET_MIN_WORDS literal
+# strings get 'literal_set' engine, since their NFA is both large and slow.
+#
+from __future__ import annotations
+
+from ._impl import RexError, RexPattern, _nfa_of, _post2nfa, _reverse_postfix
+from ._dfa import DFA, ReverseDFA, build_dfa
+from ._literal import literal_of, literal_set_of, LiteralEngine, LiteralSet
+from ._program import flatten
+
+TYPE_CHECKING = False
+if TYPE_CHECKING:
+    from typing import Any, Text, Optional, List, Tuple
+
+ENGINES = ('auto', 'nfa', 'dfa', 'compact', 'reverse', 'literal', 'literal_set')
+
+_LITERAL_SET_MIN_WORDS = 16
+
+#
+# Dense DFA tables smaller than that are kept as they are, a lookup in them is faster.
+#
+_COMPACT_MIN_ENTRIES = 65536
+_COMPACT_MIN_RATIO = 4
+
+
+#
+# Return (engine, reasons) tuple, where engine is None for NFA simulation.
+#
+def plan(obj: RexPattern, engine: Optional[Text], max_dfa_states: int) -> Tuple[Optional[Any], List[Text]]:
+    if engine is None:
+        words = literal_set_of(obj._postfix)
+        if words is not None and len(words) >= _LITERAL_SET_MIN_WORDS:
+            return LiteralSet(words), [f'pattern is an alternation of {len(words)} literal strings']
+        return None, ['default engine']
+
+    if engine not in ENGINES:
+        raise ValueError(f'unknown engine: {engine!r}, expected one of {", ".join(ENGINES)}')
+
+    if engine == 'nfa':
+        return None, ["engine 'nfa' requested"]
+
+    if engine == 'literal_set':
+        words = literal_set_of(obj._postfix)
+        if words is None:
+            raise RexError("engine 'literal_set' requested for a pattern that is not "
+                           "an alternation of literal strings")
+        return LiteralSet(words), ["engine 'literal_set' requested"]
+
+    literal = literal_of(obj._postfix)
+    if engine == 'literal':
+        if literal is None:
+            raise RexError("engine 'literal' requested for a pattern that is not a literal string")
+        return LiteralEngine(literal), ["engine 'literal' requested"]
+
+    reasons = []
+    if engine == 'auto':
+        if literal is not None:
+            return LiteralEngine(literal), [f'pattern is a literal string of {len(literal)} symbols']
+        words = literal_set_of(obj._postfix)
+        if words is not None:
+            return LiteralSet(words), [f'pattern is an alternation of {len(words)} literal strings']
+    else:
+        reasons.append(f"engine '{engine}' requested")
+
+    if engine == 'reverse':
+        dfa = _reverse_dfa(obj, max_dfa_states)
+        if dfa is None:
+            reasons.append(f'reversed DFA is not available or exceeds the limit of {max_dfa_states} '
+                           'states, using NFA simulation')
+            return None, reasons
+        reasons.append(f'reversed DFA has {dfa.nstates} states over {dfa.nclasses} symbol classes')
+        return ReverseDFA(dfa), reasons
+
+    prog = flatten(_nfa_of(obj))
+    reasons.append(f'NFA has {len(prog)} states')
+
+    dfa = build_dfa(prog, max_dfa_states)
+    if engine == 'auto' and (dfa is None or dfa.dead < 0):
+        rdfa = _reverse_dfa(obj, max_dfa_states)
+        if rdfa is not None and rdfa.dead >= 0:
+            if dfa is None:
+                reasons.append(f'DFA exceeds the limit of {max_dfa_states} states')
+            else:
+                reasons.append('DFA has no dead state, so every string is read to its end')
+            reasons.append(f'reversed DFA has {rdfa.nstates} states over {rdfa.nclasses} symbol classes, '
+                           'scanning strings from the end')
+            return ReverseDFA(rdfa), reasons
+
+    if dfa is None:
+        reasons.append(f'DFA exceeds the limit of {max_dfa_states} states, using NFA simulation')
+        return None, reasons
+
+    reasons.append(f'DFA has {dfa.nstates} states over {dfa.nclasses} symbol classes')
+    if dfa.alphabet.bases:
+        reasons.append('symbols outside of the pattern are classified by symbol sets on their first use')
+
+    if engine == 'compact' or (engine == 'auto' and len(dfa.table) >= _COMPACT_MIN_ENTRIES):
+        from ._compact import CompactDFA
+
+        compact = CompactDFA(dfa)
+        dense, packed = dfa.memory_estimate(), compact.memory_estimate()
+        if engine == 'compact' or packed * _COMPACT_MIN_RATIO <= dense:
+            reasons.append(f'transitions packed into {len(compact._next)} slots of '
+                           f'{len(dfa.table)} table entries, {packed} bytes instead of {dense}')
+            return compact, reasons
+
+    return dfa, reasons
+
+
+def plan_approx(obj: RexPattern, max_errors: int) -> Tuple[Any, List[Text]]:
+    from ._approx import ApproxNFA
+
+    prog = flatten(_nfa_of(obj))
+    engine = ApproxNFA(prog, max_errors)
+    return engine, [f'approximate matching with up to {max_errors} errors',
+                    f'NFA has {len(prog)} states, {engine.nbits - 2} of them consuming symbols']
+
+
+#
+# Return DFA of the reversed pattern, or None if the pattern can't be reversed
+# or its DFA exceeds max_dfa_states states.
+#
+def _reverse_dfa(obj: RexPattern, max_dfa_states: int) -> Optional[DFA]:
+    postfix = _reverse_postfix(obj._postfix)
+    if postfix is None:
+        return None
+    return build_dfa(flatten(_post2nfa(postfix)), max_dfa_states)
@@ -0,0 +1,97 @@
+#
+# Integer-indexed form of the NFA.
+#
+# _post2nfa() builds a graph of _State objects linked by references.
+# Algorithms that need to number the states (subset construction, table driven engines,
+# serialization) work on a flat program instead: state i is described by kinds[i], syms[i],
+# out[i] and out1[i]. Arrows leading to NONE placeholder states are encoded as -1.
+# Programs hold plain values only, so they can be pickled; expand() turns them back into a graph.
+#
+from __future__ import annotations
+
+from ._impl import _State, _StateType, _early_match_state, _match_state
+from ._stack import Stack
+
+TYPE_CHECKING = False
+if TYPE_CHECKING:
+    from typing import Union, Text, Callable, List, Dict
+
+NONE = _StateType.NONE
+SYM = _StateType.SYM
+SYM_SET = _StateType.SYM_SET
+EARLY_MATCH = _StateType.EARLY_MATCH
+MATCH = _StateType.MATCH
+SPLIT = _StateType.SPLIT
+
+
+class Program(object):
+    __slots__ = ('kinds', 'syms', 'out', 'out1', 'start')
+
+    def __init__(self, kinds: List[int], syms: List[Union[Text, Callable[[Text], bool]]],
+                 out: List[int], out1: List[int], start: int) -> None:
+        self.kinds = kinds
+        self.syms = syms
+        self.out = out
+        self.out1 = out1
+        self.start = start
+
+    def __len__(self) -> int:
+        return len(self.kinds)
+
+
+def flatten(start: _State) -> Program:
+    index: Dict[int, int] = {}
+    states: List[_State] = []
+
+    def _index(s: Union[_State, None]) -> int:
+        if s is None or s.s_type == _StateType.NONE:
+            return -1
+
+        i = index.get(id(s))
+        if i is None:
+            i = index[id(s)] = len(states)
+            states.append(s)
+            stack.push(s)
+
+        return i
+
+    stack: Stack[_State] = Stack()
+    start_index = _index(start)
+    while not stack.is_empty():
+        s = stack.pop()
+        _index(s.out)
+        _index(s.out1)
+
+    return Program(
+        [s.s_type for s in states],
+        [s.sym for s in states],
+        [_index(s.out) for s in states],
+        [_index(s.out1) for s in states],
+        start_index,
+    )
+
+
+#
+# Build the graph of _State objects described by the program, returning its start state.
+# MATCH and EARLY_MATCH states are the shared ones, like in hash-consed NFAs.
+#
+def expand(prog: Program) -> _State:
+    states: List[_State] = []
+    for kind, sym in zip(prog.kinds, prog.syms):
+        if kind == MATCH:
+            states.append(_match_state)
+        elif kind == EARLY_MATCH:
+            states.append(_early_match_state)
+        else:
+            # states are made NONE first, so that no placeholders are made for arrows set below
+            s = _State(sym=sym)
+            s.s_type = kind
+            states.append(s)
+
+    for s, out, out1 in zip(states, prog.out, prog.out1):
+        if s.s_type == MATCH or s.s_type == EARLY_MATCH:
+            continue
+        s.out = states[out] if out >= 0 else _State()
+        s.out1 = states[out1] if out1 >= 0 else _State()
+
+    return states[prog.start]
@@ -0,0 +1,257 @@
+#
+# DFA tables shared between processes.
+#
+# Transition tables of compiled patterns are written once into a shared memory block
+# (multiprocessing.shared_memory) or into a file, and other processes attach to them
+# read-only: their DFAs index memoryviews of the mapped block instead of lists of their own,
+# so a host keeps a single physical copy of the tables and new workers don't compile anything.
+#
+# Layout of the block:
+#   - header: magic, format version and metadata size (see _HEADER);
+#   - metadata: JSON describing every pattern, its alphabet and its table position;
+#   - tables: native int32 arrays, each of them aligned to 8 bytes.
+#
+# Memoryviews are slower to index than lists, so attached patterns match somewhat slower
+# than the ones compiled in the process.
+#
+from __future__ import annotations
+
+import json
+import mmap
+import os
+import struct
+import sys
+
+from . import _symsets
+from ._dfa import Alphabet, DFA, ReverseDFA
+from ._impl import RexError, RexPattern, _compile, _DFA_MAX_STATES
+
+TYPE_CHECKING = False
+if TYPE_CHECKING:
+    from typing import Any, Text, Union, Optional, Iterable, Iterator, List
+
+_MAGIC = b'LRXT'
+_VERSION = 1
+_HEADER = struct.Struct('<4sII')
+_ALIGN = 8
+_TYPECODE = 'i'
+
+
+class SharedTables(object):
+    """DFA tables of compiled patterns placed into shared memory or a file.
+
+    Attributes:
+        name: Name of the shared memory block, or None
+        path: Path of the file, or None
+        patterns: List of RexPattern objects matching with the shared tables
+    """
+
+    def __init__(self, buf: memoryview, name: Optional[Text], path: Optional[Text], handle: Any) -> None:
+        self.name = name
+        self.path = path
+        self._handle = handle
+        self._views: List[memoryview] = []
+        try:
+            self.patterns: List[RexPattern] = _load(buf, self._views, name or path)
+        except BaseException:
+            self.close()
+            raise
+
+    def __repr__(self) -> str:
+        where = f'name={self.name!r}' if self.name is not None else f'path={self.path!r}'
+        return f'<SharedTables {where} patterns={len(self.patterns)}>'
+
+    def __len__(self) -> int:
+        return len(self.patterns)
+
+    def __getitem__(self, index: int) -> RexPattern:
+        return self.patterns[index]
+
+    def __iter__(self) -> Iterator[RexPattern]:
+        return iter(self.patterns)
+
+    def __enter__(self) -> 'SharedTables':
+        return self
+
+    def __exit__(self, *args: Any) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """Detach from the tables. The patterns must not be used afterwards."""
+        while self._views:
+            self._views.pop().release()
+        if self._handle is not None:
+            self._handle.close()
+            self._handle = None
+
+    def unlink(self) -> None:
+        """Remove the shared memory block or the file, once every process has closed it."""
+        if self.name is not None:
+            from multiprocessing import shared_memory
+
+            block = _open_block(shared_memory, self.name)
+            block.close()
+            block.unlink()
+        else:
+            os.unlink(self.path)
+
+
+#
+# File or shared memory block handle, closing everything the tables are mapped with.
+#
+class _Handle(object):
+    __slots__ = ('_closers',)
+
+    def __init__(self, *closers: Any) -> None:
+        self._closers = closers
+
+    def close(self) -> None:
+        for closer in self._closers:
+            closer()
+
+
+def export_tables(patterns: Iterable[Union[Text, RexPattern]], name: Optional[Text] = None,
+                  path: Optional[Text] = None, max_dfa_states: int = _DFA_MAX_STATES) -> SharedTables:
+    objs = []
+    for pattern in patterns:
+        obj = _compile(pattern)
+        if obj.max_errors:
+            raise RexError(f'pattern {obj.pattern!r} is approximate, it has no DFA tables to export')
+        # the planner may prefer the literal engine or the NFA, the tables need a DFA
+        if obj.engine not in ('dfa', 'reverse'):
+            obj = _compile(obj, engine='auto', max_dfa_states=max_dfa_states)
+        if obj.engine not in ('dfa', 'reverse'):
+            obj = _compile(obj, engine='dfa', max_dfa_states=max_dfa_states)
+        if obj.engine not in ('dfa', 'reverse'):
+            raise RexError(f'pattern {obj.pattern!r} has no DFA tables to export')
+        objs.append(obj)
+
+    data = _dump(objs)
+    if path is not None:
+        tmp = f'{path}.{os.getpid()}.tmp'
+        with open(tmp, 'wb') as f:
+            f.write(data)
+        os.replace(tmp, path)
+        return attach_tables(path=path)
+
+    from multiprocessing import shared_memory
+
+    block = shared_memory.SharedMemory(name, create=True, size=len(data))
+    block.buf[:len(data)] = data
+    buf = block.buf.toreadonly()
+    return SharedTables(buf, block.name, None, _Handle(buf.release, block.close))
+
+
+def attach_tables(name: Optional[Text] = None, path: Optional[Text] = None) -> SharedTables:
+    if (name is None) == (path is None):
+        raise ValueError('either name or path must be given')
+
+    if path is not None:
+        with open(path, 'rb') as f:
+            mapping = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        buf = memoryview(mapping)
+        return SharedTables(buf, None, path, _Handle(buf.release, mapping.close))
+
+    from multiprocessing import shared_memory
+
+    block = _open_block(shared_memory, name)
+    buf = block.buf.toreadonly()
+    return SharedTables(buf, block.name, None, _Handle(buf.release, block.close))
+
+
+#
+# Attach to the existing shared memory block.
+# Before Python 3.13 attached blocks are registered with the resource tracker, which would
+# unlink them when the attaching process exits, so they are unregistered right away:
+# the block belongs to the process that created it.
+#
+def _open_block(shared_memory: Any, name: Text) -> Any:
+    if sys.version_info >= (3, 13):
+        return shared_memory.SharedMemory(name, track=False)
+
+    from multiprocessing import resource_tracker
+
+    block = shared_memory.SharedMemory(name)
+    resource_tracker.unregister(block._name, 'shared_memory')
+    return block
+
+
+def _align(size: int) -> int:
+    return (size + _ALIGN - 1) // _ALIGN * _ALIGN
+
+
+#
+# Serialize DFAs of the compiled patterns.
+#
+def _dump(objs: List[RexPattern]) -> bytes:
+    from array import array
+
+    entries = []
+    tables = []
+    offset = 0
+    for obj in objs:
+        engine = obj._engine
+        dfa = engine.dfa if isinstance(engine, ReverseDFA) else engine
+        table = array(_TYPECODE, dfa.table).tobytes()
+        alphabet = dfa.alphabet
+        entries.append({
+            'pattern': obj.pattern,
+            'ignorecase': obj.ignorecase,
+            'engine': engine.name,
+            'plan': obj._plan or [],
+            'nclasses': dfa.nclasses,
+            'start': dfa.start,
+            'accepting': sorted(dfa.accepting),
+            'sinks': list(dfa.sinks),
+            'literals': alphabet.literals,
+            'bases': [base.__name__ for base in alphabet.bases],
+            'signatures': [[list(sig), k] for sig, k in alphabet.signatures.items()],
+            'size': alphabet.size,
+            'offset': offset,
+            'length': len(dfa.table),
+        })
+        tables.append(table + bytes(_align(len(table)) - len(table)))
+        offset += len(tables[-1])
+
+    meta = json.dumps({'patterns': entries}).encode('ascii')
+    meta += b' ' * (_align(_HEADER.size + len(meta)) - _HEADER.size - len(meta))
+    return b''.join([_HEADER.pack(_MAGIC, _VERSION, len(meta)), meta] + tables)
+
+
+#
+# Build patterns matching with the tables of buf. Every memoryview taken from buf
+# is appended to views, so that it can be released before buf is unmapped.
+#
+def _load(buf: memoryview, views: List[memoryview], where: Optional[Text]) -> List[RexPattern]:
+    if len(buf) < _HEADER.size:
+        raise RexError('not a table of compiled patterns')
+    magic, version, meta_size = _HEADER.unpack(buf[:_HEADER.size])
+    if magic != _MAGIC:
+        raise RexError('not a table of compiled patterns')
+    if version != _VERSION:
+        raise RexError(f'unsupported version of the table of compiled patterns: {version}')
+
+    start = _HEADER.size + meta_size
+    meta = json.loads(bytes(buf[_HEADER.size:start]).decode('ascii'))
+    patterns = []
+    for entry in meta['patterns']:
+        offset = start + entry['offset']
+        view = buf[offset:offset + entry['length'] * 4]
+        table = view.cast(_TYPECODE)
+        views.extend((view, table))
+
+        alphabet = Alphabet(
+            entry['literals'],
+            tuple(getattr(_symsets, name) for name in entry['bases']),
+            {tuple(sig): k for sig, k in entry['signatures']},
+            entry['size'],
+        )
+        dfa = DFA(table, entry['nclasses'], entry['start'], frozenset(entry['accepting']), alphabet,
+                  sinks=tuple(entry['sinks']))
+
+        obj = RexPattern(entry['pattern'], ignorecase=entry['ignorecase'])
+        obj._engine = ReverseDFA(dfa) if entry['engine'] == 'reverse' else dfa
+        obj._plan = entry['plan'] + [f'tables are shared from {where}']
+        patterns.append(obj)
+
+    return patterns
@@ -1,9 +1,13 @@
 #
 # Basic stack class implementation
 #
-from typing import TypeVar, Any
+from __future__ import annotations
 
-T = TypeVar('T')
+TYPE_CHECKING = False
+if TYPE_CHECKING:
+    from typing import TypeVar, Any
+
+    T = TypeVar('T')
 
 
 class Stack(list):
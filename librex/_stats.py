@@ -0,0 +1,107 @@
+#
+# Per-pattern runtime statistics.
+#
+# Statistics are opt-in: patterns with statistics enabled are matched by the
+# instrumented code path and are kept in a registry, so that all of them can be
+# collected or passed to export hooks at once. Other patterns don't pay for it.
+#
+from __future__ import annotations
+
+from weakref import WeakValueDictionary
+
+TYPE_CHECKING = False
+if TYPE_CHECKING:
+    from typing import Text, Callable, List, Tuple, Dict, Any
+
+
+class RexStats(object):
+    """Runtime statistics of a compiled regular expression.
+
+    Attributes:
+        calls: Number of match() calls
+        matched: Number of calls that returned True
+        unmatched: Number of calls that returned False
+        symbols: Number of symbols consumed from the strings
+        states: Number of automaton states visited: NFA states stepped from or reached
+            by following arrows (including SPLIT ones), or DFA states, one per symbol
+        dfa_cache_hits: Number of symbols whose DFA class was found in the cache
+            (engines 'dfa', 'compact' and 'reverse')
+        dfa_cache_misses: Number of symbols whose DFA class had to be computed
+        time: Cumulative time spent in match(), in seconds
+    """
+    __slots__ = ('calls', 'matched', 'unmatched', 'symbols', 'states',
+                 'dfa_cache_hits', 'dfa_cache_misses', 'time')
+
+    def __init__(self) -> None:
+        self.reset()
+
+    def __repr__(self) -> str:
+        return 'RexStats({})'.format(', '.join(f'{k}={v!r}' for k, v in self.as_dict().items()))
+
+    def reset(self) -> None:
+        """Set all counters to zero."""
+        self.calls = 0
+        self.matched = 0
+        self.unmatched = 0
+        self.symbols = 0
+        self.states = 0
+        self.dfa_cache_hits = 0
+        self.dfa_cache_misses = 0
+        self.time = 0.0
+
+    def as_dict(self) -> Dict[Text, Any]:
+        """Return counters as a dictionary."""
+        return {name: getattr(self, name) for name in self.__slots__}
+
+
+#
+# Patterns with enabled statistics, keyed by id() since equal patterns may coexist.
+#
+_registry: 'WeakValueDictionary[int, Any]' = WeakValueDictionary()
+_hooks: List[Callable[[List[Tuple[Text, Dict[Text, Any]]]], None]] = []
+
+
+def register(pattern: Any) -> None:
+    _registry[id(pattern)] = pattern
+
+
+def unregister(pattern: Any) -> None:
+    _registry.pop(id(pattern), None)
+
+
+def collect_stats(reset: bool = False) -> List[Tuple[Any, Dict[Text, Any]]]:
+    """Return (pattern, counters) pairs for every pattern with enabled statistics.
+
+    If reset is True, counters are set to zero after they are collected.
+    """
+    result = []
+    for pattern in list(_registry.values()):
+        stats = pattern.stats
+        if stats is None:
+            continue
+        result.append((pattern, stats.as_dict()))
+        if reset:
+            stats.reset()
+
+    return result
+
+
+def add_stats_hook(hook: Callable[[List[Tuple[Text, Dict[Text, Any]]]], None]) -> None:
+    """Register hook called by export_stats() with list of (pattern string, counters) pairs."""
+    _hooks.append(hook)
+
+
+def remove_stats_hook(hook: Callable[[List[Tuple[Text, Dict[Text, Any]]]], None]) -> None:
+    """Unregister hook added by add_stats_hook()."""
+    _hooks.remove(hook)
+
+
+def export_stats(reset: bool = True) -> None:
+    """Pass statistics of all instrumented patterns to the registered hooks.
+
+    Call it periodically (e.g. from a timer) to feed a metrics system.
+    By default counters are reset, so every export covers the period since the previous one.
+    """
+    stats = [(pattern.pattern, counters) for pattern, counters in collect_stats(reset)]
+    for hook in list(_hooks):
+        hook(stats)
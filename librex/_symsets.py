@@ -1,7 +1,11 @@
 #
 # Symbol sets implementation
 #
-from typing import Text, Callable
+from __future__ import annotations
+
+TYPE_CHECKING = False
+if TYPE_CHECKING:
+    from typing import Text, Callable, Optional, Sequence, List, Tuple
 
 
 def sym_is_any(sym: Text) -> bool:
@@ -48,3 +52,42 @@ def get_symbol_set(sym: Text) -> Callable[[Text], bool]:
         return _sets_map[sym]
 
     raise ValueError(f'unknown symbol set type: {sym}')
+
+
+#
+# Every symbol set is either a base predicate or its complement.
+# Base predicates split the symbols into a handful of classes (see _dfa.py).
+# The '.' set needs no base predicate since it accepts any symbol.
+#
+_bases_map = {
+    sym_is_any: (None, False),
+    sym_is_digit: (sym_is_digit, False),
+    sym_is_not_digit: (sym_is_digit, True),
+    sym_is_space: (sym_is_space, False),
+    sym_is_not_space: (sym_is_space, True),
+    sym_is_alnum: (sym_is_alnum, False),
+    sym_is_not_alnum: (sym_is_alnum, True),
+}
+
+#
+# Symbols covering every combination of base predicate values found in Unicode:
+# a digit is always alphanumeric and a whitespace symbol never is.
+#
+_signature_samples = '0a !'
+
+
+def get_set_base(symset: Callable[[Text], bool]) -> Tuple[Optional[Callable[[Text], bool]], bool]:
+    if symset in _bases_map:
+        return _bases_map[symset]
+
+    raise ValueError(f'unknown symbol set: {symset!r}')
+
+
+def get_signatures(bases: Sequence[Callable[[Text], bool]]) -> List[Tuple[bool, ...]]:
+    signatures: List[Tuple[bool, ...]] = []
+    for sym in _signature_samples:
+        sig = tuple(base(sym) for base in bases)
+        if sig not in signatures:
+            signatures.append(sig)
+
+    return signatures
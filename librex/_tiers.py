@@ -0,0 +1,204 @@
+#
+# Adaptive tiered execution.
+#
+# Patterns compiled with the default engine start on the NFA simulation, which is
+# cheap to build, and count their match() calls. Once a pattern has been called
+# threshold times, it is promoted: the planner picks the fastest engine for it,
+# as it does for engine='auto' (see _planner.py). Promotion runs inline, in the call
+# crossing the threshold, or in a background thread, while the NFA keeps matching.
+# Calls limited by a budget or a deadline never build engines inline, which would take
+# unbounded time; they hand the promotion over to the background thread.
+# Patterns whose planned engine is the NFA anyway are not promoted again.
+#
+# Promoted patterns are kept in promotion order along with the memory taken by
+# their engines. When the total exceeds max_memory, the oldest ones are demoted
+# back to the NFA simulation, which can promote them again later.
+#
+from __future__ import annotations
+
+import sys
+from _thread import RLock
+from weakref import ref
+
+TYPE_CHECKING = False
+if TYPE_CHECKING:
+    from typing import Text, Any, Optional, Dict, List, Tuple
+
+#
+# Default number of match() calls after which a pattern is promoted.
+#
+_DEFAULT_THRESHOLD = 1000
+
+#
+# Default limit of memory taken by the engines of promoted patterns, in bytes.
+#
+_DEFAULT_MAX_MEMORY = 64 * 1024 * 1024
+
+
+class _Tiering(object):
+    __slots__ = ('threshold', 'background', 'max_memory', 'max_dfa_states', 'promotions', 'demotions',
+                 'failures', 'memory', 'promoted', 'lock', 'queue')
+
+    def __init__(self) -> None:
+        # number of calls compared with the pattern counters, sys.maxsize if tiering is disabled
+        self.threshold = _DEFAULT_THRESHOLD
+        self.background = False
+        self.max_memory: Optional[int] = _DEFAULT_MAX_MEMORY
+        self.max_dfa_states: Optional[int] = None
+        self.promotions = 0
+        self.demotions = 0
+        self.failures = 0
+        self.memory = 0
+        # (weak reference to the pattern, its engine, memory taken by the engine)
+        self.promoted: List[Tuple[Any, Any, int]] = []
+        self.lock = RLock()
+        self.queue: Any = None
+
+
+_tiering = _Tiering()
+
+
+def set_tiering(threshold: Optional[int] = _DEFAULT_THRESHOLD, background: bool = False,
+                max_memory: Optional[int] = _DEFAULT_MAX_MEMORY,
+                max_dfa_states: Optional[int] = None) -> None:
+    """Configure promotion of the patterns compiled with the default engine.
+
+    A pattern is promoted to the engine picked by the planner (like with engine='auto')
+    after threshold match() calls; if threshold is None, patterns are not promoted.
+    If background is True, engines are built in a background thread, otherwise
+    by the call crossing the threshold, unless it is given a budget or a deadline
+    (see RexPattern.match()): such calls always leave it to the background thread.
+    When engines of promoted patterns take more than max_memory bytes, the oldest ones
+    are demoted to the NFA simulation.
+    DFAs are limited to max_dfa_states states, by default to the limit the pattern
+    was compiled with.
+    """
+    if threshold is not None and threshold < 1:
+        raise ValueError('threshold must be positive or None')
+
+    _tiering.threshold = sys.maxsize if threshold is None else threshold
+    _tiering.background = background
+    _tiering.max_memory = max_memory
+    _tiering.max_dfa_states = max_dfa_states
+    _demote_excess()
+
+
+def tiering_info() -> Dict[Text, Any]:
+    """Return tiering settings and counters as a dictionary:
+    threshold, background, max_memory and max_dfa_states (see set_tiering()),
+    promoted (number of currently promoted patterns), memory (bytes taken by their engines),
+    promotions, demotions and failures (promotions that kept the NFA simulation).
+    """
+    threshold = _tiering.threshold
+    with _tiering.lock:
+        _prune()
+    return {
+        'threshold': None if threshold == sys.maxsize else threshold,
+        'background': _tiering.background,
+        'max_memory': _tiering.max_memory,
+        'max_dfa_states': _tiering.max_dfa_states,
+        'promoted': len(_tiering.promoted),
+        'memory': _tiering.memory,
+        'promotions': _tiering.promotions,
+        'demotions': _tiering.demotions,
+        'failures': _tiering.failures,
+    }
+
+
+#
+# Called by RexPattern.match() once the pattern counter reaches the threshold;
+# limited is True if the call has a budget or a deadline.
+# The counter is set to None, so that the pattern is promoted once.
+#
+def promote(obj: Any, limited: bool = False) -> None:
+    obj._calls = None
+    if not _tiering.background and not limited:
+        _promote(obj)
+        return
+
+    if _tiering.queue is None:
+        _start_worker()
+    _tiering.queue.put(ref(obj))
+
+
+def _start_worker() -> None:
+    import queue
+    import threading
+
+    with _tiering.lock:
+        if _tiering.queue is None:
+            _tiering.queue = queue.Queue()
+            threading.Thread(target=_worker, args=(_tiering.queue,), name='librex-tiering',
+                             daemon=True).start()
+
+
+def _worker(tasks: Any) -> None:
+    while True:
+        obj = tasks.get()()
+        try:
+            if obj is not None:
+                _promote(obj)
+        finally:
+            tasks.task_done()
+
+
+#
+# Wait for the background promotions requested so far.
+#
+def _wait() -> None:
+    if _tiering.queue is not None:
+        _tiering.queue.join()
+
+
+def _promote(obj: Any) -> None:
+    from ._planner import plan
+
+    engine, reasons = plan(obj, 'auto', _tiering.max_dfa_states or obj._max_dfa_states)
+    with _tiering.lock:
+        if engine is None:
+            _tiering.failures += 1
+            obj._plan = obj._plan[:1] + [f'promotion after {_tiering.threshold} calls kept NFA simulation: '
+                                         f'{reasons[-1]}']
+            return
+
+        size = engine.memory_estimate()
+        obj._plan = obj._plan[:1] + [f'promoted after {_tiering.threshold} calls'] + reasons
+        obj._engine = engine
+        _tiering.promotions += 1
+        _prune()
+        _tiering.promoted.append((ref(obj), engine, size))
+        _tiering.memory += size
+        _demote_excess()
+
+
+#
+# Forget the promoted patterns that were garbage collected or lost their engines.
+#
+def _prune() -> None:
+    _tiering.promoted = [entry for entry in _tiering.promoted if _is_current(entry)]
+    _tiering.memory = sum(size for _, _, size in _tiering.promoted)
+
+
+def _is_current(entry: Tuple[Any, Any, int]) -> bool:
+    obj = entry[0]()
+    return obj is not None and obj._engine is entry[1]
+
+
+#
+# Demote the oldest promoted patterns while their engines take more than max_memory bytes.
+#
+def _demote_excess() -> None:
+    with _tiering.lock:
+        promoted = _tiering.promoted
+        while promoted and _tiering.max_memory is not None and _tiering.memory > _tiering.max_memory:
+            entry = promoted.pop(0)
+            _tiering.memory -= entry[2]
+            if not _is_current(entry):
+                continue
+
+            obj = entry[0]()
+            obj._engine = None
+            obj._calls = 0
+            obj._plan = obj._plan[:1] + [f'demoted to NFA simulation: promoted engines exceeded '
+                                         f'{_tiering.max_memory} bytes']
+            _tiering.demotions += 1
@@ -1,37 +1,76 @@
 import sys
-import argparse
-
-from typing import Text
 
 import librex
 
-description = 'Apply regular expression PATTERN to string STRING.'
+description = ('Apply regular expression PATTERN to string STRING, '
+               'or to the lines of the files given by --file.')
 epilog = """
-Exit status is 0 if the string STRING matches the regular expression PATTERN, 1 otherwise;
-if any error occurs the exit status is 2.
+Exit status is 0 if the string STRING matches the regular expression PATTERN
+(or, with --file, if any line matches), 1 otherwise; if any error occurs the exit status is 2.
+Files may be gzip, bz2 or xz compressed, they are decompressed on the fly.
 """
 
 
 def cli():
+    # the common case of two positional arguments doesn't need argparse, which is slow to import
+    argv = sys.argv[1:]
+    if len(argv) == 2 and not any(arg.startswith('-') for arg in argv):
+        sys.exit(main(argv[0], argv[1]))
+
+    import argparse
+
     parser = argparse.ArgumentParser(description=description, epilog=epilog)
     parser.add_argument('pattern', nargs=1, metavar='PATTERN', help='regular expression')
-    parser.add_argument('string', nargs=1, metavar='STRING', help='string to apply regular expression PATTERN to')
+    parser.add_argument('string', nargs='?', metavar='STRING',
+                        help='string to apply regular expression PATTERN to')
+    parser.add_argument('-f', '--file', action='append', metavar='FILE',
+                        help="print the lines of FILE matching PATTERN ('-' for the standard input); "
+                             'may be given several times')
+    parser.add_argument('--encoding', default='utf-8', help='encoding of the files (default: %(default)s)')
+    parser.add_argument('--decompress-thread', action='store_true',
+                        help='decompress the files in a separate thread, overlapping with matching')
 
     args = parser.parse_args()
-    sys.exit(main(args.pattern[0], args.string[0]))
+    if args.file:
+        if args.string is not None:
+            parser.error('STRING cannot be given along with --file')
+        sys.exit(scan(args.pattern[0], args.file, args.encoding, args.decompress_thread))
+    if args.string is None:
+        parser.error('the following arguments are required: STRING')
+    sys.exit(main(args.pattern[0], args.string))
 
 
-def eprint(*args: Text) -> None:
+def eprint(*args: str) -> None:
     print(*args, file=sys.stderr)
 
 
-def main(pattern: Text, string: Text) -> int:
+def main(pattern: str, string: str) -> int:
     result: int = 0
     try:
         if not librex.match(pattern, string):
             result = 1
     except librex.RexError as e:
-        eprint('librex.RexError: {}'.format(e.message))
+        eprint('librex.RexError: {}'.format(e))
+        result = 2
+    except Exception as e:
+        eprint(str(e))
+        result = 2
+
+    return result
+
+
+def scan(pattern: str, files: list, encoding: str = 'utf-8', threaded: bool = False) -> int:
+    result: int = 1
+    try:
+        rex = librex.compile(pattern, engine='auto')
+        write = sys.stdout.write
+        for file in files:
+            source = sys.stdin.buffer if file == '-' else file
+            for line in rex.scan_file(source, encoding, 'replace', threaded):
+                write(line + '\n')
+                result = 0
+    except librex.RexError as e:
+        eprint('librex.RexError: {}'.format(e))
         result = 2
     except Exception as e:
         eprint(str(e))
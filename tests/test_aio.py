@@ -0,0 +1,183 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from librex import compile, match_many_async, create_executor, RexError
+
+WORDS = '|'.join('w{:02d}'.format(i) for i in range(20))
+
+
+def _reader(*chunks):
+    # must be called from a coroutine, StreamReader binds to the running loop
+    reader = asyncio.StreamReader()
+    for chunk in chunks:
+        reader.feed_data(chunk)
+    reader.feed_eof()
+    return reader
+
+
+async def _match_stream(r, chunks, **kwargs):
+    return await r.match_stream(_reader(*chunks), **kwargs)
+
+
+@pytest.mark.parametrize('re, chunks, expected', [
+    ('a*b', [b'a' * 100000, b'b'], True),
+    ('a*b', [b'a' * 10, b'c', b'a' * 10], False),
+    ('abc', [b'ab', b'c'], True),
+    ('abc', [b'abcd'], False),
+    ('abc', [b'ab'], False),
+    (WORDS, [b'w1', b'7'], True),
+    (WORDS, [b'w17x'], False),
+    ('п+', ['пп'.encode()[:3], 'пп'.encode()[3:]], True),
+    ('', [b'anything'], True),
+    ('a|', [b'azz'], True),
+    ('', [], True),
+    ('a?', [], True),
+])
+@pytest.mark.parametrize('engine', ['nfa', 'dfa', 'reverse', 'auto'])
+def test_match_stream(re, chunks, expected, engine):
+    r = compile(re, engine=engine)
+    assert asyncio.run(_match_stream(r, chunks)) is expected
+
+
+@pytest.mark.parametrize('max_dfa_states', [10000, 6])
+def test_match_stream_reverse(monkeypatch, max_dfa_states):
+    from librex._dfa import ReverseDFA
+
+    def collecting(engine):
+        raise AssertionError('the stream of the reversed DFA keeps the whole input')
+
+    monkeypatch.setattr(ReverseDFA, 'stream', collecting)
+    r = compile('(a|b)*a(a|b)(a|b)', engine='reverse', max_dfa_states=max_dfa_states)
+    assert r.engine == 'reverse'
+    assert asyncio.run(_match_stream(r, [b'ab' * 1000, b'abb'])) is True
+    assert asyncio.run(_match_stream(r, [b'ab' * 1000, b'bbb'])) is False
+    # the forward DFA is built once, unless it exceeds the limit
+    assert (r._engine.forward is False) == (max_dfa_states == 6)
+
+
+def test_match_stream_stops_reading():
+    async def main():
+        reader = _reader(b'c' + b'a' * 200000)
+        return await compile('a*b').match_stream(reader), reader.at_eof()
+
+    assert asyncio.run(main()) == (False, False)
+
+
+def test_match_stream_encoding():
+    r = compile('п+')
+    assert asyncio.run(_match_stream(r, ['пп'.encode('cp1251')], encoding='cp1251')) is True
+    with pytest.raises(UnicodeDecodeError):
+        asyncio.run(_match_stream(r, [b'\xff']))
+
+
+def test_match_stream_yields():
+    ticks = []
+
+    async def ticker():
+        while True:
+            ticks.append(None)
+            await asyncio.sleep(0)
+
+    async def main():
+        task = asyncio.ensure_future(ticker())
+        result = await compile('a*b').match_stream(_reader(b'a' * 100000 + b'b'))
+        task.cancel()
+        return result
+
+    assert asyncio.run(main()) is True
+    assert len(ticks) > 10
+
+
+def test_scan_lines():
+    async def main():
+        reader = _reader(b'ab\r\nxx\na', b'b\n\nac\r', b'\nab')
+        return [line async for line in compile('a.').scan_lines(reader)]
+
+    assert asyncio.run(main()) == ['ab', 'ab', 'ac', 'ab']
+
+
+
+@pytest.mark.parametrize('engine', [None, 'dfa', 'reverse'])
+def test_scan_lines_long(monkeypatch, engine):
+    from librex import _aio
+
+    # reads split lines, multibyte symbols and '\r\n' pairs; long lines are matched incrementally
+    monkeypatch.setattr(_aio, '_READ_SIZE', 7)
+    monkeypatch.setattr(_aio, '_YIELD_INTERVAL', 5)
+    lines = ['ab' * 20, 'abc' * 9 + 'x', 'ш' * 30, 'ab', '', 'abab\r', 'ab' * 3 + '\r', 'ba' * 11,
+             'ab' * 9]
+    data = ('\r\n'.join(lines[:5]) + '\n' + '\n'.join(lines[5:])).encode()
+    r = compile('(ab)*|ш+', engine=engine)
+
+    async def main():
+        return [line async for line in r.scan_lines(_reader(data))]
+
+    assert asyncio.run(main()) == ['ab' * 20, 'ш' * 30, 'ab', '', 'abab', 'ababab', 'ab' * 9]
+
+
+def test_scan_lines_yields(monkeypatch):
+    ticks = []
+
+    async def ticker():
+        while True:
+            ticks.append(None)
+            await asyncio.sleep(0)
+
+    async def main():
+        task = asyncio.ensure_future(ticker())
+        result = [line async for line in compile('a*b').scan_lines(_reader(b'a' * 100000 + b'b\n'))]
+        task.cancel()
+        return result
+
+    assert asyncio.run(main()) == ['a' * 100000 + 'b']
+    assert len(ticks) > 10
+
+
+ITEMS = ['a' * i + 'b' * (i % 3) for i in range(30)] * 5
+
+
+@pytest.mark.parametrize('pattern', ['a*b', '(a|aa)*b?', compile('a+b', engine='dfa'), compile('a*bb?')])
+def test_match_many_async_threads(pattern):
+    expected = [compile(pattern).match(s) for s in ITEMS]
+    with ThreadPoolExecutor(4) as executor:
+        assert asyncio.run(match_many_async(pattern, ITEMS, executor, chunk_size=7)) == expected
+    assert asyncio.run(match_many_async(pattern, ITEMS)) == expected
+
+
+def test_match_many_async_processes():
+    patterns = ['a*b', compile('a+b', engine='dfa')]
+    with create_executor(patterns, max_workers=2) as executor:
+        for pattern in patterns + ['(a|aa)*b?']:
+            expected = [compile(pattern).match(s) for s in ITEMS]
+            assert asyncio.run(match_many_async(pattern, ITEMS, executor, chunk_size=100)) == expected
+
+
+def test_worker_compile_options():
+    from librex import _aio
+
+    _aio._worker_pattern.cache_clear()
+    # the default engine stays tiered in workers, explicit engines and DFA limits are kept
+    for obj in [compile('a*b'), compile('(a|b)*a(a|b)(a|b)', engine='dfa', max_dfa_states=4),
+                compile('ab', max_errors=1), compile('AB', ignorecase=True, engine='auto')]:
+        worker = _aio._worker_pattern(_aio._key(obj))
+        assert (worker.engine, worker.explain(), worker._calls) == (obj.engine, obj.explain(), obj._calls)
+        assert worker.ignorecase == obj.ignorecase and worker.max_errors == obj.max_errors
+    assert _aio._key('a*b') == ('a*b', None, compile('a*b')._max_dfa_states, False, 0)
+
+
+def test_worker_patterns_bounded():
+    from librex import _aio
+
+    _aio._worker_pattern.cache_clear()
+    for i in range(_aio._MAX_WORKER_PATTERNS + 10):
+        assert _aio._worker_pattern(_aio._key(f'a{i}')).match(f'a{i}')
+    assert _aio._worker_pattern.cache_info().currsize == _aio._MAX_WORKER_PATTERNS
+    _aio._worker_pattern.cache_clear()
+
+
+def test_match_many_async_errors():
+    assert asyncio.run(match_many_async('a', [])) == []
+    with pytest.raises(RexError):
+        asyncio.run(match_many_async('a(', ['a']))
@@ -0,0 +1,100 @@
+import itertools
+
+import pytest
+
+from librex import RexError, RexAutomaton, compile, remove_subsumed
+from librex import _algebra
+
+
+PATTERNS = ['ab.*', 'a.*', '.*b', 'a|b', '(ab)*', r'\w+', r'\d+', r'\D*', r'a\s', '.', 'ba?', 'a*b*']
+# literal symbols of the patterns along with a sample of every symbol set class
+SYMBOLS = 'ab1 -'
+
+
+def _strings(max_len=4):
+    for n in range(max_len + 1):
+        for chars in itertools.product(SYMBOLS, repeat=n):
+            yield ''.join(chars)
+
+
+def _language(matcher):
+    return {s for s in _strings() if matcher(s)}
+
+
+LANGUAGES = {p: _language(compile(p, engine='nfa').match) for p in PATTERNS}
+
+
+@pytest.mark.parametrize('a', PATTERNS)
+@pytest.mark.parametrize('b', PATTERNS)
+def test_algebra_pairs(a, b):
+    r = compile(a)
+    # short strings tell the languages of these patterns apart
+    assert r.issubset(b) == (LANGUAGES[a] <= LANGUAGES[b])
+    assert r.issuperset(b) == (LANGUAGES[a] >= LANGUAGES[b])
+    assert r.isdisjoint(b) == (not LANGUAGES[a] & LANGUAGES[b])
+    assert _language(r.intersection(b).match) == LANGUAGES[a] & LANGUAGES[b]
+
+
+@pytest.mark.parametrize('a', PATTERNS)
+def test_algebra_complement(a):
+    c = compile(a).complement()
+    assert isinstance(c, RexAutomaton)
+    assert c.description == f'~({a})'
+    assert _language(c.match) == set(_strings()) - LANGUAGES[a]
+    assert c.isdisjoint(a)
+    assert not c.isempty()
+    assert c.complement().issubset(a) and compile(a).issubset(c.complement())
+
+
+@pytest.mark.parametrize('engine', ['nfa', 'dfa', 'reverse', 'auto', 'literal'])
+def test_algebra_engines(engine):
+    r = compile('abc', engine=engine)
+    assert r.issubset('a.*') and r.issubset(compile('.*c', engine='reverse'))
+    assert not r.issubset('ab')
+
+
+def test_algebra_empty():
+    assert not compile('a').isempty()
+    assert compile('a').intersection('b').isempty()
+    assert compile(r'\d+').intersection(r'\s+').isempty()
+    assert not compile(r'\d+').intersection(r'\w+').isempty()
+    assert compile('.*').complement().isempty()
+    assert repr(compile('.*').complement()) == "<RexAutomaton '~(.*)' states=1>"
+
+
+def test_algebra_ignorecase():
+    r = compile('hello', ignorecase=True)
+    assert r.issuperset('HeLLo') and r.issuperset('hello')
+    assert not compile('hello').issuperset(r)
+    assert r.issubset(r'\w+')
+    assert compile('\u212a').issubset(compile('k', ignorecase=True))  # KELVIN SIGN
+    assert not r.isdisjoint('HELLO|WORLD')
+
+
+def test_algebra_unicode_classes():
+    # symbols outside of the pattern literals are compared by their symbol set classes
+    assert compile(r'\d').issubset(r'\w')
+    assert not compile(r'\w').issubset(r'\d')
+    assert compile(r'\s').isdisjoint(r'\w')
+    assert not compile(r'\W').issubset(r'\s')
+    assert compile(r'\W').intersection(r'\S').match('-')
+    assert not compile(r'\W').intersection(r'\S').match(' ')
+
+
+def test_remove_subsumed():
+    patterns = ['foo', r'f\w+', 'fo+', r'.*error.*', 'disk error', 'a|b', 'b|a', r'\d+', r'\d*', 'x']
+    assert remove_subsumed(patterns) == [r'f\w+', r'.*error.*', 'a|b', r'\d*', 'x']
+    compiled = [compile(p) for p in patterns]
+    assert remove_subsumed(compiled) == [compiled[i] for i in (1, 3, 5, 8, 9)]
+    assert remove_subsumed([]) == []
+    # of equivalent patterns the first one is kept
+    assert remove_subsumed(['a*a', 'a+', 'aa*']) == ['a*a']
+
+
+def test_algebra_limits(monkeypatch):
+    monkeypatch.setattr(_algebra, '_PRODUCT_MAX_STATES', 3)
+    with pytest.raises(RexError, match='product automaton'):
+        compile('abcd').intersection('.*')
+    monkeypatch.setattr(_algebra, '_DFA_MAX_STATES', 3)
+    with pytest.raises(RexError, match='exceeds the limit'):
+        compile('abcd').isempty()
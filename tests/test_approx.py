@@ -0,0 +1,123 @@
+import asyncio
+import itertools
+import random
+
+import pytest
+
+import librex
+from librex import RexError, RexBudgetError, compile
+
+
+SYMBOLS = 'ab1 '
+
+
+def _distance(s, t):
+    row = list(range(len(t) + 1))
+    for i, a in enumerate(s, 1):
+        prev, row[0] = row[0], i
+        for j, b in enumerate(t, 1):
+            prev, row[j] = row[j], min(row[j] + 1, row[j - 1] + 1, prev + (a != b))
+    return row[-1]
+
+
+def _language(pattern, max_len):
+    exact = compile(pattern, engine='nfa')
+    return [
+        ''.join(chars)
+        for n in range(max_len + 1) for chars in itertools.product(SYMBOLS, repeat=n)
+        if exact.match(''.join(chars))
+    ]
+
+
+@pytest.mark.parametrize('pattern', ['ab', 'a*b', '(ab|ba)+', r'\d\w', 'a.b', r'a\s?b', '(a|b1)*1', 'ab|',
+                                     'a.*', ''])
+@pytest.mark.parametrize('k', [1, 2])
+def test_approx_reference(pattern, k):
+    r = compile(pattern, max_errors=k)
+    language = _language(pattern, 4 + k)
+    rnd = random.Random(pattern + str(k))
+    strings = [''.join(rnd.choice(SYMBOLS) for _ in range(rnd.randint(0, 4))) for _ in range(60)]
+    for s in strings:
+        expected = any(_distance(s, t) <= k for t in language)
+        assert r.match(s) == expected, (pattern, s)
+
+
+@pytest.mark.parametrize('string, expected', [
+    ('librex', True),
+    ('librx', True),         # deletion
+    ('libbrex', True),       # insertion
+    ('lebrex', True),        # substitution
+    ('lbrx', False),
+    ('xlibrexx', False),
+    ('', False),
+])
+def test_approx_edits(string, expected):
+    assert compile('librex', max_errors=1).match(string) == expected
+
+
+def test_approx_words():
+    r = compile(r'user-\d+@example\.com', max_errors=2)
+    assert r.match('user-42@example.com')
+    assert r.match('usr-42@exampe.com')
+    assert not r.match('usr-42@exampel.com')
+    assert r.match('USER-42@example.com') is False
+    assert compile(r'user-\d+@example\.com', max_errors=2, ignorecase=True).match('USR-42@example.COM')
+
+
+def test_approx_pattern_object():
+    r = compile('abc', max_errors=1)
+    assert r.engine == 'approx'
+    assert r.max_errors == 1 and compile('abc').max_errors == 0
+    assert repr(r) == "<RexPattern 'abc' engine=approx max_errors=1>"
+    assert 'up to 1 errors' in r.explain()
+    assert r != compile('abc') and r == compile('abc', max_errors=1)
+    assert len({r, compile('abc'), compile('abc', max_errors=2)}) == 3
+    assert compile(r) is r
+    assert r.fullmatch('abd').span() == (0, 3)
+    assert r.fullmatch('xyz') is None
+    with pytest.raises(RexError):
+        compile('a(b)c', max_errors=1).fullmatch('abc')
+
+
+def test_approx_errors():
+    with pytest.raises(ValueError):
+        compile('abc', engine='dfa', max_errors=1)
+    with pytest.raises(ValueError):
+        compile('abc', max_errors=-1)
+    with pytest.raises(ValueError):
+        compile(compile('abc'), max_errors=1)
+    with pytest.raises(ValueError):
+        compile(compile('abc', max_errors=1), engine='dfa')
+    with pytest.raises(RexError):
+        compile('abc', max_errors=1).issubset('.*')
+    with pytest.raises(RexError):
+        librex.export_tables([compile('abc', max_errors=1)], path='unused')
+
+
+def test_approx_budget_and_stats():
+    r = compile('abcdef', max_errors=1)
+    with pytest.raises(RexBudgetError):
+        r.match('abcdef', budget=3)
+    assert r.match('abcxef', budget=1000)
+    stats = r.enable_stats()
+    assert r.match('abcdef') and not r.match('xxxxxx')
+    assert stats.calls == 2 and stats.matched == 1 and stats.symbols > 0
+
+
+def test_approx_early_exit():
+    r = compile('error.*', max_errors=1)
+    assert r.match('eror: ' + 'x' * 100)
+    assert not compile('error', max_errors=1).match('x' * 100)
+
+
+def test_approx_stream():
+    class Reader(object):
+        def __init__(self, data):
+            self.chunks = [data[i:i + 3] for i in range(0, len(data), 3)]
+
+        async def read(self, n):
+            return self.chunks.pop(0) if self.chunks else b''
+
+    r = compile('hello world', max_errors=2)
+    assert asyncio.run(r.match_stream(Reader(b'helo wrld')))
+    assert not asyncio.run(r.match_stream(Reader(b'hi world')))
@@ -0,0 +1,112 @@
+import random
+
+import pytest
+
+import librex
+from librex import compile
+from librex import _batch
+from librex._batch import _common_prefix
+
+
+def _paths(seed, count):
+    rnd = random.Random(seed)
+    parts = ['api', 'v1', 'v2', 'users', 'items', 'static', 'a.css', 'x', '42', '']
+    return [
+        '/' + '/'.join(rnd.choice(parts) for _ in range(rnd.randint(0, 5))) + rnd.choice(['', '.log', '!'])
+        for _ in range(count)
+    ]
+
+
+PATTERNS = [r'/api/v\d/\w+', r'.*\.log', r'/(\w+/)*\w*', '/api/.*', '', 'a|', r'/st\w+/\w\.css']
+
+
+@pytest.mark.parametrize('pattern', PATTERNS)
+@pytest.mark.parametrize('engine', ['nfa', 'dfa', 'compact', 'reverse', 'auto'])
+def test_match_sorted(pattern, engine):
+    paths = _paths(pattern, 300)
+    r = compile(pattern, engine=engine)
+    expected = [r.match(p) for p in sorted(paths)]
+    assert r.match_sorted(sorted(paths)) == expected
+    # unsorted batches share less, but are matched as well
+    assert r.match_sorted(paths) == [r.match(p) for p in paths]
+    assert r.match_keys(paths) == {p for p in paths if r.match(p)}
+
+
+@pytest.mark.parametrize('pattern', PATTERNS[:4])
+def test_match_sorted_approx(pattern):
+    paths = sorted(_paths(pattern, 200))
+    r = compile(pattern, max_errors=1)
+    expected = [r.match(p) for p in paths]
+    assert r.match_sorted(paths) == expected
+    assert r.match_keys(paths) == {p for p, m in zip(paths, expected) if m}
+
+
+def test_match_batch_literal_engines():
+    words = ['cat', 'dog', 'cattle', 'do']
+    r = compile('cat|dog', engine='literal_set')
+    assert r.match_sorted(sorted(words)) == [True, False, False, True]
+    assert r.match_keys(words) == {'cat', 'dog'}
+    r = compile('cat', engine='literal')
+    assert r.match_sorted(words) == [True, False, False, False]
+    assert r.match_keys(iter(words)) == {'cat'}
+    assert r.match_sorted([]) == [] and r.match_keys([]) == set()
+
+
+def test_match_sorted_shares_prefixes(monkeypatch):
+    r = compile(r'/home/\w+/\w+\.txt', engine='nfa')
+    stats = r.enable_stats()
+    paths = sorted(f'/home/user{i % 3}/file{i}.txt' for i in range(30))
+    assert r.match_sorted(paths) == [True] * 30
+    # patterns collecting statistics match every string on its own
+    assert stats.calls == 30
+    r.disable_stats()
+
+    walked = []
+
+    class Counting(_batch._NFAStepper):
+        __slots__ = ()
+
+        def step(self, state, sym):
+            walked.append(sym)
+            return super().step(state, sym)
+
+    monkeypatch.setattr(_batch, '_stepper_of', Counting)
+    assert r.match_sorted(paths) == [True] * 30
+    assert len(walked) < sum(len(p) for p in paths) // 2
+    del walked[:]
+    assert r.match_keys(paths) == set(paths)
+    assert len(walked) < sum(len(p) for p in paths) // 2
+
+
+def test_match_keys_decided_subtrees():
+    keys = [f'/api/{i}/' + 'x' * 100 for i in range(50)] + ['/static/' + 'y' * 100]
+    r = compile('/api/.*', engine='dfa')
+    assert r.match_keys(keys) == set(keys[:-1])
+    assert compile('/api/\\d+', engine='dfa').match_keys(keys) == set()
+
+
+def test_match_batch_tiering():
+    librex.set_tiering(threshold=10)
+    try:
+        r = compile(r'\w+\d')
+        assert r.engine == 'nfa'
+        assert r.match_sorted(sorted(_paths(1, 5) + ['ab1', 'ab2', 'ab3', 'ab4', 'abc'])) is not None
+        assert r.engine == 'dfa'
+        r = compile(r'\w+\d')
+        assert r.match_keys(['a1', 'b2', 'c'] * 5) == {'a1', 'b2'}
+        assert r.engine == 'dfa'
+    finally:
+        librex.set_tiering()
+
+
+@pytest.mark.parametrize('a, b, limit, expected', [
+    ('abcdef', 'abcxef', 10, 3),
+    ('abc', 'abc', 10, 3),
+    ('abc', 'abcd', 10, 3),
+    ('abc', 'abc', 2, 2),
+    ('', 'abc', 10, 0),
+    ('xbc', 'abc', 10, 0),
+    ('abcdefgh', 'abcdefgx', 10, 7),
+])
+def test_common_prefix(a, b, limit, expected):
+    assert _common_prefix(a, b, limit) == expected
@@ -0,0 +1,105 @@
+import pickle
+
+import pytest
+
+import librex
+from librex import compile, compile_many, RexBatch, RexError
+from librex import _bulk
+
+
+PATTERNS = [r'\d+', 'a(b|c)*d', r'\w+@\w+\.com', 'GET|POST|PUT', 'a(b', r'\d+', '', r'.*\.log', '*']
+STRINGS = ['123', 'abcbd', 'ad', 'me@example.com', 'GET', 'PATCH', '', 'x.log', 'x.txt', '*']
+
+
+@pytest.mark.parametrize('workers', [1, 2])
+@pytest.mark.parametrize('engine', [None, 'auto', 'nfa', 'dfa', 'compact'])
+def test_compile_many(workers, engine):
+    batch = compile_many(PATTERNS, workers=workers, engine=engine)
+    assert isinstance(batch, RexBatch) and len(batch) == len(PATTERNS)
+    assert batch[0] is batch[5]
+    assert batch[4] is None and batch[8] is None
+    assert sorted(batch.errors) == [4, 8]
+    assert all(isinstance(e, RexError) for e in batch.errors.values())
+    assert batch.errors[4].pos == compile_error('a(b').pos
+
+    for pattern, obj in zip(PATTERNS, batch):
+        if obj is None:
+            continue
+        expected = compile(pattern, engine=engine)
+        assert obj.pattern == pattern and obj == expected
+        assert obj.engine == expected.engine and obj.explain() == expected.explain()
+        assert [obj.match(s) for s in STRINGS] == [expected.match(s) for s in STRINGS]
+        assert [m and m.groups() for m in map(obj.fullmatch, STRINGS)] == \
+            [m and m.groups() for m in map(expected.fullmatch, STRINGS)]
+
+    stats = batch.stats
+    assert (stats['patterns'], stats['unique'], stats['compiled'], stats['failed']) == (9, 8, 6, 2)
+    assert stats['workers'] == workers
+    assert sum(stats['engines'].values()) == 6
+    assert stats['memory'] > 0 and stats['elapsed'] >= 0 and stats['compile_time'] > 0
+    assert (stats['program_size'] > 0) == (workers > 1)
+
+
+def compile_error(pattern):
+    with pytest.raises(RexError) as e:
+        compile(pattern)
+    return e.value
+
+
+def test_compile_many_options():
+    batch = compile_many(['ab', 'Ab'], workers=2, ignorecase=True)
+    assert [obj.match('aB') for obj in batch] == [True, True]
+    assert batch[0].ignorecase
+
+    batch = compile_many(['abc', 'abcd'], workers=2, max_errors=1)
+    assert [obj.engine for obj in batch] == ['approx', 'approx']
+    assert [obj.match('ab') for obj in batch] == [True, False]
+
+    batch = compile_many([], workers=4)
+    assert batch.patterns == [] and batch.errors == {} and batch.stats['workers'] == 1
+
+    with pytest.raises(ValueError):
+        compile_many(['a'], workers=0)
+    with pytest.raises(ValueError):
+        compile_many(['a'], workers=2, engine='bogus')
+    assert 'errors=0' in repr(compile_many(['a'], workers=1))
+
+
+@pytest.mark.parametrize('engine', [None, 'auto', 'nfa', 'dfa', 'compact', 'reverse', 'literal'])
+def test_pickle(engine):
+    obj = compile('abc', engine=engine)
+    obj.enable_stats()
+    obj.enable_cache()
+    copy = pickle.loads(pickle.dumps(obj))
+    assert copy == obj and copy.engine == obj.engine and copy.explain() == obj.explain()
+    assert copy.stats is None and copy.cache is None
+    assert copy.match('abc') and not copy.match('abd')
+    assert copy.fullmatch('abc').span() == (0, 3)
+
+
+def test_pickle_tiered():
+    librex.set_tiering(threshold=5)
+    try:
+        obj = compile(r'\w+\d')
+        copy = pickle.loads(pickle.dumps(obj))
+        for _ in range(10):
+            assert copy.match('abc1')
+        assert copy.engine == 'dfa'
+        # promoted patterns are pickled with their DFA
+        assert pickle.loads(pickle.dumps(copy)).engine == 'dfa'
+    finally:
+        librex.set_tiering()
+
+
+def test_pickle_shared_tables(tmp_path):
+    with librex.export_tables([r'\d+', r'.*\.log'], path=str(tmp_path / 'tables')) as tables:
+        copies = [pickle.loads(pickle.dumps(obj)) for obj in tables]
+    assert [obj.engine for obj in copies] == ['dfa', 'reverse']
+    assert [obj.match('123') for obj in copies] == [True, False]
+    assert [obj.match('a.log') for obj in copies] == [False, True]
+
+
+def test_load_program_version():
+    program = _bulk.dump_program(compile('a'))
+    with pytest.raises(RexError):
+        _bulk.load_program((0,) + program[1:])
@@ -0,0 +1,119 @@
+import threading
+
+import pytest
+
+import librex
+from librex import compile, RexCache, RexBudgetError
+
+
+@pytest.mark.parametrize('engine', [None, 'nfa', 'dfa', 'literal'])
+def test_cache(engine):
+    r = compile('abc', engine=engine)
+    assert r.cache is None
+
+    cache = r.enable_cache()
+    assert isinstance(cache, RexCache)
+    assert r.cache is cache and r.enable_cache() is cache
+    assert r.match('abc') is True
+    assert r.match('abd') is False
+    assert r.match('abc') is True
+    assert r.match('abd') is False
+    assert (cache.hits, cache.misses) == (2, 2)
+    assert cache.hit_rate == 0.5
+    assert len(cache) == 2 and cache.size == 6
+
+    cache.reset()
+    assert cache.as_dict() == {'max_entries': 4096, 'max_size': 1024 * 1024, 'entries': 2, 'size': 6,
+                               'hits': 0, 'misses': 0, 'evictions': 0, 'hit_rate': 0.0}
+    cache.clear()
+    assert len(cache) == 0 and cache.size == 0
+
+    r.disable_cache()
+    assert r.cache is None
+    assert r.match('abc') is True
+    assert cache.misses == 0
+
+
+def test_cache_lru():
+    r = compile(r'\w+')
+    cache = r.enable_cache(max_entries=3)
+    for s in ['a', 'b', 'c', 'a', 'd']:
+        r.match(s)
+    # 'b' was the least recently used one
+    assert cache.evictions == 1
+    assert list(cache._entries) == ['c', 'a', 'd']
+    r.match('b')
+    assert cache.misses == 5 and cache.hits == 1
+
+
+def test_cache_size_limit():
+    r = compile('.*')
+    cache = r.enable_cache(max_size=10)
+    r.match('x' * 11)
+    assert len(cache) == 0
+    r.match('x' * 6)
+    r.match('y' * 4)
+    assert len(cache) == 2 and cache.size == 10
+    r.match('z')
+    assert list(cache._entries) == ['y' * 4, 'z'] and cache.size == 5
+    # new limits apply to the enabled cache
+    assert r.enable_cache(max_entries=1) is cache
+    assert list(cache._entries) == ['z'] and cache.max_size == 10
+    assert 'hit_rate=' in repr(cache)
+    with pytest.raises(ValueError):
+        cache.resize(0, 10)
+    with pytest.raises(ValueError):
+        RexCache(max_size=0)
+
+
+def test_cache_with_stats_and_budget():
+    r = compile(r'\d+')
+    stats = r.enable_stats()
+    cache = r.enable_cache()
+    assert r.match('123') and r.match('123')
+    # cached results don't run the automaton
+    assert stats.calls == 1 and cache.hits == 1
+    with pytest.raises(RexBudgetError):
+        r.match('4' * 100, budget=10)
+    assert '4' * 100 not in cache._entries
+    assert r.match('123', budget=1)
+
+
+def test_cache_tiering():
+    librex.set_tiering(threshold=5)
+    try:
+        r = compile(r'\w+\d')
+        r.enable_cache()
+        for _ in range(10):
+            r.match('abc1')
+        # hits don't count as calls for promotion
+        assert r.engine == 'nfa'
+        for i in range(10):
+            r.match(f'abc{i}')
+        assert r.engine == 'dfa'
+        assert r.match('abc1') and r.cache.hits == 11
+    finally:
+        librex.set_tiering()
+
+
+def test_cache_threads():
+    r = compile(r'(\w+/)*\w+\.log', engine='dfa')
+    cache = r.enable_cache(max_entries=50)
+    strings = [f'dir{i % 7}/file{i % 80}.{("log", "txt")[i % 3 == 0]}' for i in range(400)]
+    errors = []
+
+    def _run():
+        for s in strings:
+            if r.match(s) != s.endswith('.log'):
+                errors.append(s)
+
+    threads = [threading.Thread(target=_run) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert errors == []
+    assert cache.hits + cache.misses == 8 * len(strings)
+    assert len(cache) <= 50
+    assert cache.size == sum(len(s) for s in cache._entries)
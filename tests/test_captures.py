@@ -0,0 +1,83 @@
+import random
+import re
+
+import pytest
+
+from librex import compile, fullmatch, RexMatch
+
+
+@pytest.mark.parametrize('pattern, string, spans', [
+    ('abc', 'abc', [(0, 3)]),
+    ('abc', 'abd', None),
+    ('', 'abc', [(0, 3)]),
+    ('a(b)c', 'abc', [(0, 3), (1, 2)]),
+    ('(a|b)*(c)', 'abac', [(0, 4), (2, 3), (3, 4)]),
+    ('(a*)(a*)', 'aaa', [(0, 3), (0, 3), (3, 3)]),
+    ('((a)|(b))+', 'ab', [(0, 2), (1, 2), (0, 1), (1, 2)]),
+    ('(a)(b)?', 'a', [(0, 1), (0, 1), (-1, -1)]),
+    (r'(\d+)\.(\d+)', '12.345', [(0, 6), (0, 2), (3, 6)]),
+    ('(a|ab)(c|bcd)(d*)', 'abcd', [(0, 4), (0, 1), (1, 4), (4, 4)]),
+    # empty alternative accepts the rest of the string
+    ('x(a|)y', 'xazz', [(0, 4), (1, 4)]),
+    ('x(a|)y', 'xay', [(0, 3), (1, 3)]),
+])
+def test_fullmatch_spans(pattern, string, spans):
+    m = fullmatch(pattern, string)
+    if spans is None:
+        assert m is None
+        return
+
+    assert isinstance(m, RexMatch)
+    assert [m.span(g) for g in range(compile(pattern).groups + 1)] == spans
+
+
+@pytest.mark.parametrize('pattern', [
+    '(a|b)*(c)',
+    '(a*)(a*)',
+    '((a)|(b))+',
+    '(a|ab)(c|bcd)(d*)',
+    r'(\d+)\.(\d+)',
+    '(a|b)*a(a|b)',
+    '((ab)*c)?',
+    '(a|b|c)*(b)(c)?',
+])
+@pytest.mark.parametrize('engine', ['nfa', 'dfa'])
+def test_fullmatch_vs_re(pattern, engine):
+    rnd = random.Random(pattern)
+    r = compile(pattern, engine=engine)
+    expected = re.compile(pattern)
+    for _ in range(300):
+        string = ''.join(rnd.choice('abcd1.') for _ in range(rnd.randint(0, 7)))
+        m = r.fullmatch(string)
+        m2 = expected.fullmatch(string)
+        assert (m is None) == (m2 is None) == (not r.match(string))
+        if m is not None:
+            assert m.groups() == m2.groups()
+
+
+def test_match_object():
+    m = compile(r'(\w+)=(\d+)?(x)?').fullmatch('timeout=30')
+    assert m.string == 'timeout=30'
+    assert m.re.pattern == r'(\w+)=(\d+)?(x)?'
+    assert m.group() == m[0] == 'timeout=30'
+    assert m.group(1) == 'timeout'
+    assert m.group(1, 2, 3) == ('timeout', '30', None)
+    assert m.groups() == ('timeout', '30', None)
+    assert m.groups('') == ('timeout', '30', '')
+    assert (m.start(2), m.end(2)) == (8, 10)
+    assert m.start(3) == m.end(3) == -1
+    assert repr(m) == "<librex.RexMatch object; span=(0, 10), match='timeout=30'>"
+    with pytest.raises(IndexError):
+        m.group(4)
+
+
+def test_captures_lazy():
+    r = compile('(a)(b(c))')
+    assert r.match('abc') is True
+    assert r._captures is None
+    assert r.groups == 3
+    assert compile('abc').groups == 0
+
+
+def test_captures_escaped_save_op():
+    assert fullmatch('a\x03(b)', 'a\x03b').span(1) == (2, 3)
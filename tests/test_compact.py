@@ -0,0 +1,92 @@
+import asyncio
+import random
+
+import pytest
+
+from librex import compile, RexBudgetError
+from librex import _planner
+from librex._compact import CompactDFA
+
+
+def _words(count):
+    rnd = random.Random(count)
+    return [''.join(rnd.choice('abcdefghijklmnopqrstuvwxyz') for _ in range(rnd.randint(4, 9)))
+            for _ in range(count)]
+
+
+@pytest.mark.parametrize('re', [
+    '',
+    'a',
+    '(a|b)*abb',
+    r'.*\.log',
+    r'\w*_test',
+    'a*b*c*',
+    r'(\d+\s)*x',
+    'cat|dog|cattle|doge|bird',
+    'п*пф*',
+    'abc.*',
+])
+def test_compact_match(re):
+    rnd = random.Random(re)
+    dfa = compile(re, engine='dfa')
+    compact = compile(re, engine='compact')
+    assert compact.engine == 'compact'
+    assert compact._engine.nstates == dfa._engine.nstates
+    for _ in range(500):
+        string = ''.join(rnd.choice('abcdgotx._ls 12пф') for _ in range(rnd.randint(0, 8)))
+        assert compact.match(string) == dfa.match(string), string
+
+
+def test_compact_packing():
+    dfa = compile('(' + '|'.join(_words(300)) + r')\d', engine='dfa')._engine
+    compact = CompactDFA(dfa)
+    # most transitions lead to the dead state and are not stored
+    assert len(compact._next) < len(dfa.table) // 4
+    assert compact.memory_estimate() * 4 < dfa.memory_estimate()
+    assert repr(compact).startswith('<CompactDFA states=')
+    for s in range(len(compact._base)):
+        row = dfa.table[s * dfa.nclasses:(s + 1) * dfa.nclasses]
+        for k, t in enumerate(row):
+            i = compact._base[s] + k
+            target = compact._next[i] if compact._check[i] == s else compact._default[s]
+            assert target == t // dfa.nclasses
+
+
+def test_compact_auto(monkeypatch):
+    words = _words(300)
+    # literal alternations get the literal set engine, make it a DFA
+    pattern = '(' + '|'.join(words) + r')\d'
+    assert compile(pattern, engine='auto').engine == 'dfa'
+    monkeypatch.setattr(_planner, '_COMPACT_MIN_ENTRIES', 1000)
+    r = compile(pattern, engine='auto')
+    assert r.engine == 'compact'
+    assert 'transitions packed into' in r.explain()
+    assert r.match(words[7] + '1') and not r.match(words[7])
+    # small tables are not worth packing
+    assert compile(r'a\d+', engine='auto').engine == 'dfa'
+
+
+def test_compact_early_exit_and_budget():
+    r = compile('GET /.*', engine='compact')
+    stats = r.enable_stats()
+    assert r.match('GET /' + 'x' * 1000)
+    assert stats.symbols == 5
+    assert not r.match('POST /')
+    assert stats.symbols == 6
+    assert r.match('GET /' + 'x' * 1000, budget=10)
+    with pytest.raises(RexBudgetError):
+        compile(r'\d+', engine='compact').match('1' * 100, budget=10)
+
+
+def test_compact_stream():
+    class Reader(object):
+        def __init__(self, data):
+            self.chunks = [data[i:i + 2] for i in range(0, len(data), 2)]
+
+        async def read(self, n):
+            return self.chunks.pop(0) if self.chunks else b''
+
+    r = compile(r'(\w+ )*\d+', engine='compact')
+    assert asyncio.run(r.match_stream(Reader(b'ab cd 123')))
+    assert not asyncio.run(r.match_stream(Reader(b'ab cd 12x')))
+    assert asyncio.run(compile('', engine='compact').match_stream(Reader(b'anything')))
@@ -1,6 +1,6 @@
 import pytest
 
-from librex import compile
+from librex import compile, RexError
 from librex._impl import _compile, _State
 
 
@@ -26,3 +26,81 @@ def test_compile(re):
 
         r1 = fun(r)
         assert r1 is r
+
+
+@pytest.mark.parametrize('re1, re2', [
+    (r'x\d+', r'y\d+'),
+    ('ab', 'cb'),
+    ('a(b|c)*', 'd(b|c)*'),
+])
+def test_compile_shared_states(re1, re2):
+    r1 = compile(re1)
+    r2 = compile(re2)
+    assert r1._nfa is not r2._nfa
+    assert r1._nfa.out is r2._nfa.out
+
+
+def test_compile_shared_states_in_pattern():
+    nfa = compile(r'foo\d+|bar\d+')._nfa
+    assert nfa.out.out.out.out is nfa.out1.out.out.out
+
+
+@pytest.mark.parametrize('re1, re2, expected_result', [
+    ('ab', 'ab', True),
+    ('a(b)', '(a)b', True),
+    ('(a|b)', 'a|b', True),
+    ('ab', 'ba', False),
+    ('a|b', 'b|a', False),
+    (r'a\+', 'a+', False),
+])
+def test_compile_equality(re1, re2, expected_result):
+    r1 = compile(re1)
+    r2 = compile(re2)
+    assert (r1 == r2) is expected_result
+    assert (r1 != r2) is not expected_result
+    assert len({r1, r2}) == (1 if expected_result else 2)
+    assert r1 != re1
+
+
+@pytest.mark.parametrize('re, kwargs, pos', [
+    ('a' * 50, {'max_states': 30}, 10),
+    ('ab|cd' * 10, {'max_states': 30}, 13),
+    ('((((a))))', {'max_depth': 3}, 3),
+    ('(a)(b)((c)|(((d))))', {'max_depth': 3}, 13),
+])
+def test_compile_limits(re, kwargs, pos):
+    with pytest.raises(RexError) as e:
+        compile(re, **kwargs)
+    assert e.value.pos == pos
+    assert str(pos) in str(e.value)
+
+
+@pytest.mark.parametrize('re, kwargs', [
+    ('a' * 10, {'max_states': 30}),
+    ('((((a))))', {'max_depth': 4}),
+])
+def test_compile_within_limits(re, kwargs):
+    assert compile(re, **kwargs).match(re.replace('(', '').replace(')', '')) is True
+
+
+def test_compile_deep_nfa():
+    r = compile('a?' * 5000 + 'b')
+    assert r.match('b') is True
+    assert r.match('ab') is True
+    assert r.match('c') is False
+
+
+@pytest.mark.parametrize('re, state_count', [
+    ('', 1),
+    ('a', 2),
+    ('a*', 3),
+    ('(a|b)*abb', 9),
+])
+def test_compile_size(re, state_count):
+    r = compile(re)
+    assert r.state_count == state_count
+    assert r.memory_estimate > 0
+
+    size = r.memory_estimate
+    r = compile(r, engine='dfa')
+    assert r.memory_estimate > size
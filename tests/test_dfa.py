@@ -0,0 +1,76 @@
+import random
+
+import pytest
+
+from librex import compile
+from librex._dfa import build_dfa
+from librex._impl import _post2nfa, _re2post
+from librex._program import flatten
+
+
+def get_dfa(re, max_states=1000):
+    return build_dfa(flatten(_post2nfa(_re2post(re))), max_states)
+
+
+@pytest.mark.parametrize('re, nstates', [
+    ('', 1),
+    ('a', 3),
+    ('a*', 2),
+    ('a+', 3),
+    ('a|b', 3),
+    ('(a|b)*abb', 5),
+    ('(a|b)*', 2),
+    ('a*a*a*', 2),
+    ('a||b', 1),
+])
+def test_dfa_minimal(re, nstates):
+    assert get_dfa(re).nstates == nstates
+
+
+@pytest.mark.parametrize('re, nclasses', [
+    ('a|b', 2),
+    ('ab', 3),
+    (r'\d+', 2),
+    (r'\d|\w|\s', 2),
+    (r'\d\w', 3),
+])
+def test_dfa_classes(re, nclasses):
+    assert get_dfa(re).nclasses == nclasses
+
+
+@pytest.mark.parametrize('re', [
+    '',
+    '|',
+    'a|',
+    'a(|b)',
+    'a(b|)',
+    'a||b',
+    'a?ab?',
+    'a|(b?)+',
+    '(a|b)*abb',
+    'abc(d|e)+f?g*',
+    r':\s+(\d+|abcd)\s*',
+    r'\w+\W\d*',
+    r'\D\S.',
+    'п*пф*',
+])
+def test_dfa_match(re):
+    rnd = random.Random(re)
+    nfa = compile(re)
+    dfa = compile(re, engine='dfa')
+    assert dfa.engine == 'dfa'
+    for _ in range(500):
+        string = ''.join(rnd.choice('abcdefg: \t12_!пф') for _ in range(rnd.randint(0, 8)))
+        assert dfa.match(string) == nfa.match(string)
+
+
+def test_dfa_budget():
+    r = compile('(a|b)*a(a|b)(a|b)(a|b)', engine='dfa', max_dfa_states=8)
+    assert r.engine == 'nfa'
+    assert r.match('abbbabaa') is True
+    assert r.match('aaabbbb') is False
+
+    r = compile(r, engine='dfa')
+    assert r.engine == 'dfa'
+    assert r.match('abbbabaa') is True
+    assert r.match('aaabbbb') is False
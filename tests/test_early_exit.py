@@ -0,0 +1,69 @@
+import random
+import re as stdlib_re
+
+import pytest
+
+from librex import compile
+from librex._impl import _StateType
+
+
+@pytest.mark.parametrize('re, string, expected, consumed', [
+    ('abc', 'abx' + 'c' * 100, False, 3),
+    ('a.*', 'a' + 'x' * 100, True, 1),
+    ('a.+', 'ab' + 'x' * 100, True, 2),
+    ('(a|b).*', 'b' + 'x' * 100, True, 1),
+    ('.*', 'x' * 100, True, 0),
+    ('a*b', 'c' * 100, False, 1),
+])
+@pytest.mark.parametrize('engine', ['nfa', 'dfa'])
+def test_early_exit(re, string, expected, consumed, engine):
+    r = compile(re, engine=engine)
+    stats = r.enable_stats()
+    assert r.match(string) is expected
+    assert stats.symbols == consumed
+
+
+@pytest.mark.parametrize('re', ['a.*', 'a.+', '(ab|c.*)', 'x(a|.*)'])
+def test_accept_all_tail(re):
+    nfa = compile(re)._nfa
+    assert any(s.s_type == _StateType.SPLIT and _StateType.EARLY_MATCH in (s.out.s_type, s.out1.s_type)
+               for s in _states(nfa))
+
+
+@pytest.mark.parametrize('re', ['a.*', 'a.+', '(ab|c.*)', 'x(a|.*)', '.*a', '(.*)+b', r'\w*', 'a.*|b',
+                                '(a.*)*b'])
+@pytest.mark.parametrize('engine', ['nfa', 'dfa'])
+def test_early_exit_match(re, engine):
+    r = compile(re, engine=engine)
+    rnd = random.Random(re)
+    for _ in range(300):
+        string = ''.join(rnd.choice('abcx ') for _ in range(rnd.randint(0, 6)))
+        assert r.match(string) == bool(stdlib_re.fullmatch(re, string)), string
+
+
+def test_dfa_sinks():
+    dfa = compile('ab.*', engine='dfa')._engine
+    assert dfa.dead >= 0
+    assert dfa.accept_all >= 0
+    assert compile('(a|b)*', engine='dfa')._engine.accept_all < 0
+
+
+def test_stream_early_result():
+    stream = compile('ab.*', engine='dfa')._engine.stream()
+    stream.feed('abc')
+    assert stream.result is True
+    stream = compile('ab.*', engine='dfa')._engine.stream()
+    stream.feed('ax')
+    assert stream.result is False
+    assert stream.close() is False
+
+
+def _states(start):
+    seen = {id(start)}
+    states = [start]
+    for s in states:
+        for x in (s.out, s.out1):
+            if x is not None and id(x) not in seen:
+                seen.add(id(x))
+                states.append(x)
+    return states
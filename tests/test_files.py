@@ -0,0 +1,102 @@
+import bz2
+import gzip
+import io
+import lzma
+import threading
+
+import pytest
+
+from librex import compile
+from librex import _files
+
+
+LINES = [f'{i} {"ошибка" if i % 7 == 0 else "ok"}' for i in range(2000)]
+DATA = ('\r\n'.join(LINES) + '\n').encode()
+EXPECTED = [line for line in LINES if line.endswith('ошибка')]
+
+COMPRESSORS = {
+    'plain': lambda data: data,
+    'gzip': gzip.compress,
+    'bz2': bz2.compress,
+    'xz': lzma.compress,
+}
+
+
+@pytest.fixture(autouse=True)
+def small_blocks(monkeypatch):
+    # blocks split lines and multibyte symbols
+    monkeypatch.setattr(_files, '_BLOCK_SIZE', 1001)
+
+
+@pytest.mark.parametrize('compression', COMPRESSORS)
+@pytest.mark.parametrize('threaded', [False, True])
+def test_scan_file(compression, threaded):
+    r = compile(r'\d+ ошибка')
+    data = COMPRESSORS[compression](DATA)
+    assert _files.compression_of(io.BytesIO(data)) == (None if compression == 'plain' else compression)
+    assert list(r.scan_file(io.BytesIO(data), threaded=threaded)) == EXPECTED
+    # buffered readers are peeked at
+    assert list(r.scan_file(io.BufferedReader(io.BytesIO(data)), threaded=threaded)) == EXPECTED
+
+
+def test_scan_file_path(tmp_path):
+    path = tmp_path / 'log.gz'
+    path.write_bytes(gzip.compress(b'a\nb\na'))
+    assert list(compile('a').scan_file(path)) == ['a', 'a']
+    assert list(compile('a').scan_file(str(path), threaded=True)) == ['a', 'a']
+    assert list(compile('.*').scan_file(io.BytesIO(b''))) == []
+    assert list(compile('.*').scan_file(io.BytesIO(b'\n\n'))) == ['', '']
+    # like scan_lines(), a final line holding '\r' alone is an empty line
+    assert list(compile('.*').scan_file(io.BytesIO(b'a\n\r'))) == ['a', '']
+    assert list(compile('.*').scan_file(io.BytesIO(b'a\n\r'), threaded=True)) == ['a', '']
+
+
+@pytest.mark.parametrize('threaded', [False, True])
+def test_scan_file_long_lines(threaded):
+    # '\r' ends the first block, the next lines span many blocks
+    lines = ['ab' * 500 + '\r', 'x', 'ab' * 5000, 'ab' * 500 + 'a' + '\r', 'b' * 3000, 'ab' * 3000]
+    data = gzip.compress('\n'.join(lines).encode())
+    assert list(compile('(ab)*').scan_file(io.BytesIO(data), threaded=threaded)) == \
+        ['ab' * 500, 'ab' * 5000, 'ab' * 3000]
+
+
+def test_scan_file_bad_header(tmp_path, monkeypatch):
+    path = tmp_path / 'log.gz'
+    path.write_bytes(b'\x1f\x8b')
+    opened = []
+
+    def tracking_open(*args, **kwargs):
+        opened.append(open(*args, **kwargs))
+        return opened[-1]
+
+    def failing(fileobj):
+        raise OSError('corrupt header')
+
+    monkeypatch.setattr(_files, 'open', tracking_open, raising=False)
+    monkeypatch.setattr(_files, 'compression_of', failing)
+    with pytest.raises(OSError):
+        list(compile('a').scan_file(path))
+    assert len(opened) == 1 and opened[0].closed
+
+
+def test_scan_file_encoding():
+    data = gzip.compress('abc\nпривет\n'.encode('cp1251'))
+    assert list(compile(r'\w+').scan_file(io.BytesIO(data), encoding='cp1251')) == ['abc', 'привет']
+    with pytest.raises(UnicodeDecodeError):
+        list(compile(r'\w+').scan_file(io.BytesIO(data)))
+    assert list(compile('abc').scan_file(io.BytesIO(data), errors='replace')) == ['abc']
+
+
+@pytest.mark.parametrize('threaded', [False, True])
+def test_scan_file_truncated(threaded):
+    data = gzip.compress(DATA)[:-100]
+    with pytest.raises(EOFError):
+        list(compile('.*').scan_file(io.BytesIO(data), threaded=threaded))
+
+
+def test_scan_file_early_close():
+    data = gzip.compress(DATA * 20)
+    lines = compile(r'\d+ ошибка').scan_file(io.BytesIO(data), threaded=True)
+    assert next(lines) == EXPECTED[0]
+    lines.close()
+    assert not [t for t in threading.enumerate() if t.name == 'librex-decompress']
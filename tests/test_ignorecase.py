@@ -0,0 +1,71 @@
+import random
+import re as stdlib_re
+
+import pytest
+
+from librex import compile
+from librex._casefold import case_variants
+
+
+@pytest.mark.parametrize('re', [
+    'abc',
+    'Hello, World',
+    '(get|post) /index',
+    r'\w+@example\.com',
+    '.*error',
+    'a*B+c?',
+    'ǅ',
+])
+@pytest.mark.parametrize('engine', ['nfa', 'dfa', 'auto', 'reverse'])
+def test_ignorecase_match(re, engine):
+    r = compile(re, engine=engine, ignorecase=True)
+    ref = stdlib_re.compile(re, stdlib_re.IGNORECASE)
+    rnd = random.Random(re)
+    symbols = ''.join(''.join(case_variants(sym)) for sym in sorted(set(re))) + 'x1 '
+    for _ in range(300):
+        string = ''.join(rnd.choice(symbols) for _ in range(rnd.randint(0, len(re) + 2)))
+        assert r.match(string) == bool(ref.fullmatch(string)), string
+    assert r.match(re.swapcase()) == bool(ref.fullmatch(re.swapcase()))
+
+
+@pytest.mark.parametrize('pattern, string', [
+    ('k', 'K'),           # KELVIN SIGN
+    ('s', 'ſ'),           # LATIN SMALL LETTER LONG S
+    ('σ', 'ς'),
+    ('Σ', 'ς'),
+    ('ß', 'ẞ'),           # LATIN CAPITAL LETTER SHARP S
+    ('i', 'İ'),           # LATIN CAPITAL LETTER I WITH DOT ABOVE
+    ('ı', 'I'),
+])
+def test_ignorecase_special(pattern, string):
+    assert compile(pattern, ignorecase=True).match(string) is True
+    assert compile(string, ignorecase=True).match(pattern) is True
+    assert compile(pattern).match(string) is False
+    assert bool(stdlib_re.fullmatch(pattern, string, stdlib_re.IGNORECASE))
+
+
+def test_ignorecase_no_extra_states():
+    assert compile('abc', ignorecase=True).state_count == compile('abc').state_count
+    dfa = compile('abc', engine='dfa', ignorecase=True)._engine
+    assert dfa.nclasses == compile('abc', engine='dfa')._engine.nclasses
+
+
+def test_ignorecase_fullmatch():
+    m = compile('(ab)(c+)', ignorecase=True).fullmatch('aBCc')
+    assert m.groups() == ('aB', 'Cc')
+
+
+def test_ignorecase_pattern():
+    r = compile('abc', ignorecase=True)
+    assert r.ignorecase is True
+    assert compile('abc').ignorecase is False
+    assert r != compile('abc')
+    assert r == compile('ABC', ignorecase=True)
+    assert repr(r) == "<RexPattern 'abc' engine=nfa ignorecase>"
+    assert compile('123', ignorecase=True) == compile('123')
+
+    r2 = compile(r, engine='dfa')
+    assert r2.ignorecase is True
+    assert r2.match('ABC') is True
+    with pytest.raises(ValueError):
+        compile(r, ignorecase=True)
@@ -0,0 +1,34 @@
+import subprocess
+import sys
+
+
+def test_import_is_lightweight():
+    code = (
+        'import sys, librex; '
+        'print(" ".join(m for m in ("argparse", "asyncio", "dataclasses", "enum", "reprlib", "typing") '
+        'if m in sys.modules))'
+    )
+    out = subprocess.run([sys.executable, '-c', code], stdout=subprocess.PIPE, check=True,
+                         universal_newlines=True)
+    assert out.stdout.split() == []
+
+
+def test_engines_import_is_lightweight():
+    # engines are loaded on first use, they don't pull typing in either
+    modules = ['_algebra', '_approx', '_batch', '_bulk', '_compact', '_dfa', '_files', '_lexer', '_literal',
+               '_planner', '_program', '_shared']
+    code = (
+        'import sys, importlib; '
+        f'[importlib.import_module("librex." + m) for m in {modules!r}]; '
+        'print("typing" in sys.modules)'
+    )
+    out = subprocess.run([sys.executable, '-c', code], stdout=subprocess.PIPE, check=True,
+                         universal_newlines=True)
+    assert out.stdout.split() == ['False']
+
+
+def test_lazy_exports():
+    import librex
+
+    assert librex.Lexer.__module__ == 'librex._lexer'
+    assert librex.LiteralSet.__module__ == 'librex._literal'
@@ -0,0 +1,138 @@
+import random
+
+import pytest
+
+from librex import Lexer, RexError, compile
+
+RULES = [
+    ('num', r'\d+'),
+    ('kw', 'if|else'),
+    ('id', r'\w+'),
+    (None, r'\s+'),
+    ('op', r'=|==|\+|<|<='),
+]
+
+
+@pytest.mark.parametrize('max_dfa_states', [10000, 2])
+def test_lexer_tokens(max_dfa_states):
+    lexer = Lexer(RULES, max_dfa_states)
+    assert lexer.engine == ('dfa' if max_dfa_states > 2 else 'nfa')
+    string = 'if x1 == 42 else abc+1<=ifx'
+    assert [(name, string[start:end]) for name, start, end in lexer.tokenize(string)] == [
+        ('kw', 'if'), ('id', 'x1'), ('op', '=='), ('num', '42'), ('kw', 'else'), ('id', 'abc'),
+        ('op', '+'), ('num', '1'), ('op', '<='), ('id', 'ifx'),
+    ]
+
+
+@pytest.mark.parametrize('max_dfa_states', [10000, 2])
+def test_lexer_pos(max_dfa_states):
+    lexer = Lexer(RULES, max_dfa_states)
+    assert list(lexer.tokenize('a 12 b', 2, 3)) == [('num', 2, 3)]
+    assert list(lexer.tokenize('a 12 b', 1)) == [('num', 2, 4), ('id', 5, 6)]
+    assert list(lexer.tokenize('')) == []
+
+
+@pytest.mark.parametrize('max_dfa_states', [10000, 2])
+def test_lexer_rest_of_input(max_dfa_states):
+    lexer = Lexer([('comment', '#.*'), ('id', r'\w+'), (None, r'\s+')], max_dfa_states)
+    assert list(lexer.tokenize('ab # c d', endpos=7)) == [('id', 0, 2), ('comment', 3, 7)]
+    assert list(lexer.tokenize('ab #')) == [('id', 0, 2), ('comment', 3, 4)]
+
+
+@pytest.mark.parametrize('max_dfa_states', [10000, 2])
+def test_lexer_no_match(max_dfa_states):
+    lexer = Lexer(RULES, max_dfa_states)
+    tokens = lexer.tokenize('a = !')
+    assert next(tokens) == ('id', 0, 1)
+    assert next(tokens) == ('op', 2, 3)
+    with pytest.raises(RexError) as e:
+        next(tokens)
+    assert e.value.pos == 4
+
+
+def test_lexer_dfa_vs_nfa():
+    rules = [('a', 'ab*'), ('b', '(ab|ba)+'), ('c', 'b|c'), ('d', r'\w\w\w')]
+    dfa = Lexer(rules)
+    nfa = Lexer(rules, max_dfa_states=2)
+    rnd = random.Random(0)
+    for _ in range(300):
+        string = ''.join(rnd.choice('abc') for _ in range(rnd.randint(0, 12)))
+        assert list(dfa.tokenize(string)) == list(nfa.tokenize(string))
+
+
+def test_lexer_rules():
+    lexer = Lexer([('x', compile('a+'))])
+    assert lexer.rules == [('x', 'a+')]
+    assert list(lexer.tokenize('aaa')) == [('x', 0, 3)]
+
+    with pytest.raises(ValueError):
+        Lexer([])
+    with pytest.raises(ValueError):
+        Lexer([('x', 'a'), ('y', compile('abc', max_errors=1))])
+    assert Lexer([('x', compile('a', ignorecase=True))]).rules == [('x', 'a')]
+
+
+@pytest.mark.parametrize('pattern', ['', 'a*', 'a?', '(a|b)*', 'a|', 'a(|b)'])
+def test_lexer_bad_rules(pattern):
+    with pytest.raises(RexError):
+        Lexer([('x', 'a'), ('bad', pattern)])
+
+
+def _chunks(string, rnd):
+    i = 0
+    while i < len(string):
+        n = rnd.randint(0, 4)
+        yield string[i:i + n]
+        i += n
+
+
+@pytest.mark.parametrize('max_dfa_states', [10000, 2])
+def test_lexer_tokenize_chunks(max_dfa_states):
+    lexer = Lexer(RULES, max_dfa_states)
+    string = 'if x1 == 42 else abc+1<=ifx  elsewhere 1234567 <'
+    rnd = random.Random(max_dfa_states)
+    for _ in range(50):
+        assert list(lexer.tokenize_chunks(_chunks(string, rnd))) == list(lexer.tokenize(string))
+    assert list(lexer.tokenize_chunks(['a', '', 'b 1', '2'])) == [('id', 0, 2), ('num', 3, 5)]
+    assert list(lexer.tokenize_chunks([])) == []
+
+
+@pytest.mark.parametrize('max_dfa_states', [10000, 2])
+def test_lexer_tokenize_chunks_rescan(max_dfa_states):
+    # the longest token is found only after scanning past it, the rest is scanned again
+    rules = [('a', 'ab*'), ('b', '(ab|ba)+'), ('c', 'b|c'), ('d', r'\w\w\w'), ('comment', '#.*')]
+    lexer = Lexer(rules, max_dfa_states)
+    rnd = random.Random(0)
+    for _ in range(300):
+        string = ''.join(rnd.choice('abc#') for _ in range(rnd.randint(0, 16)))
+        try:
+            expected = list(lexer.tokenize(string))
+        except RexError as e:
+            with pytest.raises(RexError) as chunked:
+                list(lexer.tokenize_chunks(_chunks(string, rnd)))
+            assert chunked.value.pos == e.pos
+        else:
+            assert list(lexer.tokenize_chunks(_chunks(string, rnd))) == expected
+
+
+@pytest.mark.parametrize('max_dfa_states', [10000, 2])
+def test_lexer_tokenize_chunks_no_match(max_dfa_states):
+    lexer = Lexer(RULES, max_dfa_states)
+    tokens = lexer.tokenize_chunks(iter(['a =', ' !', 'b']))
+    assert next(tokens) == ('id', 0, 1)
+    assert next(tokens) == ('op', 2, 3)
+    with pytest.raises(RexError) as e:
+        next(tokens)
+    assert e.value.pos == 4
+    with pytest.raises(RexError) as e:
+        list(Lexer([('x', 'abc')], max_dfa_states).tokenize_chunks(['abcab']))
+    assert e.value.pos == 3
+
+
+@pytest.mark.parametrize('max_dfa_states', [10000, 2])
+def test_lexer_ignorecase_rules(max_dfa_states):
+    rules = [('kw', compile('if|else', ignorecase=True)), ('id', r'\w+'), (None, r'\s+')]
+    lexer = Lexer(rules, max_dfa_states)
+    assert list(lexer.tokenize('IF Else x')) == [('kw', 0, 2), ('kw', 3, 7), ('id', 8, 9)]
+    assert list(Lexer([('w', compile('abc', ignorecase=True))], max_dfa_states).tokenize('ABC')) == \
+        [('w', 0, 3)]
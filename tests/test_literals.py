@@ -0,0 +1,92 @@
+import random
+
+import pytest
+
+from librex import compile, compile_literals, match, LiteralSet, RexError
+from librex._impl import _re2post
+from librex._literal import literal_set_of
+
+WORDS = ['w{:02d}'.format(i) for i in range(20)]
+
+
+@pytest.mark.parametrize('re, words', [
+    ('abc', {'abc'}),
+    ('ab|cd|e\\.f', {'ab', 'cd', 'e.f'}),
+    ('(ab|c)|d', {'ab', 'c', 'd'}),
+    ('a|a|b', {'a', 'b'}),
+    ('(a|b)c', None),
+    ('a|', None),
+    ('a|b*', None),
+    (r'a|\d', None),
+    ('a|.', None),
+    ('', None),
+])
+def test_literal_set_of(re, words):
+    assert literal_set_of(_re2post(re)) == words
+
+
+def test_literal_set_finditer():
+    rnd = random.Random(0)
+    for _ in range(300):
+        words = {''.join(rnd.choice('abc') for _ in range(rnd.randint(1, 4)))
+                 for _ in range(rnd.randint(1, 8))}
+        string = ''.join(rnd.choice('abc') for _ in range(rnd.randint(0, 12)))
+        expected = sorted((i, i + len(w))
+                          for w in words for i in range(len(string)) if string.startswith(w, i))
+        assert sorted(LiteralSet(words).finditer(string)) == expected
+
+
+def test_literal_set_search():
+    ls = compile_literals(['he', 'she', 'hers', 'a.b*'])
+    assert ls.search('ushers') == (1, 4)
+    assert ls.search('hxa.b*') == (2, 6)
+    assert ls.search('xyz') is None
+    assert ls.search('') is None
+    assert compile_literals(['', 'a']).search('xa') == (0, 0)
+    assert list(compile_literals(['']).finditer('ab')) == [(0, 0), (1, 1), (2, 2)]
+
+
+def test_literal_set_match():
+    ls = compile_literals(['he', 'she', 'a.b*', ''])
+    assert len(ls) == 4
+    assert 'she' in ls
+    assert ls.match('she') is True
+    assert ls.match('a.b*') is True
+    assert ls.match('') is True
+    assert ls.match('sh') is False
+    assert ls.memory_estimate() > 0
+
+
+def test_compile_detects_literal_set():
+    pattern = '|'.join(WORDS)
+    r = compile(pattern)
+    assert r.engine == 'literal_set'
+    assert r._nfa is None
+    assert r.match('w07') is True
+    assert r.match('w7') is False
+    assert match(pattern, 'w19') is True
+    assert 'alternation of 20 literal strings' in r.explain()
+
+    # the NFA is built when needed
+    assert r.state_count == compile(r, engine='nfa').state_count
+    assert r._nfa is not None
+
+
+def test_compile_small_alternation():
+    assert compile('|'.join(WORDS[:3])).engine == 'nfa'
+    assert compile('|'.join(WORDS[:3]), engine='auto').engine == 'literal_set'
+    assert compile('|'.join(WORDS) + '|x*').engine == 'nfa'
+
+
+def test_literal_set_engine():
+    r = compile('(ab|c)|d', engine='literal_set')
+    assert r.engine == 'literal_set'
+    assert r.fullmatch('ab').span(1) == (0, 2)
+    assert r.fullmatch('d').span(1) == (-1, -1)
+    assert r.fullmatch('abd') is None
+    assert r.match('c', budget=1) is True
+    with pytest.raises(RexError):
+        r.match('ab', budget=1)
+
+    with pytest.raises(RexError):
+        compile('a*|b', engine='literal_set')
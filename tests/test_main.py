@@ -1,4 +1,9 @@
+import sys
+
+import pytest
+
 import librex
+import librex.main as librex_main
 from librex.main import main as rex_main
 
 
@@ -36,3 +41,48 @@ def test_main_unexpected_error(monkeypatch):
     monkeypatch.setattr(librex, 'match', mockmatch)
     res = rex_main('', '')
     assert res == 2
+
+
+def test_cli_fast_path(monkeypatch):
+    calls = []
+    monkeypatch.setattr(librex_main, 'main', lambda pattern, string: calls.append((pattern, string)) or 0)
+    monkeypatch.setattr(sys, 'argv', ['re-match', 'a+', 'aaa'])
+    with pytest.raises(SystemExit) as e:
+        librex_main.cli()
+    assert e.value.code == 0
+    assert calls == [('a+', 'aaa')]
+
+
+def test_cli_argparse(monkeypatch):
+    calls = []
+    monkeypatch.setattr(librex_main, 'main', lambda pattern, string: calls.append((pattern, string)) or 1)
+    monkeypatch.setattr(sys, 'argv', ['re-match', '--', '-a', 'b'])
+    with pytest.raises(SystemExit) as e:
+        librex_main.cli()
+    assert e.value.code == 1
+    assert calls == [('-a', 'b')]
+
+
+def test_cli_scan(monkeypatch, tmp_path, capsys):
+    import gzip
+
+    path = tmp_path / 'log.gz'
+    path.write_bytes(gzip.compress(b'a1\nb2\na3\n'))
+    monkeypatch.setattr(sys, 'argv', ['re-match', r'a\d', '-f', str(path), '--file', str(path),
+                                      '--decompress-thread'])
+    with pytest.raises(SystemExit) as e:
+        librex_main.cli()
+    assert e.value.code == 0
+    assert capsys.readouterr().out == 'a1\na3\na1\na3\n'
+
+    assert librex_main.scan('c', [str(path)]) == 1
+    assert librex_main.scan('(', [str(path)]) == 2
+    assert librex_main.scan('a', [str(tmp_path / 'missing')]) == 2
+
+
+def test_cli_scan_string_and_file(monkeypatch, capsys):
+    monkeypatch.setattr(sys, 'argv', ['re-match', 'a', 'a', '-f', 'log'])
+    with pytest.raises(SystemExit) as e:
+        librex_main.cli()
+    assert e.value.code == 2
+    assert 'STRING cannot be given along with --file' in capsys.readouterr().err
@@ -1,6 +1,8 @@
+import time
+
 import pytest
 
-from librex import match, compile
+from librex import match, compile, RexError, RexBudgetError
 from librex._impl import _MATCH_OP, _CONCAT_OP
 
 
@@ -362,3 +364,28 @@ def test_match_sessions(precompiled_re, string, expected_result):
     prev_list_id = precompiled_re._m_session.list_id
     assert precompiled_re.match(string) == expected_result
     assert precompiled_re._m_session.list_id > prev_list_id
+
+
+@pytest.mark.parametrize('engine', ['nfa', 'dfa'])
+def test_match_budget(engine):
+    r = compile('(a|b)*abb', engine=engine)
+    assert r.match('ababb', budget=1000) is True
+    assert r.match('ababa', budget=1000) is False
+    with pytest.raises(RexBudgetError):
+        r.match('ab' * 1000, budget=1000)
+    with pytest.raises(RexError):
+        match(r, 'ab' * 1000, budget=1000)
+
+
+@pytest.mark.parametrize('engine', ['nfa', 'dfa'])
+def test_match_deadline(engine):
+    r = compile('(a|b)*abb', engine=engine)
+    assert r.match('ababb', deadline=time.monotonic() + 1000) is True
+    assert r.match('', deadline=time.monotonic() - 1) is False
+    with pytest.raises(RexBudgetError):
+        r.match('ababb', deadline=time.monotonic() - 1)
+
+
+def test_match_budget_early_match():
+    assert match('a|', 'a' * 1000, budget=1) is True
+    assert match('', 'a' * 1000, budget=1) is True
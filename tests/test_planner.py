@@ -0,0 +1,97 @@
+import pytest
+
+from librex import compile, RexError, RexBudgetError
+
+
+@pytest.mark.parametrize('re, engine', [
+    ('abc', 'literal'),
+    ('(ab)c', 'literal'),
+    (r'a\.b', 'literal'),
+    ('ab|cd', 'literal_set'),
+    ('', 'dfa'),
+    ('a|', 'dfa'),
+    ('a.b', 'dfa'),
+    (r'\d+', 'dfa'),
+    ('(a|b)*c', 'dfa'),
+    ('.*', 'dfa'),
+    (r'.*\.log', 'reverse'),
+    ('.*_test', 'reverse'),
+])
+def test_planner_auto(re, engine):
+    r = compile(re, engine='auto')
+    assert r.engine == engine
+    assert r.explain().startswith(f'{re!r}: engine {engine}')
+
+
+def test_planner_auto_fallback():
+    r = compile('(a|b)*a(a|b)(a|b)(a|b)', engine='auto', max_dfa_states=4)
+    assert r.engine == 'nfa'
+    assert 'DFA exceeds the limit of 4 states' in r.explain()
+    assert r.match('abbbabaa') is True
+
+
+@pytest.mark.parametrize('engine', ['nfa', 'dfa', 'literal'])
+def test_planner_forced(engine):
+    r = compile('abc', engine=engine)
+    assert r.engine == engine
+    assert r.match('abc') is True
+    assert r.match('ab') is False
+    assert r.match('abcd') is False
+
+
+@pytest.mark.parametrize('string', ['abcdef', 'abxdef', 'xbcdef', 'abcxyz'])
+def test_literal_engine_budget(string):
+    # the literal engine runs out of the budget where the DFA does
+    results = []
+    for engine in ('dfa', 'literal'):
+        try:
+            results.append(compile('abcdef', engine=engine).match(string, budget=3))
+        except RexBudgetError as e:
+            results.append(str(e))
+    assert results[0] == results[1]
+
+
+@pytest.mark.parametrize('string', ['abcdef', 'abxdef', 'xbcdef', 'xyzabc', 'xy'])
+def test_literal_set_engine_budget(string):
+    results = []
+    for engine in ('dfa', 'literal_set'):
+        try:
+            results.append(compile('abcdef|xyz', engine=engine).match(string, budget=3))
+        except RexBudgetError as e:
+            results.append(str(e))
+    assert results[0] == results[1]
+
+
+def test_planner_default():
+    r = compile('abc')
+    assert r.engine == 'nfa'
+    assert compile(r) is r
+    assert repr(r) == "<RexPattern 'abc' engine=nfa>"
+
+
+def test_planner_recompile():
+    r = compile('abc')
+    r2 = compile(r, engine='literal')
+    assert r2 is not r
+    assert r.engine == 'nfa'
+    assert r2.engine == 'literal'
+    assert r2 == r
+
+
+def test_planner_errors():
+    with pytest.raises(RexError):
+        compile('a*', engine='literal')
+    with pytest.raises(ValueError):
+        compile('a', engine='jit')
+
+
+@pytest.mark.parametrize('re, string, expected', [
+    ('abc', 'abc', True),
+    ('abc', 'abd', False),
+    ('abc', 'ab', False),
+])
+def test_literal_budget(re, string, expected):
+    r = compile(re, engine='literal')
+    assert r.match(string, budget=3) is expected
+    with pytest.raises(RexError):
+        r.match('abc', budget=2)
@@ -4,7 +4,7 @@ from librex._impl import _StateType, _State, _post2nfa, _match_state, _MATCH_OP,
 from librex._symsets import get_symbol_set
 
 
-def compare_state(state, etalon):
+def compare_state(state, etalon, compared):
     eq = state.sym == etalon.sym
     eq = eq and state.s_type == etalon.s_type
     eq = eq and isinstance(state.out, type(etalon.out))
@@ -12,39 +12,40 @@ def compare_state(state, etalon):
 
     # mark state nodes as compared to break infinite loops
     # when state.out and/or state.out1 points back to already compared states
-    state.compared = True
-    etalon.compared = True
+    compared.add(id(state))
+    compared.add(id(etalon))
 
     return eq
 
 
-def compare_states(states, etalons):
+def compare_states(states, etalons, compared):
     for pair in zip(states, etalons):
-        if not compare_state(*pair):
+        if not compare_state(*pair, compared):
             return False
 
     return True
 
 
 def compare_nfa(nfa, etalon):
+    compared = set()
     list_nfa1 = [nfa]
     list_etalon1 = [etalon]
-    if not compare_states(list_nfa1, list_etalon1):
+    if not compare_states(list_nfa1, list_etalon1, compared):
         return False
 
     while list_nfa1 and list_etalon1:
         list_nfa2 = []
         list_etalon2 = []
         for pair in zip(list_nfa1, list_etalon1):
-            if pair[0].out is not None and not hasattr(pair[0].out, 'compared'):
+            if pair[0].out is not None and id(pair[0].out) not in compared:
                 list_nfa2.append(pair[0].out)
                 list_etalon2.append(pair[1].out)
 
-            if pair[0].out1 is not None and not hasattr(pair[0].out1, 'compared'):
+            if pair[0].out1 is not None and id(pair[0].out1) not in compared:
                 list_nfa2.append(pair[0].out1)
                 list_etalon2.append(pair[1].out1)
 
-            if not compare_states(list_nfa2, list_etalon2):
+            if not compare_states(list_nfa2, list_etalon2, compared):
                 return False
 
             list_nfa1 = list_nfa2
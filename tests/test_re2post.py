@@ -107,3 +107,32 @@ def test_re2post_positive(re_input, re_post):
 def test_re2post_negative(re_input):
     with pytest.raises(RexError):
         _re2post(re_input)
+
+
+@pytest.mark.parametrize('re_input, pos', [
+    ('*', 0),
+    (')', 0),
+    ('ab(', 2),
+    ('(a|b(c)', 0),
+    ('a|+', 2),
+    ('a+?*', 2),
+    (r'ab\j', 2),
+    ('abd' + _ESCAPE_SYM, 3),
+])
+def test_re2post_error_position(re_input, pos):
+    with pytest.raises(RexError) as e:
+        _re2post(re_input)
+    assert e.value.pos == pos
+
+
+@pytest.mark.parametrize('re_input, positions', [
+    ('', [0]),
+    ('a', [0]),
+    ('ab', [0, 1, 2]),
+    ('a|bc', [0, 2, 3, 4, 4]),
+    (r'(a\+)*', [1, 3, 3, 4, 5]),
+])
+def test_re2post_positions(re_input, positions):
+    result = []
+    assert len(_re2post(re_input, result)) == len(positions)
+    assert result == positions
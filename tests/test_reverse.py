@@ -0,0 +1,77 @@
+import random
+
+import pytest
+
+from librex import compile, RexBudgetError
+from librex._impl import _re2post, _reverse_postfix
+
+
+@pytest.mark.parametrize('re, postfix', [
+    ('abc', 'cba\x02\x02'),
+    ('a(b|cd)*e+', 'e+bdc\x02|*a\x02\x02'),
+    (r'.*\.log', 'gol\\..*\x02\x02\x02\x02'),
+    (r'(ab)?c\d', '\\dcba\x02?\x02\x02'),
+    ('', '\x01'),
+])
+def test_reverse_postfix(re, postfix):
+    assert _reverse_postfix(_re2post(re)) == postfix
+    assert _reverse_postfix(postfix) == _re2post(re)
+
+
+@pytest.mark.parametrize('re', ['a|', '(|b)c', '||'])
+def test_reverse_postfix_early_match(re):
+    assert _reverse_postfix(_re2post(re)) is None
+
+
+@pytest.mark.parametrize('re', [
+    '',
+    'a',
+    '(a|b)*abb',
+    r'.*\.log',
+    r'\w*_test',
+    '.*a...',
+    'a*b*c*',
+    r'(\d+\s)*x',
+    'п*пф*',
+])
+def test_reverse_match(re):
+    rnd = random.Random(re)
+    nfa = compile(re)
+    rev = compile(re, engine='reverse')
+    assert rev.engine == 'reverse'
+    for _ in range(500):
+        string = ''.join(rnd.choice('abcx._logt 12пф') for _ in range(rnd.randint(0, 8)))
+        assert rev.match(string) == nfa.match(string), string
+
+
+def test_reverse_early_exit():
+    r = compile(r'.*\.log', engine='auto')
+    assert r.engine == 'reverse'
+    stats = r.enable_stats()
+    assert r.match('x' * 1000 + '.txt') is False
+    assert stats.symbols == 1
+    assert r.match('x' * 1000 + '.log') is True
+    assert stats.symbols == 5
+
+
+def test_reverse_budget():
+    r = compile(r'.*\.log', engine='reverse')
+    assert r.match('x' * 100 + '.txt', budget=1) is False
+    # the rest of the string is accepted once the suffix is read
+    assert r.match('x' * 100 + '.log', budget=4) is True
+    with pytest.raises(RexBudgetError):
+        r.match('a.log', budget=3)
+
+
+def test_reverse_fallback():
+    r = compile('a|', engine='reverse')
+    assert r.engine == 'nfa'
+    assert 'reversed DFA is not available' in r.explain()
+
+
+def test_reverse_stream():
+    r = compile(r'.*\.log', engine='reverse')
+    stream = r._engine.stream()
+    for chunk in ('abc', '.l', 'og'):
+        stream.feed(chunk)
+    assert stream.close() is True
@@ -0,0 +1,89 @@
+import subprocess
+import sys
+
+import pytest
+
+from librex import RexError, compile, export_tables, attach_tables
+
+
+PATTERNS = [r'\d+-\w+', 'abc', r'.*\.log', 'ab.*', 'x|y|z']
+STRINGS = ['12-ab', '12-', 'abc', 'abd', 'x.log', 'x.lo', 'abzz', 'y', '', 'ab']
+
+
+def _check(tables):
+    assert len(tables) == len(PATTERNS)
+    for pattern, obj in zip(PATTERNS, tables):
+        ref = compile(pattern, engine='nfa')
+        assert obj.pattern == pattern
+        assert obj.engine in ('dfa', 'reverse')
+        assert 'tables are shared from' in obj.explain()
+        for string in STRINGS:
+            assert obj.match(string) == ref.match(string), (pattern, string)
+
+
+def test_shared_memory():
+    with export_tables(PATTERNS) as exported:
+        try:
+            with attach_tables(name=exported.name) as tables:
+                assert tables.name == exported.name
+                _check(tables)
+            _check(exported)
+        finally:
+            exported.unlink()
+
+
+def test_shared_file(tmp_path):
+    path = str(tmp_path / 'tables.lrx')
+    with export_tables(PATTERNS, path=path) as exported:
+        _check(exported)
+    with attach_tables(path=path) as tables:
+        assert tables.path == path
+        _check(tables)
+    assert [obj.engine for obj in tables] == ['dfa', 'dfa', 'reverse', 'dfa', 'dfa']
+
+
+def test_shared_read_only(tmp_path):
+    with export_tables(['abc'], path=str(tmp_path / 'tables.lrx')) as tables:
+        with pytest.raises(TypeError):
+            tables[0]._engine.table[0] = 0
+
+
+def test_shared_ignorecase(tmp_path):
+    path = str(tmp_path / 'tables.lrx')
+    export_tables([compile('hello', ignorecase=True)], path=path).close()
+    with attach_tables(path=path) as tables:
+        assert tables[0].ignorecase
+        assert tables[0].match('HeLLo')
+        assert not tables[0].match('HeLL')
+
+
+def test_shared_other_process():
+    code = (
+        'import sys, librex\n'
+        'with librex.attach_tables(name=sys.argv[1]) as tables:\n'
+        '    print(*[obj.match(s) for obj in tables for s in sys.argv[2:]])\n'
+    )
+    with export_tables(PATTERNS) as exported:
+        try:
+            out = subprocess.run([sys.executable, '-c', code, exported.name] + STRINGS,
+                                 check=True, stdout=subprocess.PIPE, universal_newlines=True).stdout
+            expected = [compile(pattern).match(s) for pattern in PATTERNS for s in STRINGS]
+            assert out.split() == [str(result) for result in expected]
+            # the block outlives the process attached to it
+            attach_tables(name=exported.name).close()
+        finally:
+            exported.unlink()
+
+
+def test_shared_errors(tmp_path):
+    with pytest.raises(RexError, match='no DFA'):
+        export_tables(['(a|b)*a(a|b)(a|b)(a|b)'], path=str(tmp_path / 'x'), max_dfa_states=4)
+    with pytest.raises(ValueError):
+        attach_tables()
+    with pytest.raises(ValueError):
+        attach_tables(name='x', path='y')
+
+    path = tmp_path / 'junk'
+    path.write_bytes(b'junk' * 10)
+    with pytest.raises(RexError, match='not a table'):
+        attach_tables(path=str(path))
@@ -0,0 +1,102 @@
+import pytest
+
+import librex
+from librex import compile, RexBudgetError
+
+
+@pytest.mark.parametrize('engine', ['nfa', 'dfa', 'compact', 'reverse'])
+def test_stats(engine):
+    r = compile('a(b|c)*d', engine=engine)
+    assert r.stats is None
+
+    stats = r.enable_stats()
+    assert r.stats is stats
+    assert r.enable_stats() is stats
+
+    assert r.match('abcbd') is True
+    assert r.match('abx') is False
+    assert r.match('') is False
+    assert stats.calls == 3
+    assert stats.matched == 1
+    assert stats.unmatched == 2
+    # the reversed DFA reads 'xba' up to 'x', which can't end a match
+    assert stats.symbols == (6 if engine == 'reverse' else 8)
+    assert stats.states >= stats.symbols
+    assert stats.time > 0
+    if engine != 'nfa':
+        assert stats.dfa_cache_hits == stats.symbols - 1
+        assert stats.dfa_cache_misses == 1
+    else:
+        assert stats.dfa_cache_hits == stats.dfa_cache_misses == 0
+
+    stats.reset()
+    assert stats.calls == 0
+    assert stats.as_dict()['symbols'] == 0
+
+    r.disable_stats()
+    assert r.stats is None
+    r.match('abcbd')
+    assert stats.calls == 0
+
+
+@pytest.mark.parametrize('pattern, string, states', [
+    # the start list (a), 'a' steps from a and reaches b, 'b' steps from b and reaches MATCH,
+    # which is visited by the final check
+    ('ab', 'ab', 6),
+    # SPLIT, a and b start; 'b' steps from a and b and reaches c
+    ('(a|b)c', 'bc', 9),
+])
+def test_stats_nfa_states(pattern, string, states):
+    r = compile(pattern, engine='nfa')
+    stats = r.enable_stats()
+    assert r.match(string) is True
+    assert stats.states == states
+
+
+def test_stats_early_match():
+    r = compile('a|')
+    stats = r.enable_stats()
+    assert r.match('bbb') is True
+    assert stats.matched == 1
+    assert stats.symbols == 0
+
+
+def test_stats_budget():
+    r = compile('a*')
+    stats = r.enable_stats()
+    with pytest.raises(RexBudgetError):
+        r.match('a' * 100, budget=10)
+    assert stats.calls == 1
+    assert stats.matched == stats.unmatched == 0
+
+
+def test_stats_collect_and_export():
+    r1 = compile('ab')
+    r2 = compile('(a)b')
+    r3 = compile('abc')
+    r1.enable_stats()
+    r2.enable_stats()
+    r1.match('ab')
+    r2.match('ac')
+    r3.match('abc')
+
+    collected = {id(p): counters for p, counters in librex.collect_stats()}
+    assert collected[id(r1)]['matched'] == 1
+    assert collected[id(r2)]['unmatched'] == 1
+    assert id(r3) not in collected
+
+    exported = []
+    librex.add_stats_hook(exported.append)
+    try:
+        librex.export_stats()
+    finally:
+        librex.remove_stats_hook(exported.append)
+
+    assert len(exported) == 1
+    patterns = {p: counters['calls'] for p, counters in exported[0]}
+    assert patterns['ab'] == 1
+    assert patterns['(a)b'] == 1
+    assert r1.stats.calls == r2.stats.calls == 0
+
+    r2.disable_stats()
+    assert id(r2) not in {id(p) for p, _ in librex.collect_stats()}
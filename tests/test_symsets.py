@@ -1,6 +1,8 @@
+import sys
+
 import pytest
 
-from librex._symsets import get_symbol_set
+from librex._symsets import get_symbol_set, get_set_base, get_signatures
 
 
 @pytest.mark.parametrize('set_type, sym, expected_result', [
@@ -69,3 +71,25 @@ def test_symsets(set_type, sym, expected_result):
 def test_symsets_negative():
     with pytest.raises(ValueError):
         get_symbol_set('v')
+
+
+def test_symsets_bases():
+    for set_type in '.dDsSwW':
+        s = get_symbol_set(set_type)
+        base, negated = get_set_base(s)
+        for sym in ' a0_!Д\t':
+            if base is None:
+                assert s(sym) is True
+            else:
+                assert s(sym) == (base(sym) != negated)
+
+    with pytest.raises(ValueError):
+        get_set_base(len)
+
+
+def test_symsets_signatures():
+    bases = tuple(get_set_base(get_symbol_set(t))[0] for t in 'dsw')
+    signatures = set(get_signatures(bases))
+    for code in range(sys.maxunicode + 1):
+        sym = chr(code)
+        assert tuple(base(sym) for base in bases) in signatures
@@ -0,0 +1,142 @@
+import threading
+
+import pytest
+
+from librex import compile, set_tiering, tiering_info
+from librex import _tiers
+
+
+@pytest.fixture(autouse=True)
+def tiering():
+    yield
+    _tiers._wait()
+    set_tiering()
+
+
+def test_promotion():
+    set_tiering(threshold=3)
+    before = tiering_info()['promotions']
+    r = compile('(a|b)*c')
+    assert r.engine == 'nfa'
+    assert [r.match(s) for s in ('abc', 'abd')] == [True, False]
+    assert r.engine == 'nfa'
+    assert r.match('bbc')
+    assert r.engine == 'dfa'
+    assert "promoted after 3 calls" in r.explain()
+    assert [r.match(s) for s in ('abc', 'abd', 'c', '')] == [True, False, True, False]
+    assert tiering_info()['promotions'] == before + 1
+
+
+@pytest.mark.parametrize('pattern, engine', [
+    ('abc', 'literal'),
+    ('a|bc|d', 'literal_set'),
+    (r'.*\.log', 'reverse'),
+])
+def test_promotion_planned(pattern, engine):
+    set_tiering(threshold=1)
+    r = compile(pattern)
+    r.match('x')
+    assert r.engine == engine
+
+
+def test_no_promotion():
+    set_tiering(threshold=1)
+    assert compile('(a|b)*c', engine='nfa').match('ac') and compile('(a|b)*c', engine='nfa').engine == 'nfa'
+    set_tiering(threshold=None)
+    r = compile('(a|b)*c')
+    for _ in range(10):
+        r.match('ac')
+    assert r.engine == 'nfa'
+    assert tiering_info()['threshold'] is None
+    with pytest.raises(ValueError):
+        set_tiering(threshold=0)
+
+
+def test_promotion_failure():
+    set_tiering(threshold=2)
+    before = tiering_info()['failures']
+    r = compile('(a|b)*a(a|b)(a|b)', max_dfa_states=4)
+    for _ in range(5):
+        assert r.match('aab')
+    assert r.engine == 'nfa'
+    assert 'kept NFA simulation' in r.explain()
+    assert r._calls is None
+    assert tiering_info()['failures'] == before + 1
+    # the limit of the tiering settings takes precedence
+    set_tiering(threshold=1, max_dfa_states=100)
+    r = compile('(a|b)*a(a|b)(a|b)', max_dfa_states=4)
+    r.match('aab')
+    assert r.engine == 'dfa'
+
+
+def test_background_promotion():
+    set_tiering(threshold=2, background=True)
+    r = compile(r'(\d+\.)+\d+')
+    results = []
+
+    def _run():
+        for _ in range(200):
+            results.append(r.match('1.2.3') and not r.match('1..2'))
+
+    threads = [threading.Thread(target=_run) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    _tiers._wait()
+    assert all(results) and len(results) == 800
+    assert r.engine == 'dfa'
+    assert tiering_info()['background']
+
+
+def test_limited_call_promotes_in_background(monkeypatch):
+    set_tiering(threshold=3)
+    threads = []
+    promote = _tiers._promote
+    monkeypatch.setattr(_tiers, '_promote',
+                        lambda obj: threads.append(threading.current_thread().name) or promote(obj))
+    r = compile('(a|b)*c')
+    r.match('ac')
+    r.match('ac', deadline=float('inf'))
+    # the call crossing the threshold doesn't build the DFA, it matches within its budget
+    assert r.match('ac', budget=100)
+    _tiers._wait()
+    assert threads == ['librex-tiering']
+    assert r.engine == 'dfa'
+
+    r = compile('(a|b)*d')
+    for _ in range(3):
+        r.match('ad')
+    assert threads == ['librex-tiering', threading.current_thread().name]
+
+
+def test_demotion():
+    set_tiering(threshold=1)
+    first = compile('(a|b)*c')
+    first.match('c')
+    size = first._engine.memory_estimate()
+    set_tiering(threshold=1, max_memory=size)
+    assert first.engine == 'dfa'
+
+    second = compile('(x|y)*z')
+    before = tiering_info()['demotions']
+    second.match('z')
+    assert second.engine == 'dfa'
+    assert first.engine == 'nfa'
+    assert 'demoted to NFA simulation' in first.explain()
+    assert tiering_info()['demotions'] == before + 1
+    assert tiering_info()['memory'] <= size
+    assert first.match('abc') and not first.match('abd')
+    # a hot pattern gets promoted again, demoting the other one
+    assert first.engine == 'dfa' and second.engine == 'nfa'
+
+    set_tiering(threshold=1, max_memory=0)
+    assert first.engine == 'nfa'
+    assert tiering_info()['promoted'] == 0
+
+
+def test_tiering_info():
+    info = tiering_info()
+    assert set(info) == {'threshold', 'background', 'max_memory', 'max_dfa_states', 'promoted', 'memory',
+                         'promotions', 'demotions', 'failures'}
+    assert info['threshold'] == 1000